@@ -0,0 +1,99 @@
+# Builds the co-authorship graph index over a synthetic written_by table and times its queries, the answers are checked
+# against the equivalent sql queries.
+# usage (from the repository root): python -m benchmarks.coauthor_graph_benchmark [--authorships 3000000]
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scopus_search.util.db_manager import DbManager
+
+_FIRST_AUTHOR_ID = 7_000_000_000
+_FIRST_PAPER_ID = 85_000_000_000
+
+
+def fill_written_by(db_manager: DbManager, authorships: int, seed: int = 0) -> int:
+    # papers with a heavy tailed number of authors, drawn from a pool of authors with a few very productive ones
+    rng = random.Random(seed)
+    author_pool = max(authorships // 20, 10)
+    first_paper = (db_manager.cursor.execute("select max(paper) from written_by").fetchone()[0] or _FIRST_PAPER_ID - 1) + 1
+    rows, paper = [], first_paper
+    while len(rows) < authorships:
+        author_count = max(1, min(int(rng.lognormvariate(1.4, 0.9)), 500))
+        authors = {_FIRST_AUTHOR_ID + int(author_pool * rng.random() ** 3) for _ in range(author_count)}
+        rows += [(author, paper) for author in authors]
+        paper += 1
+
+    with db_manager.transaction() as cursor:
+        cursor.executemany("insert into written_by (author, paper) values (?,?)", rows)
+    return paper - first_paper
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def check_against_sql(db_manager: DbManager, graph, author_id: int, other_author_id: int):
+    coauthors = graph.get_coauthors(author_id)
+    expected = dict(db_manager.cursor.execute(
+        "select b.author, count(*) from written_by a join written_by b on a.paper = b.paper "
+        "where a.author = ? and b.author != ? group by b.author", [author_id, author_id]).fetchall())
+    assert coauthors.to_dict() == expected, "co-authors differ from sql"
+
+    expected_joint = db_manager.cursor.execute(
+        "select count(*) from written_by a join written_by b on a.paper = b.paper where a.author = ? and b.author = ?",
+        [author_id, other_author_id]).fetchone()[0]
+    assert graph.get_joint_paper_count(author_id, other_author_id) == expected_joint, "joint papers differ from sql"
+
+    edges = graph.get_edges([author_id], hops=2)
+    two_hop = set(graph.get_neighborhood([author_id], hops=1).index)
+    expected_edges = db_manager.cursor.execute(
+        f"select count(*) from (select distinct min(a.author, b.author), max(a.author, b.author) from written_by a "
+        f"join written_by b on a.paper = b.paper where a.author in ({','.join(map(str, two_hop))}) "
+        f"and a.author != b.author)").fetchone()[0]
+    assert len(edges) == expected_edges, "edges differ from sql"
+    assert (edges["source"] < edges["target"]).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the co-authorship graph index")
+    parser.add_argument("--authorships", type=int, default=3_000_000, help="Rows of the synthetic written_by table")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_manager = DbManager(str(Path(work_dir) / "graph.db"))
+        papers = fill_written_by(db_manager, args.authorships)
+
+        graph, build_time = timed(lambda: db_manager.coauthor_graph)
+        print(f"{args.authorships:,} authorships of {papers:,} papers, {graph.stats['authors']:,} authors: "
+              f"index built in {build_time:.2f}s")
+
+        # the most productive author and one of their co-authors
+        author_id = int(graph.author_ids[np.argmax(np.diff(graph._author_indptr))])
+        coauthors, coauthors_time = timed(graph.get_coauthors, author_id)
+        other_author_id = int(coauthors.index[len(coauthors) // 2])
+        joint, joint_time = timed(graph.get_joint_paper_count, author_id, other_author_id)
+        neighborhood, neighborhood_time = timed(graph.get_neighborhood, [other_author_id], hops=2)
+        edges, edges_time = timed(graph.get_edges, [other_author_id], hops=2)
+        print(f"co-authors of {author_id}: {len(coauthors):,} in {coauthors_time * 1000:.1f}ms, "
+              f"joint papers with {other_author_id}: {joint} in {joint_time * 1000:.2f}ms")
+        print(f"2 hop neighborhood of {other_author_id}: {len(neighborhood):,} authors in "
+              f"{neighborhood_time * 1000:.1f}ms, {len(edges):,} edges in {edges_time * 1000:.1f}ms")
+
+        new_papers = fill_written_by(db_manager, 10_000, seed=1)
+        _, refresh_time = timed(lambda: db_manager.coauthor_graph)
+        print(f"refresh after {new_papers:,} new papers: {refresh_time:.2f}s")
+
+        check_against_sql(db_manager, db_manager.coauthor_graph, other_author_id,
+                          int(db_manager.coauthor_graph.get_coauthors(other_author_id).index[0]))
+        print("answers match sql")
+        db_manager.conn.close()
+
+
+if __name__ == "__main__":
+    main()
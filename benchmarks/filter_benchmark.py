@@ -0,0 +1,78 @@
+# Compares the legacy row-wise ScopusAuthor.filter_papers with the vectorized PaperFilter.
+# usage (from the repository root): python -m benchmarks.filter_benchmark [--papers 50000] [--profiles 4]
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from scopus_search.util.paper_filter import PaperFilter, get_pub_years
+
+
+def synthetic_profiles(profile_count: int, papers_per_profile: int, author_pool: int = 20_000, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    profiles = []
+    for profile in range(profile_count):
+        papers = pd.DataFrame({
+            "scopus_id": np.arange(papers_per_profile) + profile * papers_per_profile,
+            "date": [f"{rng.randint(1980, 2024)}-{rng.randint(1, 12):02d}-01" for _ in range(papers_per_profile)],
+            "authors": [tuple(rng.sample(range(1, author_pool), rng.randint(1, 12))) for _ in range(papers_per_profile)],
+        })
+        papers["pub_year"] = get_pub_years(papers["date"])
+        profiles.append(papers)
+    return profiles
+
+
+# the implementation ScopusAuthor.filter_papers had before PaperFilter, kept here as the baseline
+def legacy_filter_papers(papers, max_year=None, min_year=None, include_authors=[], include_all_authors=[],
+                         not_include_authors=[]):
+    if max_year:
+        papers = papers.loc[papers.date.map(lambda date: int(date[:4])) <= max_year]
+    if min_year:
+        papers = papers.loc[papers.date.map(lambda date: int(date[:4])) >= min_year]
+    if not_include_authors:
+        papers = papers[papers.authors.apply(lambda authors: not any(author in authors for author in not_include_authors))]
+    if include_authors:
+        papers = papers[papers.authors.apply(lambda authors: any(author in authors for author in include_authors))]
+    if include_all_authors:
+        papers = papers[papers.authors.apply(lambda authors: set(include_all_authors) <= set(authors))]
+    return papers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks paper filtering")
+    parser.add_argument("--papers", type=int, default=50_000, help="Papers per profile")
+    parser.add_argument("--profiles", type=int, default=4, help="Number of profiles filtered together")
+    parser.add_argument("--filter_authors", type=int, default=200, help="Length of the include/exclude author lists")
+    args = parser.parse_args()
+
+    profiles = synthetic_profiles(args.profiles, args.papers)
+    rng = random.Random(1)
+    filters = dict(
+        max_year=2020,
+        min_year=1990,
+        include_authors=rng.sample(range(1, 20_000), args.filter_authors),
+        include_all_authors=[],
+        not_include_authors=rng.sample(range(1, 20_000), args.filter_authors),
+    )
+
+    start = time.perf_counter()
+    legacy = [legacy_filter_papers(papers, **filters) for papers in profiles]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = PaperFilter(**filters).apply_to_all(profiles)
+    vectorized_time = time.perf_counter() - start
+
+    if any(not old["scopus_id"].equals(new["scopus_id"]) for old, new in zip(legacy, vectorized)):
+        raise AssertionError("legacy and vectorized filters disagree!")
+
+    total = args.papers * args.profiles
+    print(f"filtering {total} papers over {args.profiles} profiles ({args.filter_authors} include / exclude authors)")
+    print(f"    legacy: {legacy_time:.3f}s ({total / legacy_time:,.0f} papers/s)")
+    print(f"vectorized: {vectorized_time:.3f}s ({total / vectorized_time:,.0f} papers/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Compares the legacy row-by-row insert_paper_df with the staged bulk ingest path.
+# usage (from the repository root): python -m benchmarks.ingest_benchmark [--papers 10000]
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from scopus_search.util.db_manager import DbManager
+
+
+def synthetic_papers(paper_count: int, author_pool: int = 5000, afil_pool: int = 500, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(paper_count):
+        afids = rng.sample(range(1, afil_pool + 1), rng.randint(0, 3))
+        rows.append({
+            "scopus_id": 85000000000 + i,
+            "date": f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-01",
+            "title": f"Synthetic paper {i}",
+            "origin": "authors_api",
+            "authors": tuple(rng.sample(range(1, author_pool + 1), rng.randint(1, 8))),
+            "from_db": False,
+            "issn": "12345678",
+            "issue_id": str(rng.randint(1, 12)),
+            "page_range": "1-10",
+            "eid": f"2-s2.0-{85000000000 + i}",
+            "isbn": None,
+            "publication_name": f"Journal {rng.randint(1, 200)}",
+            "affiliation": {afid: f"Institute {afid}" for afid in afids} or None,
+        })
+    return pd.DataFrame(rows)
+
+
+# the implementation insert_paper_df had before the bulk ingest path, kept here as the baseline
+def legacy_insert_paper_df(db: DbManager, papers_df: pd.DataFrame):
+    def find_paper(scopus_id):
+        return not pd.read_sql_query(f"select * from papers where scopus_id={scopus_id}", db.conn).empty
+
+    def find_afil(afid):
+        if not afid:
+            return True
+        return not pd.read_sql_query(f"select * from affiliations where afid={afid}", db.conn).empty
+
+    papers_df["from_db"] = papers_df.apply(lambda paper: find_paper(paper.scopus_id), axis=1)
+    papers_df = papers_df[papers_df["from_db"] == False]
+    papers_df = papers_df.drop_duplicates(subset="scopus_id")
+
+    authors_df = papers_df[["scopus_id", "authors"]].explode("authors")
+    authors_df = authors_df.rename(columns={"authors": "author", "scopus_id": "paper"}).drop_duplicates()
+    authors_df.to_sql("written_by", db.conn, if_exists="append", index=False)
+
+    def extract_afilname(affiliation):
+        affiliation["afilname"] = affiliation["afil_dict"][affiliation["afid"]]
+        return affiliation[["afid", "afilname"]]
+
+    affiliations = papers_df[["scopus_id", "affiliation"]].copy()
+    affiliations["afil_dict"] = affiliations["affiliation"]
+    affiliations = affiliations.explode("affiliation").rename(columns={"affiliation": "afid"}).dropna()
+    affiliated_to = affiliations[["scopus_id", "afid"]].copy()
+    affiliations = affiliations.apply(extract_afilname, axis=1)
+    affiliations = affiliations[affiliations.apply(lambda affiliation: find_afil(affiliation["afid"]), axis=1) == False]
+    affiliations["updated_at"] = str(datetime.utcnow())
+    affiliations.to_sql("affiliations", db.conn, if_exists="append", index=False)
+
+    affiliated_to.rename(columns={"scopus_id": "paper", "afid": "afil"}).to_sql(
+        "affiliated_to", db.conn, if_exists="append", index=False)
+
+    papers_df = papers_df[["scopus_id", "title", "date", "origin", "page_range", "issue_id", "issn", "isbn", "eid"]].copy()
+    papers_df["updated_at"] = str(datetime.utcnow())
+    papers_df.to_sql("papers", db.conn, if_exists="append", index=False)
+    db.conn.commit()
+
+
+def _time_ingest(insert, papers: pd.DataFrame, db_dir: Path, name: str) -> dict:
+    db = DbManager(str(db_dir / f"{name}.db"))
+
+    start = time.perf_counter()
+    insert(db, papers.copy())
+    cold = time.perf_counter() - start
+
+    # second pass: every paper is already stored, measures the duplicate detection
+    start = time.perf_counter()
+    insert(db, papers.copy())
+    warm = time.perf_counter() - start
+
+    db.conn.close()
+    return {"name": name, "cold_rows_per_sec": len(papers) / cold, "warm_rows_per_sec": len(papers) / warm,
+            "cold_seconds": cold, "warm_seconds": warm}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks paper ingest into the local database")
+    parser.add_argument("--papers", type=int, default=10_000, help="Number of synthetic papers to ingest")
+    parser.add_argument("--skip_legacy", action="store_true", help="Only run the bulk ingest path")
+    args = parser.parse_args()
+
+    papers = synthetic_papers(args.papers)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = []
+        if not args.skip_legacy:
+            results.append(_time_ingest(legacy_insert_paper_df, papers, Path(tmp_dir), "legacy"))
+        results.append(_time_ingest(lambda db, df: db.insert_paper_df(df), papers, Path(tmp_dir), "bulk"))
+
+    print(f"ingest of {args.papers} papers")
+    for result in results:
+        print(f"{result['name']:>8}: cold {result['cold_rows_per_sec']:>12,.0f} rows/s ({result['cold_seconds']:.2f}s), "
+              f"warm {result['warm_rows_per_sec']:>12,.0f} rows/s ({result['warm_seconds']:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+# Local stand-in for the Scopus author retrieval, author search, scopus search and abstract retrieval apis.
+# Serves synthetic author profiles, so the whole pipeline can be measured without spending api quota.
+# usage (from the repository root): python -m benchmarks.mock_scopus [--port 8085] [--papers 1000]
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from scopus_search.util.response_cache import get_endpoint
+
+# author ids are 1..n, the co-authors are drawn from this pool of ids above them
+_CO_AUTHOR_POOL = 200_000
+_FIRST_PAPER_ID = 85_000_000_000
+
+_AUTHOR_PATH = re.compile(r"^/content/author/author_id/(\d+)$")
+_ABSTRACT_PATH = re.compile(r"^/content/abstract/scopus_id/(\d+)$")
+_AU_ID_QUERY = re.compile(r"AU-ID\((\d+)\)")
+# the terms of the scopus search queries sent by the client: AU-ID(...), PUBYEAR > / < ..., AND, OR, NOT, parentheses
+_QUERY_TERMS = re.compile(r"\s*(?:AU-ID\((\d+)\)|PUBYEAR ([<>]) (\d+)|(AND|OR|NOT|\(|\)))")
+_AUTHOR_NAME_QUERY = re.compile(r"AUTHFIRST\((.*?)\) AND AUTHLASTNAME\((.*?)\)", re.IGNORECASE)
+
+
+def get_co_author_count(rng: random.Random) -> int:
+    # heavy tailed like real author lists: mostly 2-8 authors, a few consortium papers with hundreds
+    return max(1, min(int(rng.lognormvariate(1.4, 0.9)), 1000))
+
+
+class SyntheticScopus:
+    # synthetic profiles: author id -> number of papers, the papers are generated on first access.
+    # with cluster > 0 every paper also lists each other profile with that probability (a dense collaboration
+    # cluster), the papers of a profile are then its own ones and the ones of the others listing it.
+    # with homonyms every profile is called "Alex Homonym", one author search then finds all of them
+    def __init__(self, profiles: dict, seed: int = 0, cluster: float = 0.0, homonyms: bool = False):
+        self.profiles = profiles
+        self.seed = seed
+        self.cluster = cluster
+        self.homonyms = homonyms
+        self._papers = {}
+        self._paper_index = {}
+        self._listed_papers = {}
+        self._lock = threading.Lock()
+
+    def get_papers(self, author_id: int) -> list[dict]:
+        with self._lock:
+            for profile in (self.profiles if self.cluster else [author_id]):
+                if profile not in self._papers:
+                    self._papers[profile] = self._generate_papers(profile)
+                    self._paper_index.update((paper["scopus_id"], paper) for paper in self._papers[profile])
+            if not self.cluster:
+                return self._papers[author_id]
+
+            if not self._listed_papers:
+                for paper in sorted(self._paper_index.values(), key=lambda paper: paper["scopus_id"]):
+                    for author in paper["authors"]:
+                        if author in self.profiles:
+                            self._listed_papers.setdefault(author, []).append(paper)
+            return self._listed_papers.get(author_id, [])
+
+    def get_paper(self, scopus_id: int) -> dict | None:
+        with self._lock:
+            return self._paper_index.get(scopus_id)
+
+    def get_name(self, author_id: int) -> tuple[str, str]:
+        # (given name, surname)
+        return ("Alex", "Homonym") if self.homonyms else (f"Given{author_id}", f"Surname{author_id}")
+
+    def find_authors(self, given_name: str, surname: str) -> list[int]:
+        # the profiles with the surname whose given name starts like the given one, both case insensitive
+        return [author_id for author_id in self.profiles
+                if self.get_name(author_id)[1].lower() == surname.lower()
+                and self.get_name(author_id)[0].lower().startswith(given_name[:1].lower())]
+
+    def _generate_papers(self, author_id: int) -> list[dict]:
+        rng = random.Random(f"{self.seed}-{author_id}")
+        first_id = _FIRST_PAPER_ID + sum(count for other, count in self.profiles.items() if other < author_id)
+
+        papers = []
+        for i in range(self.profiles.get(author_id, 0)):
+            co_authors = rng.sample(range(len(self.profiles) + 1, _CO_AUTHOR_POOL), get_co_author_count(rng) - 1)
+            if self.cluster:
+                co_authors += [other for other in self.profiles if other != author_id and rng.random() < self.cluster]
+            authors = [author_id] + co_authors
+            rng.shuffle(authors)
+            afids = rng.sample(range(60_000_000, 60_005_000), rng.randint(1, 3))
+            year = rng.randint(1980, 2024)
+            papers.append({
+                "scopus_id": first_id + i,
+                "year": year,
+                "date": f"{year}-{rng.randint(1, 12):02d}-01",
+                "title": f"Synthetic paper {first_id + i} of author {author_id}",
+                "authors": authors,
+                "affiliations": [{"afid": str(afid), "affilname": f"Institute {afid}"} for afid in afids],
+                "publication_name": f"Journal of Synthetic Results {rng.randint(1, 500)}",
+                "issn": f"{rng.randint(10_000_000, 99_999_999)}",
+                "volume": str(rng.randint(1, 80)),
+                "page_range": f"{rng.randint(1, 500)}-{rng.randint(501, 999)}",
+            })
+        return papers
+
+
+def _document(paper: dict) -> dict:
+    # an abstract-document of the documents view of the author retrieval api
+    return {
+        "dc:identifier": f"SCOPUS_ID:{paper['scopus_id']}",
+        "eid": f"2-s2.0-{paper['scopus_id']}",
+        "dc:title": paper["title"],
+        "prism:coverDate": paper["date"],
+        "prism:publicationName": paper["publication_name"],
+        "prism:issn": paper["issn"],
+        "prism:issueIdentifier": paper["volume"],
+        "prism:pageRange": paper["page_range"],
+        "authors": {"author": [{"authid": str(author)} for author in paper["authors"]]},
+        "affiliation": paper["affiliations"],
+    }
+
+
+def _search_entry(paper: dict, complete: bool) -> dict:
+    entry = {
+        "dc:identifier": f"SCOPUS_ID:{paper['scopus_id']}",
+        "eid": f"2-s2.0-{paper['scopus_id']}",
+        "dc:title": paper["title"],
+        "dc:creator": f"Author {paper['authors'][0]}",
+        "prism:coverDate": paper["date"],
+        "prism:publicationName": paper["publication_name"],
+        "prism:issn": paper["issn"],
+        "prism:pageRange": paper["page_range"],
+        "affiliation": paper["affiliations"],
+    }
+    if complete:
+        entry["author"] = [{"authid": str(author)} for author in paper["authors"]]
+    return entry
+
+
+def compile_query(query: str):
+    # the query as a predicate over the synthetic papers, the terms are translated to a python expression
+    expression, position = [], 0
+    while position < len(query.rstrip()):
+        term = _QUERY_TERMS.match(query, position)
+        if term is None:
+            raise ValueError(f"Unsupported query: {query}")
+        author, operator, year, keyword = term.groups()
+        if author:
+            expression.append(f"({author} in paper['authors'])")
+        elif year:
+            expression.append(f"(paper['year'] {operator} {year})")
+        else:
+            expression.append(keyword.lower() if keyword.isalpha() else keyword)
+        position = term.end()
+    # only the whitelisted terms above end up in the expression
+    return eval(f"lambda paper: {' '.join(expression) or 'True'}", {"__builtins__": {}})
+
+
+class MockScopusHandler(BaseHTTPRequestHandler):
+    server: "MockScopusServer"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        api_key = self.headers.get("X-ELS-APIKey")
+        self.server.count_request(url.path, api_key)
+        if api_key in self.server.exhausted_keys:
+            # the weekly quota of the key is used up, it resets in a week
+            return self._send(429, {"service-error": {"status": {"statusText": "Quota exceeded"}}},
+                              remaining=0, reset=int(time.time()) + 7 * 24 * 3600)
+
+        if match := _AUTHOR_PATH.match(url.path):
+            return self._author(int(match.group(1)), params)
+        if match := _ABSTRACT_PATH.match(url.path):
+            return self._abstract(int(match.group(1)))
+        if url.path == "/content/search/author":
+            return self._author_search(params)
+        if url.path == "/content/search/scopus":
+            return self._scopus_search(params)
+        self._send(404, {"service-error": {"status": {"statusText": "Resource not found"}}})
+
+    def _author(self, author_id: int, params: dict):
+        if author_id not in self.server.scopus.profiles:
+            return self._send(404, {"service-error": {"status": {"statusText": "Author not found"}}})
+
+        given_name, surname = self.server.scopus.get_name(author_id)
+        profile = {
+            "coredata": {"dc:identifier": f"AUTHOR_ID:{author_id}"},
+            "author-profile": {"preferred-name": {"given-name": given_name, "surname": surname}},
+        }
+        if params.get("view") != "documents":
+            return self._send(200, {"author-retrieval-response": [profile]})
+        if not self.server.documents_view:
+            return self._send(401, {"service-error": {"status": {"statusText": "Not authorized for the documents view"}}})
+
+        papers = self.server.scopus.get_papers(author_id)
+        start = int(params.get("startref", 1)) - 1
+        page = papers[start:start + self.server.page_size]
+        profile["documents"] = {"@total": str(len(papers)), "abstract-document": [_document(paper) for paper in page]}
+        self._send(200, {"author-retrieval-response": [profile]})
+
+    def _abstract(self, scopus_id: int):
+        paper = self.server.scopus.get_paper(scopus_id)
+        if paper is None:
+            return self._send(404, {"service-error": {"status": {"statusText": "Document not found"}}})
+        self._send(200, {"abstracts-retrieval-response": {
+            "coredata": {"dc:title": paper["title"]},
+            "authors": {"author": [{"@auid": str(author)} for author in paper["authors"]]},
+        }})
+
+    def _author_search(self, params: dict):
+        # AUTHFIRST(Given<id>) AND AUTHLASTNAME(Surname<id>) finds author <id>, the entries carry the metadata of the
+        # standard view (name, document count, current affiliation)
+        scopus = self.server.scopus
+        match = _AUTHOR_NAME_QUERY.search(params.get("query", ""))
+        ids = scopus.find_authors(match.group(1).strip(), match.group(2).strip()) if match else []
+        entries = [{
+            "dc:identifier": f"AUTHOR_ID:{author_id}",
+            "preferred-name": dict(zip(("given-name", "surname"), scopus.get_name(author_id))),
+            "document-count": str(scopus.profiles[author_id]),
+            "affiliation-current": {"affiliation-id": str(60000000 + author_id % 3),
+                                    "affiliation-name": f"Institute {author_id % 3}"},
+        } for author_id in ids]
+        self._send(200, {"search-results": {
+            "opensearch:totalResults": str(len(entries)),
+            "entry": entries or [{"@_fa": "true", "error": "Result set was empty"}],
+        }})
+
+    def _scopus_search(self, params: dict):
+        query = params.get("query", "")
+        match = _AU_ID_QUERY.search(query)
+        papers = self.server.scopus.get_papers(int(match.group(1))) if match else []
+        matches = compile_query(query)
+        papers = [paper for paper in papers if matches(paper)]
+        if params.get("sort") == "-coverDate":
+            papers = sorted(papers, key=lambda paper: paper["date"], reverse=True)
+
+        # the cursor is the start offset of the next page
+        if params.get("view") == "COMPLETE" and not self.server.complete_view:
+            return self._send(401, {"service-error": {"status": {"statusText": "Not authorized for the complete view"}}})
+
+        count = int(params.get("count", 25))
+        start = int(params.get("start") or (0 if params.get("cursor", "*") == "*" else params["cursor"]))
+        page = papers[start:start + count]
+        results = {
+            "opensearch:totalResults": str(len(papers)),
+            "entry": [_search_entry(paper, params.get("view") == "COMPLETE") for paper in page]
+                     or [{"@_fa": "true", "error": "Result set was empty"}],
+        }
+        if "cursor" in params:
+            results["cursor"] = {"@current": params["cursor"], "@next": str(start + count)}
+        self._send(200, {"search-results": results})
+
+    def _send(self, status: int, body: dict, remaining: int = 1_000_000, reset: int = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-RateLimit-Limit", "1000000")
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        if reset is not None:
+            self.send_header("X-RateLimit-Reset", str(reset))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockScopusServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, scopus: SyntheticScopus, port: int = 0, page_size: int = 25, documents_view: bool = True,
+                 complete_view: bool = True, exhausted_keys: tuple = ()):
+        super().__init__(("127.0.0.1", port), MockScopusHandler)
+        self.scopus = scopus
+        # page size of the documents view, has to match the num_res of the client
+        self.page_size = page_size
+        # without the documents view the scopus search fallback is used, like for api keys without the permission
+        self.documents_view = documents_view
+        # without the complete view of the search api the author lists come from abstract retrievals
+        self.complete_view = complete_view
+        # requests with these api keys are answered as if their quota was exhausted
+        self.exhausted_keys = set(exhausted_keys)
+        self.requests = {}
+        # requests per api key
+        self.keys = {}
+        self._requests_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_request(self, path: str, api_key: str = None):
+        endpoint = get_endpoint(path)
+        with self._requests_lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.keys[api_key] = self.keys.get(api_key, 0) + 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, name="mock_scopus", daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves synthetic author profiles through a mock Scopus api")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--papers", type=int, nargs="+", default=[1000], help="Paper count of the authors 1, 2, ...")
+    parser.add_argument("--no_documents_view", action="store_true", help="Forces clients to use the scopus search")
+    parser.add_argument("--no_complete_view", action="store_true", help="Forces clients to retrieve the abstracts")
+    parser.add_argument("--cluster", type=float, default=0.0, help="Probability of the authors to share a paper")
+    parser.add_argument("--homonyms", action="store_true", help="Names all authors \"Alex Homonym\"")
+    args = parser.parse_args()
+
+    scopus = SyntheticScopus({author_id: count for author_id, count in enumerate(args.papers, start=1)},
+                             cluster=args.cluster, homonyms=args.homonyms)
+    with MockScopusServer(scopus, args.port, documents_view=not args.no_documents_view,
+                          complete_view=not args.no_complete_view) as server:
+        print(f"serving {len(args.papers)} synthetic authors on {server.url}, set api_base_url in the config to use it")
+        threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Builds the author name index over a synthetic authors table and resolves variants of the stored names the way users
+# type them (lower case, without accents, initials, typos), reports the share resolved locally, the wrong resolutions
+# and the time per lookup.
+# usage (from the repository root): python -m benchmarks.name_index_benchmark [--authors 100000]
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from scopus_search.util.db_manager import DbManager
+
+_FIRST_AUTHOR_ID = 7_000_000_000
+# about 2000 syllables (and 20000 trigrams), accented ones included, real author names are at least as varied
+_SYLLABLES = [onset + vowel + coda for onset in ["", "b", "br", "ch", "d", "f", "g", "gr", "h", "j", "k", "kr", "l", "m",
+                                                 "n", "p", "r", "s", "sch", "t", "tr", "v", "w", "z"]
+              for vowel in ["a", "e", "i", "o", "u", "y", "é", "ö", "ç", "ñ", "ei", "ou"]
+              for coda in ["", "n", "r", "s", "l", "m", "k"]]
+
+
+def _word(rng: random.Random, syllables: int) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def synthetic_authors(count: int, seed: int = 0) -> list[tuple]:
+    # (scopus_id, given_name, surname, base_id), every tenth author has a linked profile under its initials
+    rng = random.Random(seed)
+    authors = []
+    for i in range(count):
+        scopus_id = _FIRST_AUTHOR_ID + 2 * i
+        given_name = " ".join(_word(rng, rng.randint(2, 3)) for _ in range(rng.choice([1, 1, 2])))
+        surname = _word(rng, rng.randint(2, 4))
+        authors.append((scopus_id, given_name, surname, None))
+        if i % 10 == 0:
+            authors.append((scopus_id + 1, " ".join(f"{token[0]}." for token in given_name.split()), surname, scopus_id))
+    return authors
+
+
+def _typo(rng: random.Random, name: str) -> str:
+    position = rng.randrange(len(name))
+    return name[:position] + name[position + 1:] if len(name) > 4 else name
+
+
+def name_variants(authors: list[tuple], count: int, seed: int = 1) -> list[tuple]:
+    # (given_name, surname, kind, expected base id)
+    rng = random.Random(seed)
+    variants = []
+    bases = [author for author in authors if author[3] is None]
+    for scopus_id, given_name, surname, _ in rng.sample(bases, min(count, len(bases))):
+        kind = rng.choice(["exact", "lower", "ascii", "initials", "typo"])
+        if kind == "lower":
+            given_name, surname = given_name.lower(), surname.lower()
+        elif kind == "ascii":
+            given_name, surname = (name.translate(str.maketrans("çéöñ", "ceon")) for name in (given_name, surname))
+        elif kind == "initials":
+            given_name = " ".join(token[0] for token in given_name.split())
+        elif kind == "typo":
+            surname = _typo(rng, surname)
+        variants.append((given_name, surname, kind, scopus_id))
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the author name index")
+    parser.add_argument("--authors", type=int, default=100_000, help="Base authors of the synthetic authors table")
+    parser.add_argument("--lookups", type=int, default=10_000, help="Name variants to resolve")
+    parser.add_argument("--threshold", type=float, default=0.85, help="Lowest confidence of a local resolution")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_manager = DbManager(str(Path(work_dir) / "names.db"))
+        authors = synthetic_authors(args.authors)
+        db_manager.insert_scopus_authors(authors)
+
+        start = time.perf_counter()
+        name_index = db_manager.name_index
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        name_index._index_trigrams()
+        print(f"{len(name_index):,} stored authors: index built in {build_time:.2f}s, "
+              f"trigram postings (first fuzzy lookup) in {time.perf_counter() - start:.2f}s")
+
+        results = {}
+        for given_name, surname, kind, expected in name_variants(authors, args.lookups):
+            start = time.perf_counter()
+            base_id = name_index.resolve(given_name, surname, args.threshold)
+            elapsed = time.perf_counter() - start
+            resolved, wrong, seconds, total = results.get(kind, (0, 0, 0.0, 0))
+            results[kind] = (resolved + (base_id is not None), wrong + (base_id not in (None, expected)),
+                             seconds + elapsed, total + 1)
+
+        print(f"{'variant':<10}{'lookups':>9}{'local':>9}{'wrong':>7}{'us/lookup':>11}")
+        for kind, (resolved, wrong, seconds, total) in results.items():
+            print(f"{kind:<10}{total:>9,}{resolved / total:>9.1%}{wrong:>7}{seconds / total * 1e6:>11.1f}")
+        db_manager.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Offline end-to-end benchmark against the mock Scopus server of benchmarks/mock_scopus.py, no api quota is spent.
+# For every profile size it measures `scopus_search.main` in a subprocess (wall time, peak RSS) and the single stages
+# in process: download, database ingest, filtering and output serialization. The results are written as json.
+# usage (from the repository root):
+#   python -m benchmarks.pipeline_benchmark [--sizes 10 1000 10000 50000] [--via_search] [--output results.json]
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.mock_scopus import MockScopusServer, SyntheticScopus
+from scopus_search import constants
+from scopus_search.util.db_manager import DbManager
+
+_AUTHOR_ID = 1
+# next to the benchmarks instead of the working directory, ignored by git
+_DEFAULT_OUTPUT = Path(__file__).parent / "benchmark_results.json"
+# no pacing, the mock server is not rate limited
+_RATE_LIMITS = {"author": 1e6, "author_search": 1e6, "scopus_search": 1e6, "abstract": 1e6, "other": 1e6}
+
+
+def get_config(server: MockScopusServer, db_path: Path) -> dict:
+    return {
+        "apikey": "benchmark",
+        "db_path": str(db_path),
+        "api_base_url": server.url,
+        "rate_limits": _RATE_LIMITS,
+        "cache_mode": "off",
+    }
+
+
+def run_main(server: MockScopusServer, work_dir: Path, workers: int) -> dict:
+    # a fresh home directory (with its own config and database) for every run
+    home_dir = work_dir / "home"
+    (home_dir / ".scopus_search" / "resources").mkdir(parents=True)
+    with open(home_dir / ".scopus_search" / "config.json", "w") as file:
+        json.dump(get_config(server, home_dir / "database.db"), file)
+
+    output_file = work_dir / "output.json"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "scopus_search.main", str(_AUTHOR_ID), "--workers", str(workers),
+         "--output_file", str(output_file)],
+        env=dict(os.environ, HOME=str(home_dir), PYTHONPATH=os.getcwd()))
+    # wait4 reports the resource usage of this child only
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"scopus_search.main exited with {os.waitstatus_to_exitcode(status)}")
+
+    return {
+        "wall_s": round(wall_time, 4),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "output_bytes": output_file.stat().st_size,
+    }
+
+
+def run_stages(server: MockScopusServer, work_dir: Path) -> dict:
+    from scopus_search.models.author import Author
+    from scopus_search.util.data_manager import DataManager, OutputFormats, stream_ndjson
+    from scopus_search.util.rate_limiter import RequestGovernor
+    from scopus_search.util.scopus_client import ScopusClient
+
+    # the settings are injected, so nothing is read from or written to the real home directory
+    constants.CONFIG = get_config(server, work_dir / "stages.db")
+    constants.db_manager = DbManager(str(work_dir / "stages.db"))
+    client = ScopusClient("benchmark", local_dir=work_dir, governor=RequestGovernor(rates=_RATE_LIMITS),
+                          base_url=server.url)
+
+    stages = {}
+    start = time.perf_counter()
+    author = Author(client, scopus_id=_AUTHOR_ID, defer_save=True)
+    stages["download_s"] = time.perf_counter() - start
+    paper_count = len(author.base_author.papers)
+
+    start = time.perf_counter()
+    author.save_to_db()
+    stages["ingest_s"] = time.perf_counter() - start
+    stages["ingest_papers_per_s"] = paper_count / stages["ingest_s"]
+
+    start = time.perf_counter()
+    DataManager([author], output_formatter=OutputFormats.json).get_output()
+    stages["json_output_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stream_ndjson([author], io.StringIO(), None, None, [], [], [])
+    stages["ndjson_output_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DataManager([author]).filter_papers(max_year=2020, min_year=2000, not_include_authors=list(range(1000, 3000)))
+    stages["filter_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Author(client, scopus_id=_AUTHOR_ID, defer_save=True, refresh="never")
+    stages["load_from_db_s"] = time.perf_counter() - start
+
+    constants.db_manager.conn.close()
+    return {"papers": paper_count, **{name: round(value, 4) for name, value in stages.items()}}
+
+
+def get_git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark against a mock Scopus server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 50000], help="Papers of the profiles")
+    parser.add_argument("--workers", type=int, default=1, help="Passed on to scopus_search --workers")
+    parser.add_argument("--via_search", action="store_true",
+                        help="Deny the documents view, so the papers are downloaded through the scopus search")
+    parser.add_argument("--output", type=str, default=str(_DEFAULT_OUTPUT), help="Json file the results are written to")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        scopus = SyntheticScopus({_AUTHOR_ID: size})
+        with MockScopusServer(scopus, documents_view=not args.via_search) as server, \
+                tempfile.TemporaryDirectory() as work_dir:
+            main_result = run_main(server, Path(work_dir) / "main", args.workers)
+            stages = run_stages(server, Path(work_dir))
+            results.append({"size": size, "main": main_result, "stages": stages, "requests": server.requests})
+
+        print(f"{size:>6} papers: main {main_result['wall_s']:.2f}s, peak rss {main_result['peak_rss_mb']:.0f}MB | "
+              f"download {stages['download_s']:.2f}s, ingest {stages['ingest_papers_per_s']:,.0f} papers/s, "
+              f"filter {stages['filter_s'] * 1000:.1f}ms, json {stages['json_output_s'] * 1000:.1f}ms, "
+              f"ndjson {stages['ndjson_output_s'] * 1000:.1f}ms")
+
+    report = {
+        "benchmark": "pipeline",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": get_git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {"workers": args.workers, "via_search": args.via_search},
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Runs a narrow query ("the last two years, with co-author X") against the mock Scopus server of
+# benchmarks/mock_scopus.py, once by downloading the whole bibliography and filtering it afterwards (the behaviour
+# before util.query_plan) and once with the filters pushed down into the scopus search, and compares the requests,
+# bytes and results. Then loads the stored papers with and without the filters pushed down into sql.
+# usage (from the repository root): python -m benchmarks.pushdown_benchmark [--papers 2000]
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_scopus import MockScopusServer, SyntheticScopus
+from benchmarks.pipeline_benchmark import get_config
+from scopus_search import api, constants
+from scopus_search.models.paper import get_papers_from_db
+from scopus_search.util.db_manager import DbManager
+from scopus_search.util.metrics import metrics
+from scopus_search.util.paper_filter import PaperFilter
+from scopus_search.util.query_plan import get_query_plan
+
+_AUTHOR_ID = 1
+# profile 2 is a frequent co-author of profile 1
+_CO_AUTHOR_ID = 2
+
+
+def _use_database(server: MockScopusServer, db_path: Path):
+    constants.CONFIG = get_config(server, db_path)
+    constants.db_manager = DbManager(str(db_path))
+    constants.project_data_dir = constants.cache_dir = db_path.parent
+
+
+def _run(server: MockScopusServer, harvest) -> tuple:
+    # (result, seconds, requests, bytes) of one harvest
+    metrics.reset()
+    server.requests.clear()
+    start = time.perf_counter()
+    result = harvest()
+    elapsed = time.perf_counter() - start
+    return result, elapsed, sum(server.requests.values()), metrics.snapshot()["counters"].get("http_bytes", 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the filter pushdown into scopus queries and sql")
+    parser.add_argument("--papers", type=int, default=2000, help="Papers of the harvested author")
+    parser.add_argument("--years", type=int, default=2, help="The query covers the last years of the bibliography")
+    args = parser.parse_args()
+
+    scopus = SyntheticScopus({_AUTHOR_ID: args.papers, _CO_AUTHOR_ID: args.papers // 10}, cluster=0.2)
+    papers = scopus.get_papers(_AUTHOR_ID)
+    filters = dict(min_year=max(paper["year"] for paper in papers) - args.years + 1,
+                   include_authors=[_CO_AUTHOR_ID])
+    print(f"author {_AUTHOR_ID} with {len(papers):,} papers, query: {filters}")
+
+    with tempfile.TemporaryDirectory() as work_dir, \
+            MockScopusServer(scopus, documents_view=False) as server:
+        work_dir = Path(work_dir)
+
+        _use_database(server, work_dir / "full.db")
+        full, full_time, full_requests, full_bytes = _run(server, lambda: PaperFilter(**filters).apply(
+            api.get_authors([_AUTHOR_ID])[0].base_author.papers))
+        print(f"full download, filtered afterwards: {len(full):,} papers, {full_requests:,} requests, "
+              f"{full_bytes / 1e6:.2f} MB, {full_time:.2f}s")
+
+        # the full database of the first run is kept for the sql comparison below
+        full_db = constants.db_manager
+        _use_database(server, work_dir / "pushdown.db")
+        pushed, pushed_time, pushed_requests, pushed_bytes = _run(server, lambda: PaperFilter(**filters).apply(
+            api.get_authors([_AUTHOR_ID], query_plan=get_query_plan(**filters))[0].base_author.papers))
+        print(f"filters pushed down:                {len(pushed):,} papers, {pushed_requests:,} requests, "
+              f"{pushed_bytes / 1e6:.2f} MB, {pushed_time:.2f}s "
+              f"({pushed_bytes / max(full_bytes, 1):.1%} of the bytes)")
+        same = sorted(full["scopus_id"].tolist()) == sorted(pushed["scopus_id"].tolist())
+        print(f"same papers: {same}")
+        constants.db_manager.conn.close()
+
+        constants.db_manager = full_db
+        for name, db_filters in [("all stored papers", None), ("filters in sql", get_query_plan(**filters).get_db_filters())]:
+            start = time.perf_counter()
+            loaded = get_papers_from_db(_AUTHOR_ID, db_filters=db_filters)
+            print(f"{name:<18} {len(loaded):>7,} papers loaded in {(time.perf_counter() - start) * 1000:.1f}ms")
+        full_db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Renders the papers of synthetic authors (built like util.offline does, no database or requests) in every text
+# output format and compares the json rendering with the row-wise DataFrame.apply implementation it replaced.
+# usage (from the repository root): python -m benchmarks.render_benchmark [--papers 100000] [--authors 50]
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from scopus_search.models.author import Author
+from scopus_search.models.scopus_author import ScopusAuthor
+from scopus_search.util.data_manager import DataManager, OutputFormats
+from scopus_search.util.paper_filter import get_pub_years
+from scopus_search.util.rendering import to_json
+
+
+def synthetic_authors(author_count: int, paper_count: int, profiles_per_author: int = 2, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    per_profile = paper_count // (author_count * profiles_per_author)
+    authors, next_paper = [], 0
+    for author in range(author_count):
+        profiles = []
+        for profile in range(profiles_per_author):
+            papers = pd.DataFrame({
+                "scopus_id": np.arange(next_paper, next_paper + per_profile) + 80_000_000_000,
+                "title": [f"On the {rng.choice(['theory', 'practice', 'limits'])} of {rng.randint(1, 10**6)} | part "
+                          f"{rng.randint(1, 9)}" for _ in range(per_profile)],
+                "date": [f"{rng.randint(1980, 2024)}-{rng.randint(1, 12):02d}-01" for _ in range(per_profile)],
+                "authors": [tuple(rng.sample(range(1, 50_000), rng.randint(1, 8))) for _ in range(per_profile)],
+                "origin": "scopus_search",
+            })
+            papers["pub_year"] = get_pub_years(papers["date"])
+            next_paper += per_profile
+            profiles.append(ScopusAuthor.from_db(author * profiles_per_author + profile + 1, f"Given{author}",
+                                                 f"Surname{author}", papers))
+        authors.append(Author.from_db(profiles))
+    return authors
+
+
+# the json output before util.rendering, kept here as the baseline
+def legacy_paper_list(papers):
+    return papers.sort_values(by=['date'], ascending=False).apply(
+        lambda paper: {
+            "scopus_id": paper.scopus_id,
+            "title": paper.title,
+            "authors": paper.authors,
+            "date": paper.date
+        }, axis=1
+    ).to_list()
+
+
+def legacy_json_output(authors: list) -> dict:
+    return {
+        author.base_author.scopus_id: {auth.scopus_id: legacy_paper_list(auth.papers) for auth in author.scopus_authors}
+        for author in authors
+    }
+
+
+def _timed(render) -> tuple:
+    start = time.perf_counter()
+    output = render()
+    return output, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the rendering of the output formats")
+    parser.add_argument("--papers", type=int, default=100_000, help="Papers of all authors together")
+    parser.add_argument("--authors", type=int, default=50, help="Authors, with two scopus profiles each")
+    parser.add_argument("--skip_legacy", action="store_true", help="Does not run the slow row-wise baseline")
+    args = parser.parse_args()
+
+    authors = synthetic_authors(args.authors, args.papers)
+    papers = sum(len(auth.papers) for author in authors for auth in author.scopus_authors)
+    print(f"{len(authors)} authors, {papers:,} papers")
+
+    new_json, new_time = _timed(lambda: to_json(DataManager(authors).get_output()))
+    if not args.skip_legacy:
+        old_json, old_time = _timed(lambda: to_json(legacy_json_output(authors)))
+        print(f"{'json (DataFrame.apply)':<36}{old_time:>8.3f}s")
+        print(f"same json: {json.loads(old_json) == json.loads(new_json)}")
+    print(f"{'json':<36}{new_time:>8.3f}s  {len(new_json) / 1e6:.1f} MB")
+
+    for output_format, sort_by in [("ndjson", None), ("csv", None), ("md", None),
+                                   ("csv", ["pub_year:desc", "title"])]:
+        output, elapsed = _timed(lambda: DataManager(authors, OutputFormats[output_format], sort_by).get_output())
+        label = output_format + (f" sorted by {' '.join(sort_by)}" if sort_by else "")
+        print(f"{label:<36}{elapsed:>8.3f}s  {len(output) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Harvests a dense collaboration cluster (profiles sharing most of their papers) from the mock Scopus server of
+# benchmarks/mock_scopus.py, without the documents and complete views so every author list is an abstract retrieval,
+# and compares the requests sent with the number of unique entities of the cluster.
+# usage (from the repository root): python -m benchmarks.run_memo_benchmark [--profiles 12] [--workers 4]
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_scopus import MockScopusServer, SyntheticScopus
+from benchmarks.pipeline_benchmark import get_config
+from scopus_search import api, constants
+from scopus_search.util.db_manager import DbManager
+from scopus_search.util.metrics import metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the request coalescing of a run")
+    parser.add_argument("--profiles", type=int, default=12, help="Profiles of the cluster, all of them are harvested")
+    parser.add_argument("--papers", type=int, default=60, help="Own papers of every profile")
+    parser.add_argument("--cluster", type=float, default=0.3, help="Probability of two profiles to share a paper")
+    parser.add_argument("--workers", type=int, default=4, help="Authors harvested at once")
+    args = parser.parse_args()
+
+    scopus = SyntheticScopus({author_id: args.papers for author_id in range(1, args.profiles + 1)}, cluster=args.cluster)
+    with tempfile.TemporaryDirectory() as work_dir, \
+            MockScopusServer(scopus, documents_view=False, complete_view=False) as server:
+        # the settings are injected, so nothing is read from or written to the real home directory
+        work_dir = Path(work_dir)
+        constants.CONFIG = get_config(server, work_dir / "memo.db")
+        constants.db_manager = DbManager(str(work_dir / "memo.db"))
+        constants.project_data_dir = constants.cache_dir = work_dir
+
+        start = time.perf_counter()
+        authors = api.get_authors(list(range(1, args.profiles + 1)), workers=args.workers)
+        elapsed = time.perf_counter() - start
+
+        listed = sum(len(scopus.get_papers(author_id)) for author_id in scopus.profiles)
+        unique = len({paper["scopus_id"] for author_id in scopus.profiles for paper in scopus.get_papers(author_id)})
+        print(f"{len(authors)} profiles with {listed:,} listed / {unique:,} unique papers, {args.workers} workers: "
+              f"{elapsed:.2f}s")
+        print(f"abstract retrievals: {server.requests.get('abstract', 0):,} for {unique:,} unique papers, "
+              f"requests by endpoint: {dict(sorted(server.requests.items()))}")
+        saved = {name: count for name, count in metrics.snapshot()["counters"].items() if name.startswith("memo_saved_")}
+        print(f"lookups saved by the run memo: {saved}")
+        constants.db_manager.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Harvests the same authors from the mock Scopus server of benchmarks/mock_scopus.py with a growing pool of api keys
+# and harvesting processes. Every key is paced at --rate requests per second and endpoint (like a real key, the mock
+# server itself is not limited), so a single key bounds the throughput until more keys and processes are added.
+# usage (from the repository root): python -m benchmarks.sharding_benchmark [--authors 24] [--rate 10]
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_scopus import MockScopusServer, SyntheticScopus
+from benchmarks.pipeline_benchmark import get_config
+from scopus_search import api, constants
+from scopus_search.util.db_manager import DbManager
+from scopus_search.util.metrics import metrics
+
+# (api keys, processes, threads per process)
+_SETUPS = [(1, 1, 4), (2, 1, 4), (4, 1, 4), (2, 2, 1), (4, 4, 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks harvesting with several api keys and processes")
+    parser.add_argument("--authors", type=int, default=24, help="Harvested authors")
+    parser.add_argument("--papers", type=int, default=200, help="Papers of every author")
+    parser.add_argument("--rate", type=float, default=10, help="Requests per second and endpoint of one api key")
+    args = parser.parse_args()
+
+    author_ids = list(range(1, args.authors + 1))
+    scopus = SyntheticScopus({author_id: args.papers for author_id in author_ids})
+    print(f"{args.authors} authors with {args.papers} papers, {args.rate:g} requests/s per key and endpoint, "
+          f"{os.cpu_count()} cpus")
+    print(f"{'keys':>4}{'processes':>10}{'threads':>8}{'seconds':>9}{'requests':>9}{'authors/s':>10}{'speedup':>8}"
+          f"  requests per key")
+
+    baseline = None
+    with MockScopusServer(scopus) as server:
+        for keys, processes, workers in _SETUPS:
+            with tempfile.TemporaryDirectory() as work_dir:
+                work_dir = Path(work_dir)
+                config = get_config(server, work_dir / "harvest.db")
+                config["apikey"] = "key-0"
+                config["api_keys"] = [f"key-{key}" for key in range(1, keys)]
+                config["rate_limits"] = {endpoint: args.rate for endpoint in config["rate_limits"]}
+                constants.CONFIG = config
+                # settings are cached once read, the key pool changes between the runs
+                constants.API_KEY, constants.API_KEYS = config["apikey"], config["api_keys"]
+                constants.db_manager = DbManager(str(work_dir / "harvest.db"))
+                constants.project_data_dir = constants.cache_dir = work_dir
+                metrics.reset()
+                server.keys.clear()
+
+                start = time.perf_counter()
+                authors = api.get_authors(author_ids, workers=workers, processes=processes)
+                elapsed = time.perf_counter() - start
+                constants.db_manager.conn.close()
+
+            baseline = baseline or elapsed
+            requests = metrics.snapshot()["counters"].get("http_requests", 0)
+            print(f"{keys:>4}{processes:>10}{workers:>8}{elapsed:>9.2f}{requests:>9,}{len(authors) / elapsed:>10.2f}"
+                  f"{baseline / elapsed:>7.1f}x  {sorted(server.keys.values(), reverse=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Measures the startup cost of `scopus_search --help` with python -X importtime and fails if it exceeds a budget.
+# usage (from the repository root): python -m benchmarks.startup_benchmark [--budget_ms 150] [--runs 5]
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+# modules that must not be imported just to print the help
+HEAVY_MODULES = ["pandas", "numpy", "elsapy", "requests", "questionary", "parse"]
+
+_IMPORT_TIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_once(home_dir: str) -> dict:
+    # a fresh home directory makes sure nothing but the import is measured
+    env = dict(os.environ, HOME=home_dir, PYTHONPATH=os.getcwd())
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "scopus_search.main", "--help"],
+        env=env, capture_output=True, text=True, check=True)
+    wall_time = time.perf_counter() - start
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if match := _IMPORT_TIME_PATTERN.match(line):
+            _, cumulative, indent, module = match.groups()
+            if not indent.strip(" ") and len(indent) == 1:
+                imports[module] = int(cumulative)
+
+    return {
+        "wall_ms": wall_time * 1000,
+        "import_ms": sum(imports.values()) / 1000,
+        "heavy_modules": [module for module in imports if module.split(".")[0] in HEAVY_MODULES],
+        "top_imports": sorted(imports.items(), key=lambda item: item[1], reverse=True)[:5],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the startup of scopus_search --help")
+    parser.add_argument("--budget_ms", type=float, default=150, help="Budget for the import time of the best run")
+    parser.add_argument("--runs", type=int, default=5, help="Number of measured runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home_dir:
+        runs = [measure_once(home_dir) for _ in range(args.runs)]
+        created_files = os.listdir(home_dir)
+
+    best = min(runs, key=lambda run: run["import_ms"])
+    print(f"scopus_search --help: import {best['import_ms']:.1f}ms, wall clock {best['wall_ms']:.1f}ms "
+          f"(best of {args.runs}, budget {args.budget_ms:.0f}ms)")
+    print("slowest top level imports: " + ", ".join(f"{module} {us / 1000:.1f}ms" for module, us in best["top_imports"]))
+
+    failed = False
+    if best["heavy_modules"]:
+        print(f"heavy modules imported: {best['heavy_modules']}")
+        failed = True
+    if created_files:
+        print(f"printing the help created files in the home directory: {created_files}")
+        failed = True
+    if best["import_ms"] > args.budget_ms:
+        print("over budget!")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
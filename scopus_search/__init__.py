@@ -1 +1,3 @@
-__all__ = ["models", "util"]
+from .api import search_authors
+
+__all__ = ["models", "util", "search_authors"]
@@ -0,0 +1,298 @@
+# programmatic entry points, the heavy dependencies (pandas, elsapy) are only imported once they are called
+import sys
+from typing import Iterator, TextIO
+
+from . import constants
+
+
+def get_authors(authors: list, **options) -> list:
+    # options are the ones of iter_author_results
+    return list(iter_authors(authors, **options))
+
+
+def iter_authors(authors: list, **options) -> Iterator:
+    # yields the resolved (and stored) authors in input order, as soon as they are done, failed authors are left out
+    for _, author, _ in iter_author_results(authors, **options):
+        if author is not None:
+            yield author
+
+
+def iter_author_results(authors: list,
+                        by_name: bool = None,
+                        api_key: str = None,
+                        workers: int = 1,
+                        verbose: bool = False,
+                        ask_user_input: bool = False,
+                        input_name_format: str = constants.DEFAULT_NAME_INPUT_FORMAT,
+                        output_name_format: str = constants.DEFAULT_NAME_OUTPUT_FORMAT,
+                        exclude_scopus_ids: list[int] = None,
+                        refresh: str = None,
+                        stale_after_days: float = None,
+                        cache_mode: str = None,
+                        min_document_count: int = None,
+                        affiliation: str = None,
+                        select_profiles=None,
+                        query_plan=None,
+                        processes: int = 1) -> Iterator[tuple]:
+    # yields (author_input, author, error) in input order, failed authors come without author but with the error.
+    # the authors are looked up by name unless all of them are scopus ids, by_name overrides that.
+    # the profiles found for a name are narrowed by min_document_count, affiliation, select_profiles and the user
+    # (ask_user_input, only with a single worker) before any of them is downloaded. with a query_plan
+    # (util.query_plan) only the papers matching its filters are downloaded and loaded.
+    # the requests are spread over the api keys of the config (or api_key), processes > 1 harvests the authors in
+    # that many processes with a share of the keys each (see util.harvesting)
+    from .util.commandline_util import log_and_print_if_verbose
+    from .util.harvesting import get_process_pool, harvest_author, load_harvested_author, make_author_builder
+    from .util.key_pool import get_credentials
+    from .util.scheduler import AuthorScheduler
+
+    credentials = get_credentials(api_key)
+    if not credentials:
+        raise ValueError("Could not find an API key!")
+
+    if not authors:
+        raise ValueError("No author data was input!")
+
+    if processes < 1:
+        raise ValueError("The number of processes has to be at least 1!")
+
+    authors = [str(author) for author in authors]
+    if by_name is None:
+        by_name = not all(author.isnumeric() for author in authors)
+
+    if not by_name:
+        log_and_print_if_verbose(f"Received author scopus ids: {authors}", verbose)
+        author_inputs = authors
+    else:
+        # deduplicated in input order, so the output order is deterministic
+        author_inputs = list(dict.fromkeys(name.lower() for name in authors))
+        log_and_print_if_verbose(f"Received author names: {author_inputs}", verbose)
+
+    builder_options = dict(
+        by_name=by_name,
+        input_name_format=input_name_format,
+        cache_mode=cache_mode,
+        selection=dict(min_document_count=min_document_count, affiliation=affiliation, select_profiles=select_profiles,
+                       interactive=ask_user_input and workers == 1 and processes == 1),
+        verbose=verbose,
+        ask_user_input=ask_user_input,
+        output_format=output_name_format,
+        scopus_ids_to_exclude=exclude_scopus_ids,
+        refresh=refresh,
+        stale_after_days=stale_after_days,
+        query_plan=query_plan
+    )
+
+    if processes == 1:
+        build_author, get_stats = make_author_builder(credentials, **builder_options)
+        yield from AuthorScheduler(build_author, workers=workers, verbose=verbose).iter_results(author_inputs)
+        for name, stats in get_stats().items():
+            log_and_print_if_verbose(f"{name}: {stats}", verbose)
+        return
+
+    log_and_print_if_verbose(f"Harvesting in {processes} processes with {len(credentials)} api keys", verbose)
+    # the harvesting processes read while this process writes
+    constants.db_manager.use_wal()
+    yield from AuthorScheduler(
+        harvest_author, workers=processes, verbose=verbose,
+        executor=get_process_pool(processes, credentials, **builder_options),
+        load_author=load_harvested_author).iter_results(author_inputs)
+
+
+def _iter_output_authors(authors: list, offline: bool, filters: dict, options: dict) -> Iterator:
+    # the year and co-author filters are pushed down into the scopus search and the database queries, offline
+    # authors come from the database alone with the filters applied in sql
+    if not offline:
+        from .util.query_plan import get_query_plan
+        return iter_authors(authors, query_plan=get_query_plan(**filters), **options)
+
+    from .util.offline import iter_offline_authors
+    return iter_offline_authors(authors, **filters, **{
+        name: value for name, value in options.items()
+        if name in ("by_name", "verbose", "input_name_format", "output_name_format", "exclude_scopus_ids")})
+
+
+def search_authors(authors: list,
+                   output_format: str = constants.DEFAULT_OUTPUT_FORMAT,
+                   max_year: int = None,
+                   min_year: int = None,
+                   must_include_authors: list[int] = None,
+                   must_include_all_authors: list[int] = None,
+                   must_not_include_authors: list[int] = None,
+                   title_query: str = None,
+                   venue_query: str = None,
+                   offline: bool = False,
+                   sort_by: list[str] = None,
+                   **options):
+    # resolves the given scopus ids or names, filters their papers and returns them in the given output format.
+    # title_query / venue_query keep the papers matching the full text search over the stored papers (fts5 syntax),
+    # offline builds the authors from the database alone. sort_by orders the papers of every profile ("column" or
+    # "column:desc", newest first by default). options are passed on to get_authors
+    from .util.data_manager import DataManager, OutputFormats
+    from .util.rendering import parse_sort_by
+
+    if output_format.lower() not in OutputFormats.__members__:
+        raise ValueError(f"Unknown output format: {output_format}")
+    # fails before anything is downloaded
+    parse_sort_by(sort_by)
+
+    filters = dict(max_year=max_year, min_year=min_year, include_authors=must_include_authors,
+                   include_all_authors=must_include_all_authors, not_include_authors=must_not_include_authors)
+    data_manager = DataManager(list(_iter_output_authors(authors, offline, filters, options)),
+                               output_formatter=OutputFormats[output_format.lower()], sort_by=sort_by)
+    data_manager.filter_papers(
+        max_year,
+        min_year,
+        must_include_authors or [],
+        must_include_all_authors or [],
+        must_not_include_authors or [],
+        title_query,
+        venue_query,
+    )
+
+    return data_manager.get_output()
+
+
+def stream_authors(authors: list,
+                   file: TextIO = None,
+                   max_year: int = None,
+                   min_year: int = None,
+                   must_include_authors: list[int] = None,
+                   must_include_all_authors: list[int] = None,
+                   must_not_include_authors: list[int] = None,
+                   title_query: str = None,
+                   venue_query: str = None,
+                   offline: bool = False,
+                   sort_by: list[str] = None,
+                   **options) -> int:
+    # like search_authors, but writes every author as one ndjson line per profile to file (stdout by default)
+    # as soon as it is done. returns the number of written authors
+    from .util.data_manager import stream_ndjson
+    from .util.rendering import parse_sort_by
+
+    parse_sort_by(sort_by)
+
+    filters = dict(max_year=max_year, min_year=min_year, include_authors=must_include_authors,
+                   include_all_authors=must_include_all_authors, not_include_authors=must_not_include_authors)
+    return stream_ndjson(
+        _iter_output_authors(authors, offline, filters, options),
+        file or sys.stdout,
+        max_year,
+        min_year,
+        must_include_authors or [],
+        must_include_all_authors or [],
+        must_not_include_authors or [],
+        title_query,
+        venue_query,
+        sort_by,
+    )
+
+
+def write_authors_table(authors: list,
+                        sink,
+                        file_format: str = "parquet",
+                        max_year: int = None,
+                        min_year: int = None,
+                        must_include_authors: list[int] = None,
+                        must_include_all_authors: list[int] = None,
+                        must_not_include_authors: list[int] = None,
+                        title_query: str = None,
+                        venue_query: str = None,
+                        offline: bool = False,
+                        sort_by: list[str] = None,
+                        **options) -> int:
+    # writes the papers of all authors as one flat table to sink (a path or a binary file), in parquet or arrow ipc
+    # format. the authors are written in row groups as soon as they are done, returns the number of written authors
+    from .util.data_manager import stream_table
+    from .util.rendering import parse_sort_by
+
+    parse_sort_by(sort_by)
+
+    filters = dict(max_year=max_year, min_year=min_year, include_authors=must_include_authors,
+                   include_all_authors=must_include_all_authors, not_include_authors=must_not_include_authors)
+    return stream_table(
+        _iter_output_authors(authors, offline, filters, options),
+        sink,
+        file_format,
+        max_year,
+        min_year,
+        must_include_authors or [],
+        must_include_all_authors or [],
+        must_not_include_authors or [],
+        title_query,
+        venue_query,
+        sort_by,
+    )
+
+
+def search_papers(title_query: str = None,
+                  venue_query: str = None,
+                  min_year: int = None,
+                  max_year: int = None,
+                  limit: int = None):
+    # ranked full text search (fts5 syntax) over the titles / venues of all stored papers, without any request.
+    # returns a dataframe with the best match first
+    return constants.db_manager.search_papers(title_query, venue_query, min_year=min_year, max_year=max_year, limit=limit)
+
+
+def get_coauthor_edges(authors: list, hops: int = 1, min_joint_papers: int = 1, offline: bool = False, **options):
+    # co-authorship edge list (source, target, papers) around all scopus profiles of the given authors, built from the
+    # database: hops=1 are the edges to their co-authors, hops=2 adds the edges of those co-authors and so on.
+    # only papers stored in the database are known, so co-authors have the edges of their joint papers with
+    # downloaded authors unless they are downloaded themselves
+    author_ids = [auth.scopus_id for author in _iter_output_authors(authors, offline, {}, options)
+                  for auth in author.scopus_authors]
+    return constants.db_manager.coauthor_graph.get_edges(author_ids, hops=hops, min_papers=min_joint_papers)
+
+
+def run_job(input_file: str,
+            resume: bool = False,
+            chunk_size: int = constants.JOB_CHUNK_SIZE,
+            authors: list = None,
+            **options) -> list[str]:
+    # harvests the authors listed in input_file (and authors) in checkpointed chunks. the job and the status of every
+    # author are stored in the database, so with resume the most recent job of the file continues where it stopped
+    # and only the remaining (or failed) authors are downloaded.
+    # returns the inputs of all completed authors of the job in input order, options are the ones of iter_author_results
+    from .util.commandline_util import log_and_print_if_verbose
+    from .util.jobs import read_author_file, dedupe_author_inputs, get_job_key
+
+    if chunk_size < 1:
+        raise ValueError("The chunk size has to be at least 1!")
+
+    verbose = options.get("verbose", False)
+    author_inputs = dedupe_author_inputs(read_author_file(input_file) + [str(author) for author in authors or []])
+    if not author_inputs:
+        raise ValueError("No author data was input!")
+
+    db_manager = constants.db_manager
+    job_key = get_job_key(input_file)
+    job_id = db_manager.find_job(job_key) if resume else None
+    if job_id is None:
+        job_id = db_manager.create_job(job_key)
+        log_and_print_if_verbose(f"Started job {job_id} for {job_key}", verbose)
+    else:
+        log_and_print_if_verbose(f"Resuming job {job_id} for {job_key}", verbose)
+    db_manager.add_job_entries(job_id, author_inputs)
+
+    # a job either consists of scopus ids or of names, decided over all of its entries like for the commandline
+    job_inputs = db_manager.get_job_entries(job_id, ["pending", "failed", "done"])
+    by_name = not all(author_input.isnumeric() for author_input in job_inputs)
+    remaining = db_manager.get_job_entries(job_id, ["pending", "failed"])
+    log_and_print_if_verbose(f"Job {job_id}: {len(remaining)} authors left to download", verbose)
+
+    for start in range(0, len(remaining), chunk_size):
+        chunk = remaining[start:start + chunk_size]
+        db_manager.update_job_entries(job_id, [
+            (author_input, "failed" if author is None else "done", error)
+            for author_input, author, error in iter_author_results(chunk, by_name=by_name, **options)
+        ])
+        log_and_print_if_verbose(
+            f"Job {job_id}: checkpoint after {min(start + chunk_size, len(remaining))} of {len(remaining)} authors",
+            verbose)
+
+    status_counts = db_manager.get_job_status_counts(job_id)
+    db_manager.finish_job(job_id, "failed" if status_counts.get("failed") else "done")
+    log_and_print_if_verbose(f"Job {job_id} finished: {status_counts}", verbose)
+
+    return db_manager.get_job_entries(job_id, ["done"])
@@ -1,38 +1,103 @@
 import json
-from enum import Enum
+import threading
 from pathlib import Path
 
-from .util.db_manager import DbManager
-
 _user_dir = Path.home()
 project_data_dir = _user_dir / ".scopus_search"
 _resources_dir = project_data_dir / "resources"
 _config_file = project_data_dir / "config.json"
 _default_db_path = _resources_dir / "database.db"
-
-project_data_dir.mkdir(exist_ok=True)
-_resources_dir.mkdir(exist_ok=True)
+cache_dir = project_data_dir / "cache"
 
 DEFAULT_OUTPUT_FORMAT = "json"
 DEFAULT_NAME_INPUT_FORMAT = "{surname}, {given_name}"
 DEFAULT_NAME_OUTPUT_FORMAT = "{surname}, {given_name}"
+# papers of every profile, newest first ("column" or "column:asc|desc", see util.rendering)
+DEFAULT_SORT_BY = ["date:desc"]
+
+# abstract retrievals that run at once when the search results do not include the author lists
+MAX_CONCURRENT_ABSTRACT_LOOKUPS = 4
+
+# authors of a job (--input_file) that are downloaded between two checkpoints
+JOB_CHUNK_SIZE = 100
+
+REFRESH_POLICIES = ["never", "stale", "always"]
+CACHE_MODES = ["off", "read", "readwrite", "only"]
+PROFILE_FORMATS = ["text", "json", "prometheus"]
+
+# the api key written to a new config file, it is not a usable key
+API_KEY_PLACEHOLDER = "<api key>"
+
+# settings from the config file: constant name -> (config key, default value)
+_CONFIG_SETTINGS = {
+    "API_KEY": ("apikey", None),
+    "INST_TOKEN": ("insttoken", None),
+    # further api keys, as strings or {"apikey": ..., "insttoken": ...} objects, requests are spread over all of them
+    "API_KEYS": ("api_keys", []),
+    "DB_PATH": ("db_path", str(_default_db_path)),
+    "DEFAULT_REFRESH_POLICY": ("refresh", "stale"),
+    "STALE_AFTER_DAYS": ("stale_after_days", 7),
+    "DEFAULT_CACHE_MODE": ("cache_mode", "readwrite"),
+    "CACHE_TTLS": ("cache_ttls", {}),
+    "CACHE_MAX_SIZE_MB": ("cache_max_size_mb", 512),
+    # None: the largest page size the api allows for the requested view / no limit
+    "SEARCH_PAGE_SIZE": ("search_page_size", None),
+    "MAX_SEARCH_RESULTS": ("max_search_results", None),
+    # requests per second per endpoint, overriding the defaults of the request governor
+    "RATE_LIMITS": ("rate_limits", {}),
+    "MAX_RETRIES": ("max_retries", 5),
+    # lowest confidence (0 - 1) at which a name is resolved to a stored author instead of searching scopus
+    "NAME_MATCH_THRESHOLD": ("name_match_threshold", 0.85),
+    # requests are sent here instead of https://api.elsevier.com, used by the benchmarks to point at a mock server
+    "API_BASE_URL": ("api_base_url", None),
+}
+
+_lazy_lock = threading.Lock()
+
+
+def _load_config() -> dict:
+    project_data_dir.mkdir(exist_ok=True)
+    _resources_dir.mkdir(exist_ok=True)
+
+    if _config_file.exists():
+        with open(str(_config_file)) as file:
+            return json.load(file)
 
-if _config_file.exists():
-    with open(str(_config_file)) as file:
-        CONFIG = json.load(file)
-        file.close()
-else:
     _default_settings = {
-        "apikey": "<api key>"
+        "apikey": API_KEY_PLACEHOLDER
     }
 
     with open(str(_config_file), "w") as file:
         json.dump(_default_settings, file)
-        file.close()
 
-    CONFIG = {}
+    return {}
+
+
+# the config file, the data directories and the database are only touched once CONFIG, one of the
+# _CONFIG_SETTINGS or db_manager is accessed for the first time, importing the package has no side effects
+def __getattr__(name: str):
+    if name not in _CONFIG_SETTINGS and name not in ("CONFIG", "db_manager"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with _lazy_lock:
+        if name in globals():
+            return globals()[name]
+
+        if name == "CONFIG":
+            value = _load_config()
+        elif name == "db_manager":
+            from .util.db_manager import DbManager
+            value = DbManager(_get_setting("DB_PATH"))
+        else:
+            value = _get_setting(name)
+
+        globals()[name] = value
+        return value
+
 
-API_KEY = CONFIG["apikey"] if "apikey" in CONFIG else None
-DB_PATH = CONFIG["db_path"] if "db_path" in CONFIG else str(_default_db_path)
+def _get_setting(name: str):
+    if "CONFIG" not in globals():
+        globals()["CONFIG"] = _load_config()
 
-db_manager = DbManager(DB_PATH)
+    key, default = _CONFIG_SETTINGS[name]
+    return globals()["CONFIG"].get(key, default)
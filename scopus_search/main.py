@@ -1,104 +1,227 @@
 import argparse
-import traceback
-
-from elsapy.elsclient import ElsClient
+import sys
 
 from . import constants
-from .models.author import Author
-from .util.data_manager import DataManager, OutputFormats
-from .util.commandline_util import log_and_print_if_verbose
-
-parser = argparse.ArgumentParser(
-    prog="scopus-search",
-    description="Utility to search and normalize author data found through the Scopus API.")
-
-parser.add_argument("--verbose", action="store_true", help="Verbose output")
-parser.add_argument("--no_input", action="store_true", help="Dont ask the user for input")
-parser.add_argument("--api_key", action="store", type=str, help="Sets the API key to use")
-
-parser.add_argument("--output_format", action="store", type=str, help="Defines the output file type")
-parser.add_argument("--input_name_format", action="store", type=str, help="Defines the input format for author names")
-parser.add_argument("--output_name_format", action="store", type=str, help="Defines the output format for author names")
-
-parser.add_argument("--max_year", action="store", type=int, help="Filters papers by year (upper bound)")
-parser.add_argument("--min_year", action="store", type=int, help="Filters papers by year (lower bound)")
-
-parser.add_argument("--must_include_authors", action="store", nargs="+", type=int,
-                    help="Only papers with one or more of the given authors will be taken into account")
-parser.add_argument("--must_not_include_authors", action="store", nargs="+", type=int,
-                    help="Only papers without all of the given authors will be taken into account")
-parser.add_argument("--must_include_all_authors", action="store", nargs="+", type=int,
-                    help="Only papers with all the given authors will be taken into account")
-
-parser.add_argument("--exclude_scopus_ids", action="store", nargs="+", type=int,
-                    help="Excludes all given scopus ids from search")
-
-args, author_data = parser.parse_known_args()
-
-api_key = args.api_key or constants.API_KEY
-input_name_format = args.input_name_format or constants.DEFAULT_NAME_INPUT_FORMAT
-output_name_format = args.output_name_format or constants.DEFAULT_NAME_OUTPUT_FORMAT
-
-output_format = constants.DEFAULT_OUTPUT_FORMAT
-if args.output_format and (args.output_format.lower() in [form.name for form in OutputFormats]):
-    output_format = args.output_format.lower()
-
-output_formatter = OutputFormats.__getitem__(output_format)
-
-
-def main():
-    if not api_key:
-        raise ValueError("Could not find an API key!")
-
-    if not author_data:
-        raise ValueError("No author data was input!")
-
-    authors = []
-    els_client = ElsClient(api_key)
-    els_client.local_dir = constants.project_data_dir
-    if all(author.isnumeric() for author in author_data):
-        log_and_print_if_verbose(f"Received author scopus ids: {author_data}", args.verbose)
-        for author_id in author_data:
-            try:
-                authors.append(Author(
-                    els_client,
-                    verbose=args.verbose,
-                    ask_user_input=args.no_input,
-                    scopus_id=int(author_id),
-                    output_format=output_name_format,
-                    scopus_ids_to_exclude = args.exclude_scopus_ids
-                ))
-            except Exception as e:
-                log_and_print_if_verbose(f"Error!, ran into exception:\n {traceback.format_exc()} \nwhile working on author: {author_id}\ncontinuing to next entry\n\n", args.verbose)
-    else:
-        authors_names = set([name.lower() for name in author_data])
-        log_and_print_if_verbose(f"Received author names: {authors_names}", args.verbose)
-        for author_name in authors_names:
-            try:
-                authors.append(Author(
-                els_client,
-                verbose=args.verbose,
-                ask_user_input=args.no_input,
-                full_name=author_name,
-                input_format=input_name_format,
-                output_format=output_name_format,
-                scopus_ids_to_exclude=args.exclude_scopus_ids
-                ))
-            except Exception as e:
-                log_and_print_if_verbose(f"Error!, ran into exception:\n {traceback.format_exc()} \nwhile working on author: {author_name}\ncontinuing to next entry\n\n", args.verbose)
-
-    data_manager = DataManager(authors, output_formatter=output_formatter)
-
-    data_manager.filter_papers(
-        args.max_year,
-        args.min_year,
-        args.must_include_authors,
-        args.must_include_all_authors,
-        args.must_not_include_authors,
+
+
+# pandas and elsapy are only imported after the arguments are parsed, so printing the help stays fast
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="scopus-search",
+        description="Utility to search and normalize author data found through the Scopus API.")
+
+    parser.add_argument("--verbose", action="store_true", help="Verbose output")
+    parser.add_argument("--no_input", action="store_true", help="Dont ask the user for input")
+    parser.add_argument("--api_key", action="store", type=str, help="Sets the API key to use")
+    parser.add_argument("--cache_mode", "--cache-mode", action="store", choices=constants.CACHE_MODES,
+                        help="How the on-disk cache of Scopus responses is used, 'only' never sends requests")
+    parser.add_argument("--refresh", action="store", choices=constants.REFRESH_POLICIES,
+                        help="When authors stored in the database are synced with scopus again")
+    parser.add_argument("--stale_after_days", action="store", type=float,
+                        help="Days after which a stored author counts as stale (used by --refresh stale)")
+    parser.add_argument("--workers", action="store", type=int, default=1,
+                        help="Number of authors that are downloaded concurrently")
+    parser.add_argument("--processes", action="store", type=int, default=1,
+                        help="Harvests the authors in that many processes, the api keys of the config are shared "
+                             "out among them (--workers is ignored then)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Builds the authors from the database alone without any request, fails for authors "
+                             "that are not stored")
+    parser.add_argument("--input_file", action="store", type=str,
+                        help="Runs a job for the authors (scopus ids or names, one per line) of the given file")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continues the last job of --input_file, authors it completed are not downloaded again")
+    parser.add_argument("--chunk_size", action="store", type=int, default=constants.JOB_CHUNK_SIZE,
+                        help="Authors of a job that are downloaded between two checkpoints")
+
+    parser.add_argument("--output_format", action="store", type=str,
+                        help="Defines the output file type, ndjson, parquet and arrow stream every author as soon as it is done")
+    parser.add_argument("--output_file", action="store", type=str, help="Writes the output to the given file")
+    parser.add_argument("--sort_by", action="store", nargs="+", type=str,
+                        help="Sorts the papers of every profile by the given columns, 'column' or 'column:desc' "
+                             "(default: date:desc)")
+    parser.add_argument("--coauthor_edges", action="store_true",
+                        help="Outputs the co-authorship edges (source, target, joint papers) around the authors as csv")
+    parser.add_argument("--hops", action="store", type=int, default=1,
+                        help="Co-authorship hops from the authors that --coauthor_edges covers")
+    parser.add_argument("--min_joint_papers", action="store", type=int, default=1,
+                        help="Leaves out --coauthor_edges of authors with fewer joint papers")
+    parser.add_argument("--input_name_format", action="store", type=str, help="Defines the input format for author names")
+    parser.add_argument("--output_name_format", action="store", type=str, help="Defines the output format for author names")
+
+    parser.add_argument("--max_year", action="store", type=int, help="Filters papers by year (upper bound)")
+    parser.add_argument("--min_year", action="store", type=int, help="Filters papers by year (lower bound)")
+
+    parser.add_argument("--must_include_authors", action="store", nargs="+", type=int,
+                        help="Only papers with one or more of the given authors will be taken into account")
+    parser.add_argument("--must_not_include_authors", action="store", nargs="+", type=int,
+                        help="Only papers without all of the given authors will be taken into account")
+    parser.add_argument("--must_include_all_authors", action="store", nargs="+", type=int,
+                        help="Only papers with all the given authors will be taken into account")
+
+    parser.add_argument("--title_query", action="store", type=str,
+                        help="Only papers whose title matches the full text query (fts5 syntax) are taken into account, "
+                             "without authors all stored papers are searched")
+    parser.add_argument("--venue_query", action="store", type=str,
+                        help="Like --title_query for the publication name")
+    parser.add_argument("--search_limit", action="store", type=int,
+                        help="Maximum number of papers returned by --title_query / --venue_query without authors")
+
+    parser.add_argument("--exclude_scopus_ids", action="store", nargs="+", type=int,
+                        help="Excludes all given scopus ids from search")
+    parser.add_argument("--min_document_count", action="store", type=int,
+                        help="Leaves out profiles found for a name with fewer documents, before they are downloaded")
+    parser.add_argument("--affiliation", action="store", type=str,
+                        help="Only keeps profiles found for a name whose current affiliation contains the given text "
+                             "(or has the given affiliation id)")
+
+    parser.add_argument("--profile", action="store", nargs="?", const="text", choices=constants.PROFILE_FORMATS,
+                        help="Reports the time spent per stage and the request / database counters after the run")
+    parser.add_argument("--profile_file", action="store", type=str,
+                        help="Writes the --profile report to the given file instead of stderr")
+    parser.add_argument("--cprofile_dir", action="store", type=str,
+                        help="Runs every author under cProfile and stores the stats in the given directory")
+    parser.add_argument("--trace_memory", action="store_true",
+                        help="Traces the peak memory of every author with tracemalloc (reported by --profile)")
+    parser.add_argument("--log_file", action="store", type=str, help="Writes structured (json lines) logs to the given file")
+
+    return parser
+
+
+def main(argv: list[str] = None):
+    args, author_data = _build_parser().parse_known_args(argv)
+
+    from .api import get_coauthor_edges, run_job, search_authors, search_papers, stream_authors, write_authors_table
+    from .util.commandline_util import setup_logging
+    from .util.data_manager import OutputFormats
+    from .util.metrics import metrics
+
+    if args.log_file:
+        setup_logging(args.log_file)
+    metrics.configure(detailed=args.profile is not None, cprofile_dir=args.cprofile_dir, trace_memory=args.trace_memory)
+
+    output_format = constants.DEFAULT_OUTPUT_FORMAT
+    if args.output_format and (args.output_format.lower() in OutputFormats.__members__):
+        output_format = args.output_format.lower()
+
+    filters = dict(
+        max_year=args.max_year,
+        min_year=args.min_year,
+        must_include_authors=args.must_include_authors,
+        must_include_all_authors=args.must_include_all_authors,
+        must_not_include_authors=args.must_not_include_authors,
+        title_query=args.title_query,
+        venue_query=args.venue_query,
+    )
+    options = dict(
+        api_key=args.api_key,
+        workers=args.workers,
+        processes=args.processes,
+        verbose=args.verbose,
+        ask_user_input=not args.no_input,
+        input_name_format=args.input_name_format or constants.DEFAULT_NAME_INPUT_FORMAT,
+        output_name_format=args.output_name_format or constants.DEFAULT_NAME_OUTPUT_FORMAT,
+        exclude_scopus_ids=args.exclude_scopus_ids,
+        refresh=args.refresh,
+        stale_after_days=args.stale_after_days,
+        cache_mode=args.cache_mode,
+        min_document_count=args.min_document_count,
+        affiliation=args.affiliation,
     )
 
-    from pprint import pprint
-    pprint(data_manager.get_output())
+    if not author_data and not args.input_file and (args.title_query or args.venue_query):
+        # without authors the full text search runs over all stored papers, no requests are sent
+        papers = search_papers(args.title_query, args.venue_query, args.min_year, args.max_year, args.search_limit)
+        _write_papers(papers, output_format, args.output_file, args.sort_by)
+        _write_profile(args, metrics)
+        return
+
+    if args.offline:
+        # no job is needed, nothing is downloaded
+        if args.input_file:
+            from .util.jobs import read_author_file
+            author_data = read_author_file(args.input_file) + author_data
+        options["offline"] = True
+    elif args.input_file:
+        # the job downloads and stores every author, the output is then built from the database alone
+        author_data = run_job(args.input_file, resume=args.resume, chunk_size=args.chunk_size, authors=author_data, **options)
+        if not author_data:
+            raise ValueError("None of the authors of the job could be downloaded!")
+        options["offline"] = True
+
+    if args.coauthor_edges:
+        edges = get_coauthor_edges(author_data, hops=args.hops, min_joint_papers=args.min_joint_papers, **options)
+        edges.to_csv(args.output_file or sys.stdout, index=False)
+        _write_profile(args, metrics)
+        return
+
+    if output_format in ("parquet", "arrow"):
+        # binary formats are streamed to the file (or stdout) directly
+        write_authors_table(author_data, args.output_file or sys.stdout.buffer, output_format, sort_by=args.sort_by,
+                            **filters, **options)
+        _write_profile(args, metrics)
+        return
+
+    output_file = open(args.output_file, "w") if args.output_file else sys.stdout
+    try:
+        if output_format == "ndjson":
+            stream_authors(author_data, output_file, sort_by=args.sort_by, **filters, **options)
+        else:
+            output = search_authors(author_data, output_format=output_format, sort_by=args.sort_by, **filters,
+                                    **options)
+            _write_output(output, output_format, output_file)
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    _write_profile(args, metrics)
+
+
+def _write_output(output, output_format: str, file):
+    # the text formats are rendered in one piece, json is written as json instead of the python repr
+    if isinstance(output, str):
+        file.write(output if output.endswith("\n") else output + "\n")
+    elif output_format == "json":
+        from .util.rendering import to_json
+        file.write(to_json(output) + "\n")
+    else:
+        from pprint import pprint
+        pprint(output, stream=file)
+
+
+def _write_papers(papers, output_format: str, output_file: str = None, sort_by: list[str] = None):
+    from .util import rendering
+
+    # ranked by the full text search unless sort_by is given
+    if sort_by:
+        papers = rendering.sort_papers(papers, sort_by)
+
+    file = open(output_file, "w") if output_file else sys.stdout
+    try:
+        if output_format == "ndjson":
+            papers.to_json(file, orient="records", lines=True)
+        elif output_format == "csv":
+            file.write(rendering.get_csv(papers))
+        elif output_format in ("md", "markdown"):
+            file.write(rendering.get_markdown_table(papers) + "\n")
+        else:
+            _write_output(papers if output_format in ("dataframe", "df") else papers.to_dict("records"),
+                          output_format, file)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+
+def _write_profile(args: argparse.Namespace, metrics):
+    if not args.profile:
+        return
+
+    report = metrics.get_report(args.profile)
+    if args.profile_file:
+        with open(args.profile_file, "w") as file:
+            file.write(report)
+    else:
+        print(report, file=sys.stderr)
 
 
 if __name__ == "__main__":
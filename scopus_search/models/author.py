@@ -1,11 +1,15 @@
+from typing import Callable
+
 import pandas as pd
 from parse import parse
 from elsapy.elsclient import ElsClient
 from elsapy.elsprofile import ElsAuthor
-from elsapy.elssearch import ElsSearch
 
 from .scopus_author import ScopusAuthor
 from ..util.commandline_util import log_and_print_if_verbose
+from ..util.metrics import metrics
+from ..util.paginated_search import PaginatedSearch
+from ..util.query_plan import QueryPlan
 from .. import constants as const
 
 
@@ -25,20 +29,30 @@ class Author:
                  full_name: str = None,
                  given_name: str = None,
                  scopus_ids_to_exclude: list = None,
-                 verbose: bool = False, ask_user_input: bool = False,
-                 input_format: str = const.DEFAULT_NAME_INPUT_FORMAT, output_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT):
+                 verbose: bool = False, ask_user_input: bool = False, defer_save: bool = False,
+                 input_format: str = const.DEFAULT_NAME_INPUT_FORMAT, output_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT,
+                 refresh: str = None, stale_after_days: float = None,
+                 select_profiles: Callable[[list[ScopusAuthor]], list[ScopusAuthor]] = None,
+                 query_plan: QueryPlan = None):
+        # select_profiles picks the profiles of an author search to keep before any of them is downloaded,
+        # see util.profile_selection. with a query plan only the papers matching its filters are fetched
         self.verbose = verbose
+        self.refresh = refresh or const.DEFAULT_REFRESH_POLICY
+        self.stale_after_days = stale_after_days if stale_after_days is not None else const.STALE_AFTER_DAYS
         self.output_format = output_format
         self.ask_user_input = ask_user_input
         self._els_client = client
         self._ids_to_exclude = scopus_ids_to_exclude or []
+        self._select_profiles = select_profiles
+        self._query_plan = query_plan
 
         if not (scopus_id or full_name or (given_name and surname)):
             raise ValueError("Did not receive scopus id or full name or first and last names of the author")
 
         if scopus_id:
             self.scopus_authors = [
-                ScopusAuthor(client, scopus_id, output_format=output_format, verbose=verbose, ask_user_input=ask_user_input)]
+                ScopusAuthor(client, scopus_id, output_format=output_format, verbose=verbose, ask_user_input=ask_user_input,
+                             refresh=self.refresh, stale_after_days=self.stale_after_days, query_plan=query_plan)]
         else:
             if full_name:
                 given_name, surname = _extract_names_from_full_name(full_name, input_format)
@@ -49,44 +63,76 @@ class Author:
                 raise ValueError("Could not find any authors or excluded too many!")
 
         self.base_author = self.scopus_authors[0]
-        self._save_to_db()
+        # the papers of the kept profiles are loaded here, on the thread building the author
+        for author in self.scopus_authors:
+            author.load_papers()
+
+        # deferred saves are written later by a single writer, see util.scheduler
+        if not defer_save:
+            self.save_to_db()
+
+    @classmethod
+    def from_db(cls, scopus_authors: list[ScopusAuthor], verbose: bool = False,
+                output_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT) -> "Author":
+        # an author built from stored profiles (base author first) without any request, see util.offline
+        author = cls.__new__(cls)
+        author.verbose = verbose
+        author.refresh = "never"
+        author.stale_after_days = const.STALE_AFTER_DAYS
+        author.output_format = output_format
+        author.ask_user_input = False
+        author._els_client = None
+        author._ids_to_exclude = []
+        author._select_profiles = None
+        author._query_plan = None
+        author.scopus_authors = scopus_authors
+        author.base_author = scopus_authors[0]
+        return author
 
     def filter_papers(self,
                       max_year: int = None,
                       min_year: int = None,
                       include_authors: list[int] = [],
                       include_all_authors: list[int] = [],
-                      not_include_authors: list[int] = []):
+                      not_include_authors: list[int] = [],
+                      title_query: str = None,
+                      venue_query: str = None):
         for author in self.scopus_authors:
-            if max_year or min_year or include_authors or include_all_authors or not_include_authors:
+            if max_year or min_year or include_authors or include_all_authors or not_include_authors or title_query \
+                    or venue_query:
                 log_and_print_if_verbose(
                     f"Filtering papers for author: {author.given_name} {author.surname}({author.scopus_id})",
                     self.verbose)
-            author.filter_papers(max_year, min_year, include_authors, include_all_authors, not_include_authors)
+            author.filter_papers(max_year, min_year, include_authors, include_all_authors, not_include_authors,
+                                 title_query, venue_query)
 
     def _get_scopus_authors_by_name(self, given_name: str, surname: str) -> list[ScopusAuthor]:
         log_and_print_if_verbose(
             f"Finding scopus_id by first ({given_name}) and last ({surname}) name",
             self.verbose)
 
-        if const.db_manager.find_author_by_name(given_name, surname):
+        # stored authors are matched by their normalized name (case, accents, initials) and a fuzzy fallback
+        with metrics.stage("name_resolution"):
+            base_id = const.db_manager.name_index.resolve(given_name, surname, const.NAME_MATCH_THRESHOLD)
+
+        if base_id is not None:
+            metrics.count("name_index_hits")
             return [
                 ScopusAuthor(
                     client=self._els_client,
                     scopus_id=author.scopus_id,
                     given_name=author.given_name,
                     surname=author.surname,
-                    output_format=self.output_format, verbose=self.verbose, ask_user_input=self.ask_user_input
-                ) for author in const.db_manager.get_author_scopus_ids(
-                    int(const.db_manager.get_scopus_author(given_name=given_name, surname=surname)["scopus_id"][0])
-                ).itertuples() if author.scopus_id not in self._ids_to_exclude
+                    output_format=self.output_format, verbose=self.verbose, ask_user_input=self.ask_user_input,
+                    refresh=self.refresh, stale_after_days=self.stale_after_days, query_plan=self._query_plan
+                ) for author in const.db_manager.get_author_scopus_ids(base_id).itertuples()
+                if author.scopus_id not in self._ids_to_exclude
             ]
+        metrics.count("name_index_misses")
 
         query = f"AUTHFIRST({given_name}) AND AUTHLASTNAME({surname})"
-        search = ElsSearch(query, index="author")
-
         try:
-            search.execute(self._els_client)
+            results = PaginatedSearch(self._els_client, query, index="author").get_results()
         except Exception:
             # TODO: consider workaround thorough the scopus api
             # query = f"AUTHOR-NAME({self.surname}, {self.given_name[:1]})"
@@ -97,34 +143,46 @@ class Author:
             #    raise ValueError("Could not find author scopus id, please check your api key permissions")
             raise ValueError("Could not find author scopus id, please check your api key permissions")
 
-        if not getattr(search, "results") or "error" in search.results[0].keys():
+        if not results:
             raise ValueError("Could not find author scopus id, please check your api key permissions")
 
-        if len(search.results) == 1:
-            scopus_id = search.results[0]["dc:identifier"].replace("AUTHOR_ID:", "")
-            log_and_print_if_verbose(f"Found one exact match for author: {given_name} {surname} -> {scopus_id}", self.verbose)
-        else:
-            log_and_print_if_verbose(f"Found multiple matches for author: {given_name} {surname}, downloading all of them...", self.verbose)
-
-        return [
+        # the profiles only carry the metadata of their search entry, nothing is downloaded before the selection
+        profiles = [
             ScopusAuthor(
                 self._els_client,
                 scopus_id=scopus_id,
-                output_format=self.output_format, verbose=self.verbose, ask_user_input=self.ask_user_input)
-            for scopus_id in [int(entry["dc:identifier"].replace("AUTHOR_ID:", "")) for entry in search.results]
+                output_format=self.output_format, verbose=self.verbose, ask_user_input=self.ask_user_input,
+                refresh=self.refresh, stale_after_days=self.stale_after_days, search_entry=entry,
+                query_plan=self._query_plan)
+            for scopus_id, entry in ((int(entry["dc:identifier"].replace("AUTHOR_ID:", "")), entry) for entry in results)
+            if scopus_id not in self._ids_to_exclude
         ]
-
-    def _save_to_db(self):
+        if self._select_profiles:
+            selected = self._select_profiles(profiles)
+            log_and_print_if_verbose(
+                f"Selected {len(selected)} of {len(profiles)} profiles found for {given_name} {surname}", self.verbose)
+            profiles = selected
+
+        if len(profiles) == 1:
+            log_and_print_if_verbose(
+                f"Found one exact match for author: {given_name} {surname} -> {profiles[0].scopus_id}", self.verbose)
+        elif profiles:
+            log_and_print_if_verbose(
+                f"Found multiple matches for author: {given_name} {surname}, downloading all of them...", self.verbose)
+        return profiles
+
+    def save_to_db(self):
         log_and_print_if_verbose(f"Saving author: {self.base_author.given_name} {self.base_author.surname} ({self.base_author.scopus_id}) and papers to database...\n", self.verbose)
-        for author in self.scopus_authors:
-            if not const.db_manager.find_author(author.scopus_id):
-                base_id = None if author is self.base_author \
-                    else self.base_author.scopus_id
-
-                const.db_manager.insert_scopus_author(
-                    base_id=base_id,
-                    given_name=author.given_name,
-                    surname=author.surname,
-                    scopus_id=author.scopus_id)
-
-            const.db_manager.insert_paper_df(author.papers)
+        with const.db_manager.transaction():
+            # the papers of partially downloaded profiles are stored, the profiles themselves are not, so the next
+            # run without filters downloads them completely
+            const.db_manager.insert_scopus_authors([
+                (author.scopus_id, author.given_name, author.surname,
+                 None if author is self.base_author else self.base_author.scopus_id)
+                for author in self.scopus_authors if not author.partial
+            ])
+
+            for author in self.scopus_authors:
+                const.db_manager.insert_paper_df(author.papers)
+
+            const.db_manager.update_sync_state([author.scopus_id for author in self.scopus_authors if author.synced])
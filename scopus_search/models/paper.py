@@ -1,15 +1,21 @@
 from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
-from itertools import groupby
+import requests
+from itertools import chain, groupby
 from elsapy.elsdoc import AbsDoc
 from elsapy.elsclient import ElsClient
-from elsapy.elssearch import ElsSearch
 
 from .. import constants as const
+from ..util.commandline_util import log_and_print_if_verbose
+from ..util.metrics import metrics
+from ..util.paginated_search import PaginatedSearch
+from ..util.paper_filter import get_pub_years
+from ..util.run_memo import get_memo
 
-DB_COLUMNS = ["scopus_id", "date", "title", "origin", "authors", "from_db", "issn", "issue_id", "page_range", "eid", "isbn", "publication_name"]
+DB_COLUMNS = ["scopus_id", "date", "pub_year", "title", "origin", "authors", "from_db", "issn", "issue_id", "page_range", "eid", "isbn", "publication_name"]
 COLUMNS = DB_COLUMNS + ["affiliation"]
 
 def get_paper_authors(df: pd.DataFrame, els_client: ElsClient, author_scopus_id: int) -> tuple:
@@ -17,69 +23,178 @@ def get_paper_authors(df: pd.DataFrame, els_client: ElsClient, author_scopus_id:
     if db_authors:
         return db_authors
 
-    doc = AbsDoc(scp_id=df.scopus_id)
-    if doc.read(els_client) and "authors" in doc.data:
-        return tuple([int(author["@auid"]) for author in doc.data["authors"]["author"]]) or tuple([author_scopus_id])
+    return _read_paper_authors(df.scopus_id, els_client, author_scopus_id)
 
-    # we cant find paper authors without using the author index, so we only include the author we know
-    return tuple([author_scopus_id])
 
+def get_papers_authors(papers: pd.DataFrame, els_client: ElsClient, author_scopus_id: int,
+                       max_workers: int = const.MAX_CONCURRENT_ABSTRACT_LOOKUPS) -> (pd.Series, int):
+    # batched get_paper_authors: one database query for all papers, abstract retrievals only for the unknown ones.
+    # returns the authors and the number of papers that were looked up
+    authors = papers["scopus_id"].map(const.db_manager.get_authors_of_papers(papers["scopus_id"])).astype(object)
 
-# searches the scopus index instead of the authors index, thus paper information might be limited
-def get_papers_from_author_by_scopus_search(
-        els_client: ElsClient,
-        author_scopus_id: int,
-        min_year: int = None,
-        max_year: int = None) -> (pd.DataFrame, list):
-    query = f"AU-ID({author_scopus_id})"
+    missing = authors.isna()
+    if missing.any():
+        authors[missing] = pd.Series(
+            _get_missing_paper_authors(papers.loc[missing, "scopus_id"], els_client, author_scopus_id, max_workers),
+            index=authors.index[missing], dtype=object)
+    return authors, int(missing.sum())
 
-    if max_year:
-        query += f" AND PUBYEAR > {max_year - 1}"
-    if min_year:
-        query += f" AND PUBYEAR < {min_year + 1}"
 
-    search = ElsSearch(query, index="scopus")
-    search.execute(els_client)
+def _read_paper_authors(paper_scopus_id: int, els_client: ElsClient, author_scopus_id: int) -> tuple:
+    # the abstract of a paper is read once per run, however many profiles list it
+    authors = get_memo(els_client).get(
+        "paper_authors", int(paper_scopus_id), lambda: _read_abstract_authors(paper_scopus_id, els_client))
 
-    if search.results and not ("error" in search.results[0].keys()):
-        df = pd.DataFrame(search.results)
+    # we cant find paper authors without using the author index, so we only include the author we know
+    return authors or tuple([author_scopus_id])
 
-        author_guesses = [(uniq, len(list(dups))) for uniq, dups in groupby(sorted(df["dc:creator"].to_list()))]
-        author_guesses.sort(key=itemgetter(1), reverse=True)
-        author_guesses = [f"[{count}] {name}" for name, count in author_guesses]
 
-        df["origin"] = "search_api"
-        df["scopus_id"] = df["dc:identifier"].str.replace("SCOPUS_ID:", "").astype(np.int64)
+def _read_abstract_authors(paper_scopus_id: int, els_client: ElsClient) -> tuple | None:
+    doc = AbsDoc(scp_id=paper_scopus_id)
+    with metrics.stage("abstract_lookup"):
+        doc_read = doc.read(els_client)
+    if doc_read and "authors" in doc.data:
+        return tuple([int(author["@auid"]) for author in doc.data["authors"]["author"]]) or None
+    return None
 
-        necessary_columns = [
-            "dc:title", "eid", "affiliation",
-            "prism:coverDate", "prism:pageRange", "prism:issueIdentifier", "prism:issn", "prism:isbn", "prism:publicationName"]
-        df = df.reindex(df.columns.union(necessary_columns, sort=False), axis=1, fill_value=None)
 
-        df.rename(columns={
-            "dc:title": "title",
-            "prism:issn": "issn",
-            "prism:isbn": "isbn",
-            "prism:coverDate": "date",
-            "prism:pageRange": "page_range",
-            "prism:issueIdentifier": "issue_id",
-            "prism:publicationName": "publication_name"
-        }, inplace=True)
+def _authors_from_search_entry(entry_authors) -> tuple | None:
+    # the complete view of the search api lists the authors of every entry
+    if type(entry_authors) is not list:
+        return None
 
-        df["from_db"] = df.apply(
-            lambda paper: const.db_manager.find_paper(paper.scopus_id), axis=1)
+    return tuple(dict.fromkeys(
+        int(author["authid"]) for author in entry_authors if str(author.get("authid", "")).isdigit()
+    )) or None
 
-        df["authors"] = df.apply(lambda paper: get_paper_authors(paper, els_client, author_scopus_id), axis=1)
 
-        return df[COLUMNS].sort_values(by=['date']), author_guesses
+def _get_missing_paper_authors(paper_scopus_ids: pd.Series, els_client: ElsClient, author_scopus_id: int,
+                               max_workers: int) -> list:
+    # the remaining abstract retrievals run concurrently, at most max_workers at a time
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            lambda paper_scopus_id: _read_paper_authors(paper_scopus_id, els_client, author_scopus_id),
+            paper_scopus_ids.tolist()))
 
-    return pd.DataFrame(), []
 
+# searches the scopus index instead of the authors index, thus paper information might be limited
+def get_papers_from_author_by_scopus_search(
+        els_client: ElsClient,
+        author_scopus_id: int,
+        min_year: int = None,
+        max_year: int = None,
+        sort: str = None,
+        clauses: list[str] = None,
+        bulk_authors: bool = True,
+        max_concurrent_lookups: int = const.MAX_CONCURRENT_ABSTRACT_LOOKUPS,
+        verbose: bool = False) -> (pd.DataFrame, list):
+    query = f"AU-ID({author_scopus_id})"
 
-def paper_df_from_db_entry(df: pd.DataFrame) -> pd.DataFrame:
-    df["authors"] = const.db_manager.get_paper_authors(df["scopus_id"])
+    if min_year:
+        query += f" AND PUBYEAR > {min_year - 1}"
+    if max_year:
+        query += f" AND PUBYEAR < {max_year + 1}"
+    # further conditions, e.g. the filters pushed down by util.query_plan
+    for clause in clauses or []:
+        query += f" AND {clause}"
+
+    if bulk_authors:
+        try:
+            pages = PaginatedSearch(els_client, query, index="scopus", view="COMPLETE", sort=sort).iter_pages()
+            first_page = next(pages, [])
+        except requests.HTTPError:
+            log_and_print_if_verbose(
+                "The complete search view is not available for this api key, falling back to abstract retrievals",
+                verbose)
+            bulk_authors = False
+
+    if not bulk_authors:
+        pages = PaginatedSearch(els_client, query, index="scopus", sort=sort).iter_pages()
+        first_page = next(pages, [])
+
+    # every page is processed (including its abstract retrievals) while the next one is downloading
+    frames, looked_up, saved = [], 0, 0
+    for page in chain([first_page], pages):
+        if page:
+            df, looked_up_count, saved_count = _get_search_page_papers(page, els_client, author_scopus_id,
+                                                                       max_concurrent_lookups)
+            frames.append(df)
+            looked_up += looked_up_count
+            saved += saved_count
+
+    if not frames:
+        return pd.DataFrame(), []
+
+    df = pd.concat(frames, ignore_index=True)
+
+    author_guesses = [(uniq, len(list(dups))) for uniq, dups in groupby(sorted(df["dc:creator"].dropna().to_list()))]
+    author_guesses.sort(key=itemgetter(1), reverse=True)
+    author_guesses = [f"[{count}] {name}" for name, count in author_guesses]
+
+    if bulk_authors:
+        log_and_print_if_verbose(
+            f"Read the author lists of {len(df) - looked_up} papers from the search results and the database, "
+            f"saved {saved} abstract retrievals ({looked_up} papers left to look up)",
+            verbose)
+
+    return df[COLUMNS].sort_values(by=['date']), author_guesses
+
+
+def _get_search_page_papers(entries: list, els_client: ElsClient, author_scopus_id: int,
+                            max_concurrent_lookups: int) -> (pd.DataFrame, int, int):
+    # the papers of a search page, the number of its papers whose authors had to be looked up and the number of
+    # abstract retrievals saved by the author lists of the page (papers stored before never needed one)
+    df = pd.DataFrame(entries)
+
+    df["origin"] = "search_api"
+    df["scopus_id"] = df["dc:identifier"].str.replace("SCOPUS_ID:", "").astype(np.int64)
+
+    necessary_columns = [
+        "dc:title", "dc:creator", "eid", "affiliation",
+        "prism:coverDate", "prism:pageRange", "prism:issueIdentifier", "prism:issn", "prism:isbn", "prism:publicationName"]
+    df = df.reindex(df.columns.union(necessary_columns, sort=False), axis=1, fill_value=None)
+
+    df.rename(columns={
+        "dc:title": "title",
+        "prism:issn": "issn",
+        "prism:isbn": "isbn",
+        "prism:coverDate": "date",
+        "prism:pageRange": "page_range",
+        "prism:issueIdentifier": "issue_id",
+        "prism:publicationName": "publication_name"
+    }, inplace=True)
+
+    df["affiliation"] = df["affiliation"].apply(clean_affiliations)
+    df["pub_year"] = get_pub_years(df["date"])
+    df["from_db"] = df["scopus_id"].isin(const.db_manager.find_papers(df["scopus_id"]))
+
+    df["authors"] = df["author"].apply(_authors_from_search_entry) if "author" in df \
+        else pd.Series(None, index=df.index, dtype=object)
+
+    missing = df["authors"].isna()
+    # later abstract lookups of these papers (for other profiles of the run) are answered by the search results
+    get_memo(els_client).add("paper_authors", zip(df.loc[~missing, "scopus_id"].tolist(), df.loc[~missing, "authors"]))
+    looked_up = 0
+    if missing.any():
+        # the stored author lists are read from the database, only the remaining papers are looked up
+        df.loc[missing, "authors"], looked_up = get_papers_authors(
+            df[missing], els_client, author_scopus_id, max_concurrent_lookups)
+
+    return df, looked_up, int((~missing & ~df["from_db"]).sum())
+
+
+def get_papers_from_db(author_scopus_id: int, min_year: int = None, max_year: int = None,
+                       db_filters: dict = None) -> pd.DataFrame:
+    # db_filters are the year and co-author filters of a QueryPlan, evaluated in sql. the stored affiliations are
+    # loaded too, so the papers have the columns of the downloaded ones
+    with metrics.stage("db_load"):
+        if db_filters:
+            df = const.db_manager.get_papers_of_authors([author_scopus_id], **db_filters, with_affiliations=True)
+        else:
+            df = const.db_manager.get_papers_with_authors(author_scopus_id, min_year=min_year, max_year=max_year,
+                                                          with_affiliations=True)
     df["from_db"] = True
-    return df[DB_COLUMNS]
+    return df[COLUMNS]
 
 def clean_affiliations(affiliations):
     if type(affiliations) is not list:
@@ -118,5 +233,6 @@ def get_papers_from_doc_list(doc_list: list) -> pd.DataFrame:
     }, inplace=True)
 
     df["affiliation"] = df["affiliation"].apply(clean_affiliations)
+    df["pub_year"] = get_pub_years(df["date"])
 
     return df[COLUMNS]
@@ -1,84 +1,242 @@
+import threading
+
 import pandas as pd
+import requests
 from elsapy.elsclient import ElsClient
 from elsapy.elsprofile import ElsAuthor
 from elsapy.elssearch import ElsSearch
 
 from .. import constants as const
 from ..util.commandline_util import log_and_print_if_verbose
-from .paper import get_papers_from_doc_list, get_papers_from_author_by_scopus_search, paper_df_from_db_entry
+from ..util.metrics import metrics
+from ..util.paper_filter import PaperFilter
+from ..util.query_plan import QueryPlan
+from ..util.run_memo import get_memo
+from .paper import COLUMNS, get_papers_from_doc_list, get_papers_from_author_by_scopus_search, get_papers_from_db
+
+
+def _get_search_entry_metadata(entry: dict) -> dict:
+    # the fields of an author search result (standard view) that are known before anything is downloaded
+    name = entry.get("preferred-name") or {}
+    affiliation = entry.get("affiliation-current") or {}
+    document_count = str(entry.get("document-count", ""))
+    return dict(
+        given_name=name.get("given-name"),
+        surname=name.get("surname"),
+        document_count=int(document_count) if document_count.isdigit() else None,
+        affiliation=affiliation.get("affiliation-name"),
+        affiliation_id=int(affiliation["affiliation-id"]) if str(affiliation.get("affiliation-id", "")).isdigit()
+        else None,
+    )
 
 
 class ScopusAuthor:
+    # A scopus profile. Its metadata (name and, for author search results, document count and current affiliation)
+    # is known on creation, its papers are only loaded from the database and / or downloaded on first access of papers
     def __init__(self,
                  client: ElsClient,
                  scopus_id: int, given_name: str = None, surname: str = None,
                  verbose: bool = False, ask_user_input: bool = False,
-                 output_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT):
+                 output_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT,
+                 refresh: str = None, stale_after_days: float = None,
+                 search_entry: dict = None, query_plan: QueryPlan = None):
+        # with a query plan only the papers matching its filters are downloaded and loaded, see util.query_plan
 
         if not scopus_id:
             raise ValueError("Did not receive scopus id")
 
+        self.refresh = refresh or const.DEFAULT_REFRESH_POLICY
+        self.stale_after_days = stale_after_days if stale_after_days is not None else const.STALE_AFTER_DAYS
+
         self.verbose = verbose
         self.scopus_id = scopus_id
         self.output_format = output_format
 
+        # whether the papers were (re)synced with scopus, only then the sync state is updated
+        self.synced = False
+        # whether only the papers matching the query plan were downloaded, such profiles are not stored as authors
+        self.partial = False
+        self.query_plan = query_plan
         self._els_client = client
+        # profiles and papers already fetched in this run are shared with the other authors of the run
+        self._memo = get_memo(client)
+        self._papers = None
+        self._papers_lock = threading.Lock()
+
+        metadata = _get_search_entry_metadata(search_entry) if search_entry else {}
+        self.document_count = metadata.get("document_count")
+        self.affiliation = metadata.get("affiliation")
+        self.affiliation_id = metadata.get("affiliation_id")
 
         self.in_db = const.db_manager.find_author(scopus_id)
         self._scopus_author = ElsAuthor(author_id=self.scopus_id)
 
         if self.in_db:
-            self._db_author = const.db_manager.get_scopus_author(scopus_id=scopus_id)
+            db_author = const.db_manager.get_scopus_author(scopus_id=scopus_id)
+            given_name, surname = db_author["given_name"][0], db_author["surname"][0]
+        elif metadata.get("given_name") and metadata.get("surname"):
+            given_name, surname = metadata["given_name"], metadata["surname"]
 
-        if not self.in_db:
-            if self._scopus_author.read(self._els_client):
-                log_and_print_if_verbose(
-                    f"first name: {self._scopus_author.first_name}, last name: {self._scopus_author.last_name}",
-                    self.verbose)
-                given_name, surname = self._scopus_author.first_name, self._scopus_author.last_name
+        if given_name is None or surname is None:
+            author_names = self._read_author_names()
+            if author_names:
+                log_and_print_if_verbose(f"first name: {author_names[0]}, last name: {author_names[1]}", self.verbose)
+                given_name, surname = author_names
+
+        self.given_name, self.surname = given_name, surname
 
-            log_and_print_if_verbose(f"Downloading paper list for {self.scopus_id}, this might take a while", verbose)
-            if self._scopus_author.read_docs(self._els_client):
-                log_and_print_if_verbose(f"Downloaded paper list!", verbose)
-                self.papers = get_papers_from_doc_list(self._scopus_author.doc_list)
+    @property
+    def papers(self) -> pd.DataFrame:
+        # loaded on first access, once even if several threads ask at the same time
+        if self._papers is None:
+            with self._papers_lock:
+                if self._papers is None:
+                    self._papers = self._load_papers()
+        return self._papers
+
+    @papers.setter
+    def papers(self, papers: pd.DataFrame):
+        self._papers = papers
+
+    def load_papers(self) -> pd.DataFrame:
+        return self.papers
+
+    def _load_papers(self) -> pd.DataFrame:
+        if not self.in_db and self.query_plan:
+            papers = self._get_filtered_papers()
+            if papers is not None:
+                self.partial = True
+                return papers
+
+        if not self.in_db:
+            log_and_print_if_verbose(f"Downloading paper list for {self.scopus_id}, this might take a while", self.verbose)
+            # the papers are stored once the author is done, so a profile is only shared with concurrent lookups
+            with metrics.stage("doc_download"):
+                doc_list = self._memo.get("author_docs", int(self.scopus_id), self._read_doc_list, keep=False)
+            if doc_list is not None:
+                log_and_print_if_verbose(f"Downloaded paper list!", self.verbose)
+                papers = get_papers_from_doc_list(doc_list)
+                self._memo.add("paper_authors", zip(papers["scopus_id"].tolist(), papers["authors"]))
             else:
                 log_and_print_if_verbose(
                     f"Could not download doc list for {self.scopus_id} from scopus! downloading papers through the search api...",
-                    verbose)
+                    self.verbose)
                 # trying to extract paper information without using the authors index
-                self.papers, self.author_name_guesses = (
-                    get_papers_from_author_by_scopus_search(self._els_client, self.scopus_id))
-                if self.papers.empty:
+                papers, self.author_name_guesses = self._memo.get(
+                    "author_papers", (int(self.scopus_id), None, ()),
+                    lambda: get_papers_from_author_by_scopus_search(self._els_client, self.scopus_id, verbose=self.verbose),
+                    keep=False)
+                papers = papers.copy()
+                if papers.empty:
                     raise ValueError("Could not find author papers, please check your api key permissions")
 
-        else:
-            surname = self._db_author["surname"][0]
-            given_name = self._db_author["given_name"][0]
+            self.synced = True
+            return papers
+
+        last_updated_paper = const.db_manager.get_last_updated_paper(self.scopus_id)
+        if last_updated_paper.empty:
+            raise ValueError(
+                f"Could not find any paper in database for author {self.scopus_id}, this should never happen!")
+        local_papers = get_papers_from_db(
+            self.scopus_id, db_filters=self.query_plan.get_db_filters() if self.query_plan else None)
+
+        new_papers = pd.DataFrame()
+        sync_state = const.db_manager.get_sync_state(self.scopus_id)
+        if self._needs_refresh(sync_state, self.refresh, self.stale_after_days):
+            # databases from before the sync state existed fall back to the newest stored paper
+            watermark = sync_state["max_cover_date"][0] if not sync_state.empty else last_updated_paper["date"][0]
+            # without any dated paper there is no watermark, the sync then downloads every paper again
+            watermark = watermark if isinstance(watermark, str) and watermark[:4].isdigit() else None
+            new_papers = self._get_papers_since(watermark, local_papers["scopus_id"])
+            # a filtered delta does not move the watermark, the next unfiltered sync downloads the rest
+            self.synced = not self.query_plan
 
-            if given_name is None or surname is None:
+        log_and_print_if_verbose(
+            f"Loaded {len(local_papers)} from database, updated / downloaded {len(new_papers)} papers from scopus",
+            self.verbose)
+
+        return pd.concat([new_papers, local_papers], ignore_index=True)
+
+    @classmethod
+    def from_db(cls, scopus_id: int, given_name: str, surname: str, papers: pd.DataFrame, verbose: bool = False,
+                output_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT) -> "ScopusAuthor":
+        # a stored author with already loaded papers, nothing is read from scopus (see util.offline)
+        author = cls.__new__(cls)
+        author.verbose = verbose
+        author.scopus_id = scopus_id
+        author.output_format = output_format
+        author.synced = author.partial = False
+        author.query_plan = None
+        author.in_db = True
+        author._els_client = None
+        author.document_count = author.affiliation = author.affiliation_id = None
+        author.given_name, author.surname = given_name, surname
+        author._papers = papers
+        author._papers_lock = threading.Lock()
+        return author
+
+    def _read_author_names(self) -> tuple | None:
+        # (first name, last name) of the profile, read once per run
+        def read():
+            with metrics.stage("author_download"):
                 if self._scopus_author.read(self._els_client):
-                    given_name, surname = self._scopus_author.first_name, self._scopus_author.last_name
-
-            last_updated_paper = const.db_manager.get_last_updated_paper(self.scopus_id)
-            if last_updated_paper.empty:
-                raise ValueError(
-                    f"Could not find any paper in database for author {self.scopus_id}, this should never happen!")
-            latest_update_year = int(last_updated_paper["date"][0][:4])
-            local_papers = const.db_manager.get_papers_by_scopus_author(self.scopus_id, max_year=latest_update_year).apply(
-                paper_df_from_db_entry, axis=1)
-            new_papers, _ = get_papers_from_author_by_scopus_search(
-                self._els_client,
-                self.scopus_id,
-                max_year=latest_update_year
-            )
+                    return self._scopus_author.first_name, self._scopus_author.last_name
+            return None
 
+        return self._memo.get("author", int(self.scopus_id), read)
+
+    def _read_doc_list(self) -> list | None:
+        return self._scopus_author.doc_list if self._scopus_author.read_docs(self._els_client) else None
+
+    def _get_filtered_papers(self) -> pd.DataFrame | None:
+        # the papers matching the query plan through the scopus search, None if the search is not available,
+        # the full paper list is then downloaded and filtered afterwards
+        clauses = self.query_plan.get_search_clauses()
+        log_and_print_if_verbose(
+            f"Downloading the papers of {self.scopus_id} matching {' AND '.join(clauses)}", self.verbose)
+        try:
+            papers, self.author_name_guesses = self._memo.get(
+                "author_papers", (int(self.scopus_id), None, tuple(clauses)),
+                lambda: get_papers_from_author_by_scopus_search(
+                    self._els_client, self.scopus_id, clauses=clauses, verbose=self.verbose),
+                keep=False)
+        except requests.HTTPError as error:
             log_and_print_if_verbose(
-                f"Loaded {len(local_papers)} from database, updated / downloaded {len(new_papers)} papers from scopus",
-                verbose)
+                f"Could not search the papers of {self.scopus_id} ({error}), filtering the full paper list instead",
+                self.verbose)
+            return None
 
-            self.papers = pd.concat([new_papers, local_papers], ignore_index=True)
+        metrics.count("pushdown_downloads")
+        # no matching paper is a valid result here
+        return papers.copy() if not papers.empty else pd.DataFrame(columns=COLUMNS)
 
-        self.given_name, self.surname = given_name, surname
+    def _needs_refresh(self, sync_state: pd.DataFrame, refresh: str, stale_after_days: float) -> bool:
+        if refresh == "never":
+            return False
+        if refresh == "always" or sync_state.empty:
+            return True
+
+        age_days = sync_state["age_days"][0]
+        log_and_print_if_verbose(f"Author {self.scopus_id} was last synced {age_days:.1f} days ago", self.verbose)
+        return age_days >= stale_after_days
+
+    def _get_papers_since(self, watermark: str | None, known_papers: pd.Series) -> pd.DataFrame:
+        # the newest papers come first, so a delta normally fits into the first result page. without a watermark
+        # (no stored paper has a cover date) all papers are searched
+        clauses = self.query_plan.get_search_clauses() if self.query_plan else []
+        new_papers, _ = self._memo.get("author_papers", (int(self.scopus_id), watermark, tuple(clauses)), lambda: (
+            get_papers_from_author_by_scopus_search(
+                self._els_client,
+                self.scopus_id,
+                min_year=int(watermark[:4]) if watermark else None,
+                sort="-coverDate",
+                clauses=clauses,
+                verbose=self.verbose
+            )), keep=False)
+
+        if new_papers.empty:
+            return new_papers.copy()
+        return new_papers[~new_papers["scopus_id"].isin(known_papers)]
 
     def _get_output_key(self) -> str:
         try:
@@ -95,23 +253,10 @@ class ScopusAuthor:
                       min_year: int = None,
                       include_authors: list[int] = [],
                       include_all_authors: list[int] = [],
-                      not_include_authors: list[int] = []):
-        if max_year:
-            self.papers = self.papers.loc[self.papers.date.map(lambda date: int(date[:4])) <= max_year]
-
-        if min_year:
-            self.papers = self.papers.loc[self.papers.date.map(lambda date: int(date[:4])) >= min_year]
-
-        if not_include_authors:
-            self.papers = self.papers[self.papers.authors.apply(
-                lambda authors: not any(author in authors for author in not_include_authors))]
-
-        if include_authors:
-            self.papers = self.papers[self.papers.authors.apply(
-                lambda authors: any(author in authors for author in include_authors))]
-
-        if include_all_authors:
-            self.papers = self.papers[self.papers.authors.apply(
-                lambda authors: set(include_all_authors) <= set(authors))]
-
+                      not_include_authors: list[int] = [],
+                      title_query: str = None,
+                      venue_query: str = None):
+        self.papers = PaperFilter(
+            max_year, min_year, include_authors, include_all_authors, not_include_authors, title_query, venue_query
+        ).apply(self.papers)
         return self.papers
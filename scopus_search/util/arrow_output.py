@@ -0,0 +1,156 @@
+from typing import BinaryIO, Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError as error:
+    raise ImportError("The parquet and arrow output formats need pyarrow, "
+                      "install it with `pip install scopus_search[arrow]`") from error
+
+from ..models.author import Author
+from .rendering import sort_papers
+
+# rows buffered before a parquet row group (or arrow record batch) is written
+ROW_GROUP_SIZE = 64 * 1024
+
+_STRING_COLUMNS = ["eid", "title", "origin", "publication_name", "issn", "isbn", "issue_id", "page_range"]
+
+# one flat table per run, every row is one paper of one scopus profile of a base author
+SCHEMA = pa.schema([
+    ("base_author", pa.int64()),
+    ("scopus_author", pa.int64()),
+    ("name", pa.string()),
+    ("scopus_id", pa.int64()),
+    ("eid", pa.string()),
+    ("title", pa.string()),
+    ("date", pa.date32()),
+    ("pub_year", pa.int32()),
+    ("origin", pa.string()),
+    ("publication_name", pa.string()),
+    ("issn", pa.string()),
+    ("isbn", pa.string()),
+    ("issue_id", pa.string()),
+    ("page_range", pa.string()),
+    ("authors", pa.list_(pa.int64())),
+    ("affiliations", pa.map_(pa.int64(), pa.string())),
+    ("from_db", pa.bool_()),
+])
+
+
+def _get_string_array(papers: pd.DataFrame, column: str) -> pa.Array:
+    if column not in papers:
+        return pa.nulls(len(papers), pa.string())
+    return pa.array(papers[column].astype("string"), type=pa.string())
+
+
+def _get_authors_array(authors: pd.Series) -> pa.Array:
+    # built from flat offsets and values instead of one python list per row
+    author_lists = [author_list if isinstance(author_list, (tuple, list)) else () for author_list in authors]
+    offsets = np.zeros(len(author_lists) + 1, dtype=np.int32)
+    np.cumsum([len(author_list) for author_list in author_lists], out=offsets[1:])
+    values = np.fromiter((author for author_list in author_lists for author in author_list), dtype=np.int64,
+                         count=offsets[-1])
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(values))
+
+
+def _get_affiliations_array(papers: pd.DataFrame) -> pa.Array:
+    # afid -> name dicts, papers of external frames may come without the column
+    if "affiliation" not in papers:
+        return pa.nulls(len(papers), SCHEMA.field("affiliations").type)
+    return pa.array([[(int(afid), name) for afid, name in affiliations.items()] if isinstance(affiliations, dict) else None
+                     for affiliations in papers["affiliation"]], type=SCHEMA.field("affiliations").type)
+
+
+def _get_dates_array(dates: pd.Series) -> pa.Array:
+    # malformed cover dates become null instead of failing the whole export
+    dates = pa.array(dates.astype("string"), type=pa.string())
+    return pc.strptime(dates, format="%Y-%m-%d", unit="s", error_is_null=True).cast(pa.date32())
+
+
+def get_record_batch(base_author: int, scopus_author: int, name: str, papers: pd.DataFrame) -> pa.RecordBatch:
+    rows = len(papers)
+    columns = {
+        "base_author": pa.array(np.full(rows, base_author, dtype=np.int64)),
+        "scopus_author": pa.array(np.full(rows, scopus_author, dtype=np.int64)),
+        "name": pa.array([name] * rows, type=pa.string()),
+        "scopus_id": pa.array(papers["scopus_id"].to_numpy(dtype=np.int64)),
+        "date": _get_dates_array(papers["date"]),
+        "pub_year": pa.array(papers["pub_year"], type=pa.int32(), from_pandas=True) if "pub_year" in papers
+        else pa.nulls(rows, pa.int32()),
+        "authors": _get_authors_array(papers["authors"]),
+        "affiliations": _get_affiliations_array(papers),
+        "from_db": pa.array(papers["from_db"].astype(bool).to_numpy()),
+        **{column: _get_string_array(papers, column) for column in _STRING_COLUMNS},
+    }
+    return pa.RecordBatch.from_arrays([columns[field.name] for field in SCHEMA], schema=SCHEMA)
+
+
+def get_record_batches(author: Author, sort_by: list[str] = None) -> list[pa.RecordBatch]:
+    # one batch per scopus profile of the author, sorted like the other output formats
+    return [
+        get_record_batch(author.base_author.scopus_id, auth.scopus_id, auth._get_output_key(),
+                         sort_papers(auth.papers, sort_by))
+        for auth in author.scopus_authors
+    ]
+
+
+def get_table(authors: Iterable[Author], sort_by: list[str] = None) -> pa.Table:
+    return pa.Table.from_batches([batch for author in authors for batch in get_record_batches(author, sort_by)],
+                                 schema=SCHEMA)
+
+
+class TableWriter:
+    # Writes authors as they arrive to a parquet or arrow ipc file. The batches of small authors are buffered until
+    # row_group_size rows are collected, so the file does not end up with one tiny row group per author, while
+    # large runs never hold more than about one row group in memory.
+    def __init__(self, sink: str | BinaryIO, file_format: str = "parquet", row_group_size: int = ROW_GROUP_SIZE,
+                 sort_by: list[str] = None):
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"Unknown file format: {file_format}")
+
+        self.row_group_size = row_group_size
+        self.sort_by = sort_by
+        self.rows = 0
+        self._batches = []
+        self._buffered_rows = 0
+        self._writer = pq.ParquetWriter(sink, SCHEMA) if file_format == "parquet" else pa.ipc.new_file(sink, SCHEMA)
+
+    def write_author(self, author: Author):
+        for batch in get_record_batches(author, self.sort_by):
+            self._batches.append(batch)
+            self._buffered_rows += batch.num_rows
+        if self._buffered_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batches:
+            return
+        table = pa.Table.from_batches(self._batches, schema=SCHEMA).combine_chunks()
+        if isinstance(self._writer, pq.ParquetWriter):
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows += table.num_rows
+        self._batches, self._buffered_rows = [], 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def get_parquet_bytes(authors: Iterable[Author], sort_by: list[str] = None) -> bytes:
+    sink = pa.BufferOutputStream()
+    with TableWriter(sink, "parquet", sort_by=sort_by) as writer:
+        for author in authors:
+            writer.write_author(author)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,168 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _gather(indptr: np.ndarray, values: np.ndarray, rows: np.ndarray) -> (np.ndarray, np.ndarray):
+    # concatenates the csr rows `rows` without a python loop, returns the values and the position in rows of each value
+    lengths = indptr[rows + 1] - indptr[rows]
+    total = int(lengths.sum())
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.repeat(indptr[rows] - (np.cumsum(lengths) - lengths), lengths)
+    return values[np.arange(total) + offsets], owners
+
+
+def _merge_ids(ids: np.ndarray, new_ids: np.ndarray) -> (np.ndarray, np.ndarray):
+    # sorts the unseen new_ids into the sorted ids, returns the merged ids and the position of every new id in them
+    unique, inverse = np.unique(new_ids, return_inverse=True)
+    if not len(ids):
+        return unique, inverse
+    missing = unique[~np.isin(unique, ids, assume_unique=True)]
+    merged = np.insert(ids, np.searchsorted(ids, missing), missing)
+    return merged, np.searchsorted(merged, unique)[inverse]
+
+
+def _merge_csr(indptr: np.ndarray, values: np.ndarray, row_map: np.ndarray, row_count: int,
+               new_rows: np.ndarray, new_values: np.ndarray) -> (np.ndarray, np.ndarray):
+    # appends (new_rows, new_values) to the rows of a csr array in O(rows + values), without sorting the existing
+    # values again. row_map maps the existing rows to their row in the merged array (new rows can be sorted in between)
+    lengths = np.diff(indptr)
+    old_counts = np.zeros(row_count, dtype=np.int64)
+    old_counts[row_map] = lengths
+    merged_indptr = np.zeros(row_count + 1, dtype=np.int64)
+    np.cumsum(old_counts + np.bincount(new_rows, minlength=row_count), out=merged_indptr[1:])
+
+    # the existing values keep their order at the start of their row, the new ones follow
+    merged = np.empty(merged_indptr[-1], dtype=np.int64)
+    merged[np.arange(len(values)) + np.repeat(merged_indptr[row_map] - indptr[:-1], lengths)] = values
+
+    order = np.argsort(new_rows, kind="stable")
+    new_rows = new_rows[order]
+    rank_in_row = np.arange(len(new_rows)) - np.searchsorted(new_rows, new_rows)
+    merged[merged_indptr[new_rows] + old_counts[new_rows] + rank_in_row] = new_values[order]
+    return merged_indptr, merged
+
+
+class CoauthorGraph:
+    # Co-authorship index over the author - paper pairs of written_by, as two csr arrays (author -> papers and
+    # paper -> authors) over dense author / paper indices (positions in the sorted author_ids / paper_ids).
+    # written_by is append only, so refresh() only reads the rows added since the last load (by rowid) and merges
+    # them into the arrays, neither the database nor the existing arrays are sorted again.
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.author_ids = _EMPTY
+        self.paper_ids = _EMPTY
+        self._author_indptr = np.zeros(1, dtype=np.int64)
+        self._author_papers = _EMPTY
+        self._paper_indptr = np.zeros(1, dtype=np.int64)
+        self._paper_authors = _EMPTY
+        self._last_rowid = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        return dict(authors=len(self.author_ids), papers=len(self.paper_ids), authorships=len(self._author_papers))
+
+    def refresh(self) -> int:
+        # loads the authorships inserted since the last refresh, returns their number
+        with self._lock:
+            last_rowid, authors, papers = self.db_manager.get_authorships(self._last_rowid)
+            if not len(authors):
+                return 0
+
+            self._add(authors, papers)
+            self._last_rowid = last_rowid
+            return len(authors)
+
+    def _add(self, authors: np.ndarray, papers: np.ndarray):
+        author_ids, author_index = _merge_ids(self.author_ids, authors)
+        paper_ids, paper_index = _merge_ids(self.paper_ids, papers)
+        # the dense indices of known authors / papers shift when new ids are sorted in before them
+        author_map = np.searchsorted(author_ids, self.author_ids)
+        paper_map = np.searchsorted(paper_ids, self.paper_ids)
+
+        self._author_indptr, self._author_papers = _merge_csr(
+            self._author_indptr, paper_map[self._author_papers], author_map, len(author_ids), author_index, paper_index)
+        self._paper_indptr, self._paper_authors = _merge_csr(
+            self._paper_indptr, author_map[self._paper_authors], paper_map, len(paper_ids), paper_index, author_index)
+        self.author_ids, self.paper_ids = author_ids, paper_ids
+
+    def _get_index(self, author_ids) -> np.ndarray:
+        # dense indices of the given scopus ids, unknown authors are left out
+        author_ids = np.asarray(author_ids, dtype=np.int64).ravel()
+        positions = np.searchsorted(self.author_ids, author_ids)
+        known = positions < len(self.author_ids)
+        known[known] = self.author_ids[positions[known]] == author_ids[known]
+        return positions[known]
+
+    def get_papers(self, author_id: int) -> np.ndarray:
+        index = self._get_index([author_id])
+        if not len(index):
+            return _EMPTY
+        return self.paper_ids[_gather(self._author_indptr, self._author_papers, index)[0]]
+
+    def get_coauthors(self, author_id: int) -> pd.Series:
+        # co-author scopus id -> number of joint papers, most frequent co-authors first
+        index = self._get_index([author_id])
+        if not len(index):
+            return pd.Series(dtype=np.int64, name="papers")
+
+        papers, _ = _gather(self._author_indptr, self._author_papers, index)
+        coauthors, _ = _gather(self._paper_indptr, self._paper_authors, papers)
+        coauthors, counts = np.unique(coauthors[coauthors != index[0]], return_counts=True)
+        return pd.Series(counts, index=pd.Index(self.author_ids[coauthors], name="coauthor"), name="papers") \
+            .sort_values(ascending=False, kind="stable")
+
+    def get_joint_paper_count(self, author_id: int, other_author_id: int) -> int:
+        index = self._get_index([author_id, other_author_id])
+        if len(index) < 2:
+            return 0
+        papers = [self._author_papers[self._author_indptr[i]:self._author_indptr[i + 1]] for i in index]
+        return len(np.intersect1d(papers[0], papers[1], assume_unique=True))
+
+    def get_neighborhood(self, author_ids, hops: int = 1) -> pd.Series:
+        # scopus id -> distance in co-authorship hops of every author reachable from author_ids in at most `hops` hops
+        distances = np.full(len(self.author_ids), -1, dtype=np.int64)
+        frontier = np.unique(self._get_index(author_ids))
+        distances[frontier] = 0
+
+        for hop in range(1, hops + 1):
+            if not len(frontier):
+                break
+            frontier = self._expand(frontier)[1]
+            frontier = np.unique(frontier[distances[frontier] < 0])
+            distances[frontier] = hop
+
+        reached = np.flatnonzero(distances >= 0)
+        return pd.Series(distances[reached], index=pd.Index(self.author_ids[reached], name="author"), name="distance")
+
+    def get_edges(self, author_ids, hops: int = 1, min_papers: int = 1) -> pd.DataFrame:
+        # the co-authorship edges (source < target, joint papers) found by expanding author_ids `hops` times,
+        # i.e. every edge of an author that is less than `hops` hops away from author_ids
+        if hops < 1:
+            return pd.DataFrame({"source": _EMPTY, "target": _EMPTY, "papers": _EMPTY})
+
+        expanded = self._get_index(self.get_neighborhood(author_ids, hops - 1).index)
+        sources, targets = self._expand(expanded)
+
+        # pairs are encoded as one integer (smaller index * author count + larger index) to count them with np.unique
+        author_count = len(self.author_ids)
+        pairs, counts = np.unique(np.minimum(sources, targets) * author_count + np.maximum(sources, targets),
+                                  return_counts=True)
+        first, second = pairs // author_count, pairs % author_count
+        # a joint paper of two expanded authors is found from both sides
+        counts[np.isin(first, expanded) & np.isin(second, expanded)] //= 2
+
+        edges = pd.DataFrame({"source": self.author_ids[first], "target": self.author_ids[second], "papers": counts})
+        return edges[edges["papers"] >= min_papers].reset_index(drop=True)
+
+    def _expand(self, authors: np.ndarray) -> (np.ndarray, np.ndarray):
+        # one (author, co-author) pair per joint paper of every given author
+        papers, paper_owners = _gather(self._author_indptr, self._author_papers, authors)
+        coauthors, coauthor_owners = _gather(self._paper_indptr, self._paper_authors, papers)
+        sources = authors[paper_owners[coauthor_owners]]
+        not_self = coauthors != sources
+        return sources[not_self], coauthors[not_self]
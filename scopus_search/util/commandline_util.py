@@ -1,10 +1,43 @@
+import json
+import logging
+import sys
+
 import questionary
 
+logger = logging.getLogger("scopus_search")
+
+# attributes every log record has, everything else was passed through extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonLogFormatter(logging.Formatter):
+    # one json object per line, with the fields passed through extra={...} next to the message
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            **{key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES},
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(log_file: str, level: int = logging.DEBUG):
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(JsonLogFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
 
 def log_and_print_if_verbose(message, verbose):
-    # TODO: add logger
+    # diagnostics go to stderr, stdout carries the output (ndjson stream, parquet / arrow bytes)
+    logger.info(message)
     if verbose:
-        print(message)
+        print(message, file=sys.stderr)
 
 
 def select_from_author_names_list(author_names_list):
@@ -30,7 +63,11 @@ def select_from_author_names_list(author_names_list):
 
 
 def select_from_author_search_entries(author_search_entries):
+    # author_search_entries: (description, value) pairs, returns the values of the selected ones
     choice = questionary.checkbox(
         "Please select the authors you want to include",
-        choices=author_search_entries
+        choices=[questionary.Choice(description, value=value, checked=True)
+                 for description, value in author_search_entries]
     ).ask()
+
+    return choice or []
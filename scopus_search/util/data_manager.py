@@ -1,46 +1,116 @@
 from enum import Enum, member
-from typing import Callable
+from typing import BinaryIO, Callable, Iterable, Iterator, TextIO
 
 from ..models.author import Author
+from .commandline_util import log_and_print_if_verbose
+from .metrics import metrics
+from .paper_filter import PaperFilter
+from .rendering import get_paper_records, render_csv, render_markdown, sort_papers, to_json
 
 
-# TODO: implement optional sorting by different values
-def _get_json_output(authors: list[Author]):
+def _get_json_output(authors: list[Author], sort_by: list[str] = None):
     return {
-        author.base_author.scopus_id: _get_json_output_for_author(author)
+        author.base_author.scopus_id: _get_json_output_for_author(author, sort_by)
         for author in authors
     }
 
 
-def _get_json_output_for_author(author: Author):
+def _get_json_output_for_author(author: Author, sort_by: list[str] = None):
     if len(author.scopus_authors) == 1:
-        return _get_paper_list_from_df(author.scopus_authors[0].papers)
+        return _get_paper_list_from_df(author.scopus_authors[0].papers, sort_by)
 
     return {
-        auth.scopus_id: _get_paper_list_from_df(auth.papers)
+        auth.scopus_id: _get_paper_list_from_df(auth.papers, sort_by)
         for auth in author.scopus_authors
     }
 
 
-def _get_paper_list_from_df(papers):
-    return papers.sort_values(by=['date'], ascending=False).apply(
-        lambda paper: {
-            "scopus_id": paper.scopus_id,
-            "title": paper.title,
-            "authors": paper.authors,
-            "date": paper.date
-        }, axis=1
-    ).to_list()
+def _get_paper_list_from_df(papers, sort_by: list[str] = None):
+    return get_paper_records(sort_papers(papers, sort_by))
 
 
-# TODO: implement
-def _get_markdown_output(authors: list[Author]):
-    raise NotImplementedError()
+def _get_markdown_output(authors: list[Author], sort_by: list[str] = None):
+    return render_markdown(authors, sort_by)
 
 
-def _get_dataframe_output(authors: list[Author]):
+def _get_csv_output(authors: list[Author], sort_by: list[str] = None):
+    return render_csv(authors, sort_by)
+
+
+def _get_ndjson_lines_for_author(author: Author, sort_by: list[str] = None) -> Iterator[str]:
+    # one line per scopus profile of the author
+    for auth in author.scopus_authors:
+        yield to_json({
+            "base_author": author.base_author.scopus_id,
+            "scopus_author": auth.scopus_id,
+            "name": auth._get_output_key(),
+            "papers": _get_paper_list_from_df(auth.papers, sort_by)
+        })
+
+
+def _get_ndjson_output(authors: list[Author], sort_by: list[str] = None):
+    return "\n".join(line for author in authors for line in _get_ndjson_lines_for_author(author, sort_by))
+
+
+def stream_ndjson(authors: Iterable[Author], file: TextIO,
+                  max_year: int = None,
+                  min_year: int = None,
+                  include_authors: list[int] = [],
+                  include_all_authors: list[int] = [],
+                  not_include_authors: list[int] = [],
+                  title_query: str = None,
+                  venue_query: str = None,
+                  sort_by: list[str] = None) -> int:
+    # filters, writes and flushes every author as soon as it arrives, only one author is held at a time
+    count = 0
+    for author in authors:
+        author.filter_papers(max_year, min_year, include_authors, include_all_authors, not_include_authors,
+                             title_query, venue_query)
+        with metrics.stage("output"):
+            for line in _get_ndjson_lines_for_author(author, sort_by):
+                file.write(line + "\n")
+            file.flush()
+        count += 1
+    return count
+
+
+def _get_arrow_output(authors: list[Author], sort_by: list[str] = None):
+    # a pyarrow table, in process consumers get the columns without another copy
+    from .arrow_output import get_table
+    return get_table(authors, sort_by)
+
+
+def _get_parquet_output(authors: list[Author], sort_by: list[str] = None):
+    from .arrow_output import get_parquet_bytes
+    return get_parquet_bytes(authors, sort_by)
+
+
+def stream_table(authors: Iterable[Author], sink: str | BinaryIO, file_format: str,
+                 max_year: int = None,
+                 min_year: int = None,
+                 include_authors: list[int] = [],
+                 include_all_authors: list[int] = [],
+                 not_include_authors: list[int] = [],
+                 title_query: str = None,
+                 venue_query: str = None,
+                 sort_by: list[str] = None) -> int:
+    # like stream_ndjson for the columnar formats, the authors are written in row groups as they arrive
+    from .arrow_output import TableWriter
+
+    count = 0
+    with TableWriter(sink, file_format, sort_by=sort_by) as writer:
+        for author in authors:
+            author.filter_papers(max_year, min_year, include_authors, include_all_authors, not_include_authors,
+                                 title_query, venue_query)
+            with metrics.stage("output"):
+                writer.write_author(author)
+            count += 1
+    return count
+
+
+def _get_dataframe_output(authors: list[Author], sort_by: list[str] = None):
     return [{
-        auth.scopus_id: auth.papers[["scopus_id", "date", "title", "origin"]]
+        auth.scopus_id: sort_papers(auth.papers, sort_by)[["scopus_id", "date", "title", "origin"]]
         for auth in author.scopus_authors
     } for author in authors]
 
@@ -49,26 +119,49 @@ class OutputFormats(Enum):
     json = member(_get_json_output)
     md = member(_get_markdown_output)
     markdown = member(_get_markdown_output)
+    csv = member(_get_csv_output)
     dataframe = member(_get_dataframe_output)
     df = member(_get_dataframe_output)
+    ndjson = member(_get_ndjson_output)
+    arrow = member(_get_arrow_output)
+    parquet = member(_get_parquet_output)
 
 
 class DataManager:
-    def __init__(self, authors: list[Author], output_formatter: Callable | OutputFormats = OutputFormats.json):
+    def __init__(self, authors: list[Author], output_formatter: Callable | OutputFormats = OutputFormats.json,
+                 sort_by: list[str] = None):
         self.authors = authors
         self.output_formatter = output_formatter
+        # e.g. ["pub_year:desc", "title"], see util.rendering
+        self.sort_by = sort_by
 
     def filter_papers(self,
                       max_year: int = None,
                       min_year: int = None,
                       include_authors: list[int] = [],
                       include_all_authors: list[int] = [],
-                      not_include_authors: list[int] = []):
+                      not_include_authors: list[int] = [],
+                      title_query: str = None,
+                      venue_query: str = None):
+        # the filter is evaluated once over the papers of every profile of every author
+        paper_filter = PaperFilter(max_year, min_year, include_authors, include_all_authors, not_include_authors,
+                                   title_query, venue_query)
+        if not paper_filter.active:
+            return
+
+        profiles = []
         for author in self.authors:
-            author.filter_papers(max_year, min_year, include_authors, include_all_authors, not_include_authors)
+            for auth in author.scopus_authors:
+                log_and_print_if_verbose(
+                    f"Filtering papers for author: {auth.given_name} {auth.surname}({auth.scopus_id})", author.verbose)
+                profiles.append(auth)
+
+        for auth, papers in zip(profiles, paper_filter.apply_to_all([auth.papers for auth in profiles])):
+            auth.papers = papers
 
     def get_output(self):
-        if self.output_formatter in OutputFormats:
-            return self.output_formatter.value(self.authors)
-        else:
-            return self.output_formatter(self.authors)
+        with metrics.stage("output"):
+            if self.output_formatter in OutputFormats:
+                return self.output_formatter.value(self.authors, self.sort_by)
+            else:
+                return self.output_formatter(self.authors)
@@ -1,8 +1,14 @@
+import json
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
+from .metrics import metrics
+
 _CREATE_AUTHORS_QUERY = """
 create table if not exists authors
 (
@@ -69,77 +75,415 @@ create table if not exists affiliated_to
             references papers
 );"""
 
-_CREATE_WRITTEN_BY_IDX_QUERY = "CREATE UNIQUE INDEX IF NOT EXISTS written_by_uniq ON written_by (author, paper);"
-
-class DbManager:
-    def __init__(self, db_path: str):
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
-        self._setup_tables()
-
-    def _setup_tables(self):
-        self.cursor.execute(_CREATE_PAPERS_QUERY)
-        self.cursor.execute(_CREATE_AUTHORS_QUERY)
-        self.cursor.execute(_CREATE_WRITTEN_BY_QUERY)
-        self.cursor.execute(_CREATE_AFFILIATIONS_QUERY)
-        self.cursor.execute(_CREATE_AFFILIATED_TO_QUERY)
-        self.cursor.execute(_CREATE_WRITTEN_BY_IDX_QUERY)
-
-    def insert_scopus_author(self, scopus_id, given_name, surname, base_id: int = None):
-        self.cursor.execute("insert into authors (base_id, scopus_id, given_name, surname, updated_at) "
-                            "values (?,?,?,?, current_timestamp) on conflict do nothing",
-                            [base_id, scopus_id, given_name, surname])
-        self.conn.commit()
-
-    def insert_paper_df(self, papers_df: pd.DataFrame):
-        papers_df["from_db"] = papers_df.apply(lambda paper: self.find_paper(paper.scopus_id), axis=1)
-        papers_df = papers_df[papers_df["from_db"] == False]
-        papers_df = papers_df.drop_duplicates(subset="scopus_id")
-
-        authors_df = papers_df[["scopus_id", "authors"]].explode("authors")
-        authors_df.rename(
-            columns={
-                "authors": "author",
-                "scopus_id": "paper"
-            }, inplace=True)
-        authors_df.drop_duplicates(inplace=True)
-        authors_df.to_sql("written_by", self.conn, if_exists="append", index=False)
-
-        def extract_afilname(affiliation):
-            affiliation["afilname"] = affiliation["afil_dict"][affiliation["afid"]]
-            return affiliation[["afid", "afilname"]]
-
-        affiliations = papers_df[["scopus_id", "affiliation"]].copy()
-        affiliations["afil_dict"] = affiliations["affiliation"]
-
-        affiliations = affiliations.explode("affiliation")
-        affiliations.rename(columns={"affiliation": "afid"}, inplace=True)
+_CREATE_SYNC_STATE_QUERY = """
+create table if not exists sync_state
+(
+    author integer not null
+        constraint sync_state_pk
+            primary key
+        constraint sync_state_authors_scopus_id_fk
+            references authors,
+    synced_at      TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    paper_count    INTEGER NOT NULL DEFAULT 0,
+    max_cover_date TEXT,
+    max_eid        TEXT
+);"""
 
-        affiliations = affiliations.dropna()
-        affiliated_to = affiliations[["scopus_id", "afid"]].copy()
+_CREATE_JOBS_QUERY = """
+create table if not exists jobs
+(
+    id         INTEGER not null
+        constraint jobs_pk
+            primary key autoincrement,
+    input_file TEXT not null,
+    status     TEXT not null,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);"""
 
-        affiliations = affiliations.apply(extract_afilname, axis=1)
+_CREATE_JOB_ENTRIES_QUERY = """
+create table if not exists job_entries
+(
+    job        INTEGER not null
+        constraint job_entries_jobs_id_fk
+            references jobs,
+    position   INTEGER not null,
+    input      TEXT not null,
+    status     TEXT not null,
+    error      TEXT,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    constraint job_entries_pk
+        primary key (job, input)
+);"""
 
-        affiliations = affiliations[affiliations.apply(lambda affiliation: self.find_afil(affiliation["afid"]), axis=1) == False]
+_CREATE_JOB_QUERY_IDX_QUERIES = [
+    "CREATE INDEX IF NOT EXISTS jobs_input_file ON jobs (input_file, id);",
+    "CREATE INDEX IF NOT EXISTS job_entries_job_status_position ON job_entries (job, status, position);",
+]
+
+# full text index over the titles and venues of papers, an external content table kept in sync by the triggers
+_CREATE_PAPER_SEARCH_QUERIES = [
+    """
+    create virtual table if not exists papers_fts using fts5
+    (
+        title,
+        publication_name,
+        content='papers',
+        content_rowid='scopus_id',
+        tokenize='unicode61 remove_diacritics 2'
+    );""",
+    """
+    create trigger if not exists papers_fts_insert after insert on papers begin
+        insert into papers_fts (rowid, title, publication_name) values (new.scopus_id, new.title, new.publication_name);
+    end;""",
+    """
+    create trigger if not exists papers_fts_delete after delete on papers begin
+        insert into papers_fts (papers_fts, rowid, title, publication_name)
+        values ('delete', old.scopus_id, old.title, old.publication_name);
+    end;""",
+    """
+    create trigger if not exists papers_fts_update after update of title, publication_name on papers begin
+        insert into papers_fts (papers_fts, rowid, title, publication_name)
+        values ('delete', old.scopus_id, old.title, old.publication_name);
+        insert into papers_fts (rowid, title, publication_name) values (new.scopus_id, new.title, new.publication_name);
+    end;""",
+    # indexes the papers stored before the migration
+    "insert into papers_fts (papers_fts) values ('rebuild');",
+]
+
+# authors without stored papers get no row, without the group by the aggregate would return one with a null author,
+# which sqlite turns into a new rowid (the sync state of some other author)
+_UPDATE_SYNC_STATE_QUERY = """
+insert into sync_state (author, synced_at, paper_count, max_cover_date, max_eid)
+select w.author, current_timestamp, count(*), max(p.date),
+       (select p2.eid from papers p2 join written_by w2 on p2.scopus_id = w2.paper
+        where w2.author = w.author order by p2.date desc, p2.eid desc limit 1)
+from written_by w join papers p on p.scopus_id = w.paper
+where w.author = ?
+group by w.author
+on conflict (author) do update set
+    synced_at = excluded.synced_at,
+    paper_count = excluded.paper_count,
+    max_cover_date = excluded.max_cover_date,
+    max_eid = excluded.max_eid;"""
 
-        affiliations["updated_at"] = str(datetime.utcnow())
-        affiliations.to_sql("affiliations", self.conn, if_exists="append", index=False)
+_CREATE_WRITTEN_BY_IDX_QUERY = "CREATE UNIQUE INDEX IF NOT EXISTS written_by_uniq ON written_by (author, paper);"
+# used by the anti-joins of the bulk ingest path
+_CREATE_AFFILIATIONS_IDX_QUERY = "CREATE INDEX IF NOT EXISTS affiliations_afid ON affiliations (afid);"
+_CREATE_AFFILIATED_TO_IDX_QUERY = "CREATE INDEX IF NOT EXISTS affiliated_to_afil_paper ON affiliated_to (afil, paper);"
+
+_PUB_YEAR_QUERIES = [
+    "ALTER TABLE papers ADD COLUMN pub_year INTEGER;",
+    "UPDATE papers SET pub_year = CAST(substr(date, 1, 4) as integer) WHERE date IS NOT NULL;",
+]
+
+# indexes for the lookups of the read queries below, written_by (author, paper) is covered by written_by_uniq
+_CREATE_QUERY_PATH_IDX_QUERIES = [
+    "CREATE INDEX IF NOT EXISTS written_by_paper_author ON written_by (paper, author);",
+    "CREATE INDEX IF NOT EXISTS affiliated_to_paper_afil ON affiliated_to (paper, afil);",
+    "CREATE INDEX IF NOT EXISTS authors_given_name_surname ON authors (given_name, surname);",
+    "CREATE INDEX IF NOT EXISTS authors_base_id ON authors (base_id);",
+    "CREATE INDEX IF NOT EXISTS papers_pub_year ON papers (pub_year);",
+]
+
+
+def _migrate_base_tables(cursor: sqlite3.Cursor):
+    # the schema as it was before versioned migrations, databases from that time already have (parts of) it
+    for query in [
+        _CREATE_PAPERS_QUERY, _CREATE_AUTHORS_QUERY, _CREATE_WRITTEN_BY_QUERY, _CREATE_AFFILIATIONS_QUERY,
+        _CREATE_AFFILIATED_TO_QUERY, _CREATE_SYNC_STATE_QUERY,
+        _CREATE_WRITTEN_BY_IDX_QUERY, _CREATE_AFFILIATIONS_IDX_QUERY, _CREATE_AFFILIATED_TO_IDX_QUERY
+    ]:
+        cursor.execute(query)
+
+
+def _migrate_pub_year_and_query_indexes(cursor: sqlite3.Cursor):
+    for query in _PUB_YEAR_QUERIES + _CREATE_QUERY_PATH_IDX_QUERIES:
+        cursor.execute(query)
+
+
+def _migrate_jobs(cursor: sqlite3.Cursor):
+    for query in [_CREATE_JOBS_QUERY, _CREATE_JOB_ENTRIES_QUERY] + _CREATE_JOB_QUERY_IDX_QUERIES:
+        cursor.execute(query)
+
+
+def _has_fts5(cursor: sqlite3.Cursor) -> bool:
+    return ("ENABLE_FTS5",) in cursor.execute("PRAGMA compile_options").fetchall()
+
+
+def _migrate_paper_search(cursor: sqlite3.Cursor):
+    # sqlite builds without fts5 get no full text index, DbManager.match_papers creates it once fts5 is available
+    if _has_fts5(cursor):
+        for query in _CREATE_PAPER_SEARCH_QUERIES:
+            cursor.execute(query)
+
+
+def _migrate_author_name_index(cursor: sqlite3.Cursor):
+    # case insensitive lookups of stored authors by name (offline mode)
+    cursor.execute("CREATE INDEX IF NOT EXISTS authors_name_nocase "
+                   "ON authors (surname COLLATE NOCASE, given_name COLLATE NOCASE);")
+
+
+def _migrate_author_created_at_index(cursor: sqlite3.Cursor):
+    # incremental loads of the name index, see util.name_index
+    cursor.execute("CREATE INDEX IF NOT EXISTS authors_created_at ON authors (created_at);")
+
+
+def _migrate_drop_orphan_sync_states(cursor: sqlite3.Cursor):
+    # rows written for authors without papers under a made up author id, see _UPDATE_SYNC_STATE_QUERY
+    cursor.execute("DELETE FROM sync_state WHERE paper_count = 0;")
+
+
+# ordered schema migrations, PRAGMA user_version holds the number of migrations applied to a database.
+# new migrations are only ever appended to this list
+MIGRATIONS = [
+    _migrate_base_tables,
+    _migrate_pub_year_and_query_indexes,
+    _migrate_jobs,
+    _migrate_paper_search,
+    _migrate_author_name_index,
+    _migrate_author_created_at_index,
+    _migrate_drop_orphan_sync_states,
+]
+
+# staging tables used by the bulk ingest path, they only live as long as the connection
+_CREATE_STAGED_TABLES_QUERIES = [
+    """
+    create temp table if not exists staged_papers
+    (
+        scopus_id integer primary key,
+        title            TEXT,
+        date             TEXT,
+        origin           TEXT,
+        page_range       TEXT,
+        issue_id         TEXT,
+        issn             TEXT,
+        isbn             TEXT,
+        eid              TEXT,
+        publication_name TEXT
+    );""",
+    """
+    create temp table if not exists staged_written_by
+    (
+        author integer not null,
+        paper integer not null,
+        primary key (author, paper)
+    );""",
+    """
+    create temp table if not exists staged_affiliations
+    (
+        afid integer not null,
+        afilname TEXT,
+        paper integer not null,
+        primary key (afid, paper)
+    );""",
+]
+
+_PAPER_COLUMNS = ["scopus_id", "title", "date", "origin", "page_range", "issue_id", "issn", "isbn", "eid", "publication_name"]
+
+_INSERT_STAGED_PAPERS_QUERY = f"""
+insert into papers ({", ".join(_PAPER_COLUMNS)}, pub_year, updated_at)
+select {", ".join(_PAPER_COLUMNS)}, CAST(substr(date, 1, 4) as integer), ? from staged_papers s
+where not exists (select 1 from papers p where p.scopus_id = s.scopus_id);"""
+
+_INSERT_STAGED_WRITTEN_BY_QUERY = """
+insert into written_by (author, paper)
+select s.author, s.paper from staged_written_by s
+where not exists (select 1 from written_by w where w.author = s.author and w.paper = s.paper)
+order by s.rowid;"""
+
+_INSERT_STAGED_AFFILIATIONS_QUERY = """
+insert into affiliations (afid, afilname, updated_at)
+select s.afid, min(s.afilname), ? from staged_affiliations s
+where not exists (select 1 from affiliations a where a.afid = s.afid)
+group by s.afid;"""
+
+_INSERT_STAGED_AFFILIATED_TO_QUERY = """
+insert into affiliated_to (afil, paper)
+select s.afid, s.paper from staged_affiliations s
+where not exists (select 1 from affiliated_to a where a.afil = s.afid and a.paper = s.paper);"""
+
+
+# paper author lists are aggregated with group_concat, affiliations with json_group_object. written_by rows are
+# inserted in the scopus author order, group_concat keeps the order of an ordered subquery (sqlite < 3.44 has no
+# order by inside the aggregate)
+_PAPER_AUTHORS_SUBQUERY = """(select group_concat(author) from (
+    select wa.author from written_by wa where wa.paper = p.scopus_id order by wa.rowid
+))"""
+_PAPER_AFFILIATIONS_SUBQUERY = """(
+    select json_group_object(at.afil, (select af.afilname from affiliations af where af.afid = at.afil limit 1))
+    from affiliated_to at where at.paper = p.scopus_id
+)"""
+
+
+def _parse_id_list(ids: str | None) -> tuple:
+    return tuple(int(scopus_id) for scopus_id in ids.split(",")) if ids else tuple()
+
+
+def _parse_id_lists(id_lists: pd.Series) -> list[tuple]:
+    # _parse_id_list for a whole column, the ids are parsed in one go and only cut into tuples in python
+    id_lists = id_lists.tolist()
+    ids = np.fromstring(",".join(filter(None, id_lists)), sep=",", dtype=np.int64).tolist()
+    parsed, start = [], 0
+    for count in [id_list.count(",") + 1 if id_list else 0 for id_list in id_lists]:
+        parsed.append(tuple(ids[start:start + count]))
+        start += count
+    return parsed
+
+
+def _parse_affiliations(affiliations: str | None) -> dict | None:
+    return {int(afid): afilname for afid, afilname in json.loads(affiliations).items()} or None \
+        if affiliations else None
+
+
+def _get_fts_query(title_query: str = None, venue_query: str = None, quote: bool = False) -> str:
+    # queries use the fts5 syntax (AND / OR / NOT, "phrases", prefix*), quote turns every word into a phrase instead,
+    # for queries like `covid-19` that are no valid fts5 expression
+    def to_expression(query: str) -> str:
+        return " ".join('"' + word.replace('"', '""') + '"' for word in query.split()) if quote else query
+
+    return " AND ".join(f"{column} : ({to_expression(query)})"
+                        for column, query in [("title", title_query), ("publication_name", venue_query)] if query)
+
+
+def _count_statement(statement: str):
+    metrics.count("db_statements")
+
+
+def _to_sql_value(value):
+    # sqlite3 cannot bind numpy scalars or NaN
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
 
-        affiliated_to.rename(columns={
-            "scopus_id": "paper",
-            "afid": "afil"
-        }, inplace=True)
 
-        affiliated_to.to_sql("affiliated_to", self.conn, if_exists="append", index=False)
+class DbManager:
+    def __init__(self, db_path: str):
+        # the connection is shared between the harvesting threads, every access goes through self._lock
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        if metrics.detailed:
+            self.conn.set_trace_callback(_count_statement)
+        self.cursor = self.conn.cursor()
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self._coauthor_graph = None
+        self._name_index = None
+        self._migrate()
+
+    def _read_sql(self, query: str, params=None) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(query, self.conn, params=params)
+
+    @property
+    def schema_version(self) -> int:
+        with self._lock:
+            return self.cursor.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self):
+        # every migration runs in its own transaction, together with the version bump
+        with self._lock:
+            for version in range(self.schema_version, len(MIGRATIONS)):
+                try:
+                    self.cursor.execute("begin")
+                    MIGRATIONS[version](self.cursor)
+                    self.cursor.execute(f"PRAGMA user_version = {version + 1}")
+                    self.conn.commit()
+                except Exception:
+                    self.conn.rollback()
+                    raise
+
+    def use_wal(self):
+        # write ahead logging, so the harvesting processes keep reading while the main process writes (util.harvesting).
+        # the journal mode is stored in the database file
+        with self._lock:
+            self.cursor.execute("PRAGMA journal_mode=WAL").fetchone()
+
+    def explain_query_plan(self, query: str, params=None) -> list[str]:
+        with self._lock:
+            return [row[3] for row in self.cursor.execute(f"EXPLAIN QUERY PLAN {query}", params or [])]
+
+    @contextmanager
+    def transaction(self):
+        # nested transactions are merged into the outermost one, which commits (or rolls back) once
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                yield self.cursor
+            except BaseException:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self.conn.rollback()
+                raise
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self.conn.commit()
 
-        papers_df = papers_df[["scopus_id", "title", "date", "origin", "page_range", "issue_id", "issn", "isbn", "eid"]]
+    def insert_scopus_author(self, scopus_id, given_name, surname, base_id: int = None):
+        self.insert_scopus_authors([(scopus_id, given_name, surname, base_id)])
 
-        # TODO fix timezone difference
-        update_time = str(datetime.utcnow())
-        papers_df["updated_at"] = update_time
-        papers_df.to_sql("papers", self.conn, if_exists="append", index=False)
+    def insert_scopus_authors(self, authors: list[tuple]):
+        # authors: (scopus_id, given_name, surname, base_id) tuples
+        with self.transaction() as cursor:
+            cursor.executemany("insert into authors (scopus_id, given_name, surname, base_id, updated_at) "
+                               "values (?,?,?,?, current_timestamp) on conflict do nothing",
+                               [tuple(_to_sql_value(value) for value in author) for author in authors])
 
-        self.conn.commit()
+    def insert_paper_df(self, papers_df: pd.DataFrame):
+        if papers_df.empty:
+            return
+
+        with self.transaction() as cursor, metrics.stage("db_insert"):
+            self._stage_paper_df(cursor, papers_df)
+
+            existing_papers = {scopus_id for scopus_id, in cursor.execute(
+                "select s.scopus_id from staged_papers s where exists (select 1 from papers p where p.scopus_id = s.scopus_id)")}
+            papers_df["from_db"] = papers_df["scopus_id"].isin(existing_papers)
+
+            # TODO fix timezone difference
+            update_time = str(datetime.utcnow())
+            cursor.execute(_INSERT_STAGED_PAPERS_QUERY, [update_time])
+            cursor.execute(_INSERT_STAGED_WRITTEN_BY_QUERY)
+            cursor.execute(_INSERT_STAGED_AFFILIATIONS_QUERY, [update_time])
+            cursor.execute(_INSERT_STAGED_AFFILIATED_TO_QUERY)
+
+    def _stage_paper_df(self, cursor: sqlite3.Cursor, papers_df: pd.DataFrame):
+        for query in _CREATE_STAGED_TABLES_QUERIES:
+            cursor.execute(query)
+        cursor.execute("delete from staged_papers")
+        cursor.execute("delete from staged_written_by")
+        cursor.execute("delete from staged_affiliations")
+
+        papers = papers_df.reindex(columns=_PAPER_COLUMNS).drop_duplicates(subset="scopus_id")
+        cursor.executemany(
+            f"insert or ignore into staged_papers ({', '.join(_PAPER_COLUMNS)}) "
+            f"values ({', '.join('?' * len(_PAPER_COLUMNS))})",
+            [tuple(_to_sql_value(value) for value in row) for row in papers.itertuples(index=False, name=None)])
+
+        written_by = papers_df[["scopus_id", "authors"]].explode("authors").dropna()
+        cursor.executemany(
+            "insert or ignore into staged_written_by (paper, author) values (?,?)",
+            [(int(paper), int(author)) for paper, author in written_by.itertuples(index=False, name=None)])
+
+        if "affiliation" in papers_df:
+            cursor.executemany(
+                "insert or ignore into staged_affiliations (paper, afid, afilname) values (?,?,?)",
+                [(int(paper), int(afid), afilname)
+                 for paper, affiliations in papers_df[["scopus_id", "affiliation"]].itertuples(index=False, name=None)
+                 if isinstance(affiliations, dict)
+                 for afid, afilname in affiliations.items() if afid])
+
+    def update_sync_state(self, author_scopus_ids: list[int]):
+        # records the current paper count and newest paper of each author as their sync watermark
+        with self.transaction() as cursor:
+            cursor.executemany(_UPDATE_SYNC_STATE_QUERY, [(int(scopus_id),) for scopus_id in author_scopus_ids])
+
+    def get_sync_state(self, author_scopus_id: int) -> pd.DataFrame:
+        return self._read_sql(
+            "select *, julianday('now') - julianday(synced_at) as age_days from sync_state where author=?",
+            [int(author_scopus_id)])
 
     def is_base_author(self, scopus_id: int) -> bool:
         author = self.get_scopus_author(scopus_id=scopus_id)
@@ -161,7 +505,7 @@ class DbManager:
         return not self.get_afil(afid).empty
 
     def get_paper(self, paper_scopus_id: int) -> pd.DataFrame:
-        return pd.read_sql_query(f"select * from papers where scopus_id={paper_scopus_id}", self.conn)
+        return self._read_sql(f"select * from papers where scopus_id={paper_scopus_id}")
 
     def get_scopus_author(self, scopus_id: int = None, given_name: str = None, surname: str = None) -> pd.DataFrame:
         query = "select * from authors where"
@@ -173,37 +517,279 @@ class DbManager:
         else:
             raise ValueError("Did not receive valid input!")
 
-        return pd.read_sql_query(query, self.conn)
+        return self._read_sql(query)
 
     def get_author_scopus_ids(self, scopus_id: int) -> pd.DataFrame:
         base_id = self.get_scopus_author(scopus_id=scopus_id)["base_id"][0] or scopus_id
-        return pd.read_sql_query(
+        return self._read_sql(
             f"select scopus_id, given_name, surname from authors "
-            f"where (base_id={base_id}) or (scopus_id={base_id}) order by base_id nulls first",
-            self.conn)
+            f"where (base_id={base_id}) or (scopus_id={base_id}) order by base_id nulls first")
+
+    def get_scopus_authors(self, scopus_ids) -> pd.DataFrame:
+        return self._read_sql(
+            "select scopus_id, given_name, surname, base_id from authors where scopus_id in (select value from json_each(?))",
+            [json.dumps([int(scopus_id) for scopus_id in scopus_ids])])
+
+    def get_scopus_authors_by_names(self, names: list[tuple]) -> pd.DataFrame:
+        # names: (given_name, surname) pairs, the stored authors come with the position of their name in names.
+        # names are compared case insensitively
+        return self._read_sql(
+            "select n.key as name, a.scopus_id, a.given_name, a.surname, a.base_id from json_each(?) n "
+            "join authors a on a.surname = json_extract(n.value, '$[1]') collate nocase "
+            "and a.given_name = json_extract(n.value, '$[0]') collate nocase "
+            "order by n.key, a.rowid",
+            [json.dumps([list(name) for name in names])])
+
+    def get_linked_scopus_authors(self, base_ids) -> pd.DataFrame:
+        # the given base authors and all profiles linked to them, base authors first
+        base_ids = json.dumps([int(base_id) for base_id in base_ids])
+        return self._read_sql(
+            "select scopus_id, given_name, surname, base_id, scopus_id as base from authors "
+            "where scopus_id in (select value from json_each(?)) "
+            "union all "
+            "select scopus_id, given_name, surname, base_id, base_id as base from authors "
+            "where base_id in (select value from json_each(?)) and scopus_id != base_id "
+            "order by base, base_id nulls first",
+            [base_ids, base_ids])
+
+    def get_paper_counts(self, author_scopus_ids) -> dict[int, int]:
+        with self._lock:
+            return dict(self.cursor.execute(
+                "select author, count(*) from written_by where author in (select value from json_each(?)) group by author",
+                [json.dumps([int(author) for author in author_scopus_ids])]).fetchall())
+
+    def get_papers_of_authors(self, author_scopus_ids, min_year: int = None, max_year: int = None,
+                              include_authors: list[int] = None, include_all_authors: list[int] = None,
+                              not_include_authors: list[int] = None, with_affiliations: bool = False) -> pd.DataFrame:
+        # the papers of many authors in one query (the author is in the owner column), with the year and co-author
+        # filters of PaperFilter evaluated in sql
+        query = (f"select w.author as owner, {', '.join(f'p.{column}' for column in _PAPER_COLUMNS)}, p.pub_year, "
+                 f"{_PAPER_AUTHORS_SUBQUERY} as authors"
+                 + (f", {_PAPER_AFFILIATIONS_SUBQUERY} as affiliation" if with_affiliations else "")
+                 + " from written_by w join papers p on p.scopus_id = w.paper "
+                 "where w.author in (select value from json_each(?))")
+        params = [json.dumps([int(author) for author in author_scopus_ids])]
+
+        if min_year:
+            query += " and p.pub_year >= ?"
+            params.append(int(min_year))
+        if max_year:
+            query += " and p.pub_year <= ?"
+            params.append(int(max_year))
+
+        co_authors = "from written_by x where x.paper = w.paper and x.author in (select value from json_each(?))"
+        if include_authors:
+            query += f" and exists (select 1 {co_authors})"
+            params.append(json.dumps([int(author) for author in include_authors]))
+        if include_all_authors:
+            query += f" and (select count(*) {co_authors}) = ?"
+            params += [json.dumps([int(author) for author in include_all_authors]), len(set(include_all_authors))]
+        if not_include_authors:
+            query += f" and not exists (select 1 {co_authors})"
+            params.append(json.dumps([int(author) for author in not_include_authors]))
+
+        papers = self._read_sql(query + " order by w.author, p.date desc", params)
+        papers["authors"] = pd.Series(_parse_id_lists(papers["authors"]), index=papers.index, dtype=object)
+        if with_affiliations:
+            papers["affiliation"] = papers["affiliation"].map(_parse_affiliations).astype(object)
+        return papers
 
     def get_last_updated_paper(self, author_scopus_id: int):
-        return pd.read_sql_query(f"select date from papers left join written_by on papers.scopus_id = written_by.paper "
-                                 f"where written_by.author = {author_scopus_id} order by date desc limit 1", self.conn)
+        return self._read_sql(f"select date from papers left join written_by on papers.scopus_id = written_by.paper "
+                              f"where written_by.author = {author_scopus_id} order by date desc limit 1")
 
     def get_papers_by_scopus_author(self, author_scopus_id: int, min_year: int = None, max_year: int = None) -> pd.DataFrame:
         query = ("select * from papers "
                  "left join written_by on papers.scopus_id = written_by.paper "
-                 f"where written_by.author = {author_scopus_id}")
+                 "where written_by.author = ?")
+        params = [int(author_scopus_id)]
 
         if min_year:
-            query += f" and CAST(strftime('%Y', date) as integer) >= {min_year}"
+            query += " and pub_year >= ?"
+            params.append(int(min_year))
         if max_year:
-            query += f" and CAST(strftime('%Y', date) as integer) < {max_year}"
+            query += " and pub_year <= ?"
+            params.append(int(max_year))
 
         query += " order by date desc"
 
-        return pd.read_sql_query(query, self.conn)
+        return self._read_sql(query, params)
+
+    def get_papers_with_authors(self, author_scopus_id: int, min_year: int = None, max_year: int = None,
+                                with_affiliations: bool = False) -> pd.DataFrame:
+        # loads the papers of an author together with their author tuples (and affiliations) in one query
+        query = (f"select {', '.join(f'p.{column}' for column in _PAPER_COLUMNS)}, p.pub_year, "
+                 f"{_PAPER_AUTHORS_SUBQUERY} as authors"
+                 + (f", {_PAPER_AFFILIATIONS_SUBQUERY} as affiliation" if with_affiliations else "")
+                 + " from written_by w join papers p on p.scopus_id = w.paper where w.author = ?")
+        params = [int(author_scopus_id)]
+
+        if min_year:
+            query += " and p.pub_year >= ?"
+            params.append(int(min_year))
+        if max_year:
+            query += " and p.pub_year <= ?"
+            params.append(int(max_year))
+
+        papers = self._read_sql(query + " order by p.date desc", params)
+        papers["authors"] = papers["authors"].map(_parse_id_list).astype(object)
+        if with_affiliations:
+            papers["affiliation"] = papers["affiliation"].map(_parse_affiliations).astype(object)
+        return papers
+
+    def get_authors_of_papers(self, paper_scopus_ids) -> dict[int, tuple]:
+        # author tuples of all given papers that have authors stored, keyed by paper scopus id
+        rows = self._read_sql(
+            "select paper, group_concat(author) as authors from ("
+            "select paper, author from written_by where paper in (select value from json_each(?)) "
+            "order by paper, rowid) group by paper",
+            [json.dumps([int(scopus_id) for scopus_id in paper_scopus_ids])])
+        return dict(zip(rows["paper"].tolist(), rows["authors"].map(_parse_id_list)))
+
+    def find_papers(self, paper_scopus_ids) -> set[int]:
+        rows = self._read_sql(
+            "select scopus_id from papers where scopus_id in (select value from json_each(?))",
+            [json.dumps([int(scopus_id) for scopus_id in paper_scopus_ids])])
+        return set(rows["scopus_id"].tolist())
 
     def get_paper_authors(self, paper_scopus_id: int) -> tuple:
         return tuple(
-            pd.read_sql_query(f"select author from written_by where paper={paper_scopus_id}", self.conn)["author"]
+            self._read_sql(f"select author from written_by where paper={paper_scopus_id} order by rowid")["author"]
             .tolist())
 
+    def _match_papers(self, select: str, title_query: str = None, venue_query: str = None, where: str = "",
+                      params: list = None, limit: int = None) -> pd.DataFrame:
+        # runs `select ... from papers_fts f ... where papers_fts match ?` with the full text query of the
+        # title / venue queries, ranked by bm25 (the best match first)
+        if not title_query and not venue_query:
+            raise ValueError("A title or venue query is needed for the full text search!")
+
+        with self._lock:
+            if not self.cursor.execute("select 1 from sqlite_master where name = 'papers_fts'").fetchone():
+                if not _has_fts5(self.cursor):
+                    raise RuntimeError("The full text search needs an sqlite build with fts5")
+                with self.transaction() as cursor:
+                    _migrate_paper_search(cursor)
+
+            query = f"{select} where papers_fts match ?{where} order by rank" + (f" limit {int(limit)}" if limit else "")
+            # a query that is no valid fts5 expression is retried with every word as a phrase
+            try:
+                return self._read_sql(query, [_get_fts_query(title_query, venue_query)] + (params or []))
+            except pd.errors.DatabaseError:
+                return self._read_sql(query, [_get_fts_query(title_query, venue_query, quote=True)] + (params or []))
+
+    def match_papers(self, title_query: str = None, venue_query: str = None) -> np.ndarray:
+        # scopus ids of all stored papers matching the queries, best match first
+        papers = self._match_papers("select f.rowid as scopus_id from papers_fts f", title_query, venue_query)
+        return papers["scopus_id"].to_numpy(dtype=np.int64)
+
+    def search_papers(self, title_query: str = None, venue_query: str = None, min_year: int = None,
+                      max_year: int = None, limit: int = None) -> pd.DataFrame:
+        # ranked full text search over all stored papers, with their authors
+        where, params = "", []
+        if min_year:
+            where += " and p.pub_year >= ?"
+            params.append(int(min_year))
+        if max_year:
+            where += " and p.pub_year <= ?"
+            params.append(int(max_year))
+
+        papers = self._match_papers(
+            f"select {', '.join(f'p.{column}' for column in _PAPER_COLUMNS)}, p.pub_year, "
+            f"{_PAPER_AUTHORS_SUBQUERY} as authors, f.rank from papers_fts f join papers p on p.scopus_id = f.rowid",
+            title_query, venue_query, where, params, limit)
+        papers["authors"] = papers["authors"].map(_parse_id_list).astype(object)
+        # papers without cover date have no year, which read_sql would turn into a float column
+        papers["pub_year"] = papers["pub_year"].astype("Int64")
+        return papers
+
+    def get_authorships(self, after_rowid: int = 0) -> (int, np.ndarray, np.ndarray):
+        # the (author, paper) rows of written_by inserted after the given rowid, with the last rowid read
+        with self._lock:
+            last_rowid = self.cursor.execute("select max(rowid) from written_by").fetchone()[0] or 0
+            if last_rowid <= after_rowid:
+                return after_rowid, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+            if after_rowid:
+                rows = np.array(self.cursor.execute(
+                    "select author, paper from written_by where rowid > ? and rowid <= ?", [after_rowid, last_rowid]
+                ).fetchall(), dtype=np.int64)
+                return last_rowid, rows[:, 0], rows[:, 1]
+
+            # the full load goes over the covering (author, paper) index with one row per author, which is
+            # about three times faster than fetching millions of single rows
+            rows = self.cursor.execute("select author, count(*), group_concat(paper) from written_by "
+                                       "where rowid <= ? group by author", [last_rowid]).fetchall()
+        authors = np.repeat(np.array([row[0] for row in rows], dtype=np.int64), [row[1] for row in rows])
+        papers = np.fromstring(",".join(row[2] for row in rows), sep=",", dtype=np.int64)
+        return last_rowid, authors, papers
+
+    @property
+    def coauthor_graph(self):
+        # built on first use, later accesses only load the authorships inserted since (e.g. by insert_paper_df)
+        from .coauthor_graph import CoauthorGraph
+
+        if self._coauthor_graph is None:
+            self._coauthor_graph = CoauthorGraph(self)
+        self._coauthor_graph.refresh()
+        return self._coauthor_graph
+
+    def get_author_names(self, created_since: str = "") -> pd.DataFrame:
+        # the authors created at or after the given timestamp (the rowid of authors is the scopus id, it does not
+        # follow the insertion order)
+        return self._read_sql(
+            "select scopus_id, given_name, surname, base_id, created_at from authors where created_at >= ?",
+            [created_since])
+
+    @property
+    def name_index(self):
+        # built on first use, later accesses only index the authors inserted since
+        from .name_index import NameIndex
+
+        if self._name_index is None:
+            self._name_index = NameIndex(self)
+        self._name_index.refresh()
+        return self._name_index
+
     def get_afil(self, afid):
-        return pd.read_sql_query(f"select * from affiliations where afid={afid}", self.conn)
+        return self._read_sql(f"select * from affiliations where afid={afid}")
+
+    def create_job(self, input_file: str) -> int:
+        with self.transaction() as cursor:
+            cursor.execute("insert into jobs (input_file, status) values (?, 'running')", [input_file])
+            return cursor.lastrowid
+
+    def find_job(self, input_file: str) -> int | None:
+        # the most recent job of the input file
+        rows = self._read_sql("select id from jobs where input_file=? order by id desc limit 1", [input_file])
+        return None if rows.empty else int(rows["id"][0])
+
+    def add_job_entries(self, job_id: int, inputs: list[str]):
+        # entries that are already part of the job keep their status
+        with self.transaction() as cursor:
+            cursor.executemany(
+                "insert into job_entries (job, position, input, status) values (?, ?, ?, 'pending') "
+                "on conflict do nothing",
+                [(job_id, position, author_input) for position, author_input in enumerate(inputs)])
+
+    def get_job_entries(self, job_id: int, statuses: list[str]) -> list[str]:
+        rows = self._read_sql(
+            "select input from job_entries where job=? and status in (select value from json_each(?)) order by position",
+            [job_id, json.dumps(statuses)])
+        return rows["input"].tolist()
+
+    def get_job_status_counts(self, job_id: int) -> dict[str, int]:
+        rows = self._read_sql("select status, count(*) as count from job_entries where job=? group by status", [job_id])
+        return dict(zip(rows["status"], rows["count"].astype(int)))
+
+    def update_job_entries(self, job_id: int, entries: list[tuple]):
+        # entries: (input, status, error) tuples, written as one checkpoint
+        with self.transaction() as cursor:
+            cursor.executemany(
+                "update job_entries set status=?, error=?, updated_at=current_timestamp where job=? and input=?",
+                [(status, error, job_id, author_input) for author_input, status, error in entries])
+            cursor.execute("update jobs set updated_at=current_timestamp where id=?", [job_id])
+
+    def finish_job(self, job_id: int, status: str):
+        with self.transaction() as cursor:
+            cursor.execute("update jobs set status=?, updated_at=current_timestamp where id=?", [status, job_id])
@@ -0,0 +1,124 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from .. import constants as const
+from .key_pool import ApiCredentials, KeyPool
+from .metrics import metrics
+
+# the author builder of a harvesting process, set up by _init_process
+_process_builder = None
+
+
+def make_author_builder(credentials: list[ApiCredentials],
+                        by_name: bool,
+                        input_name_format: str = const.DEFAULT_NAME_INPUT_FORMAT,
+                        cache_mode: str = None,
+                        selection: dict = None,
+                        rate_share: float = 1.0,
+                        **author_options) -> tuple[Callable, Callable]:
+    # the client of a run, a function building one (unsaved) author of the run with it and a function returning the
+    # request statistics of the run. selection holds the arguments of get_profile_selector, rate_share scales the
+    # request rates of the keys when other processes use them as well
+    from ..models.author import Author
+    from .profile_selection import get_profile_selector
+    from .rate_limiter import DEFAULT_RATES, RequestGovernor
+    from .response_cache import ResponseCache
+    from .run_memo import RunMemo
+    from .scopus_client import ScopusClient
+
+    response_cache = ResponseCache(
+        const.cache_dir,
+        mode=cache_mode or const.DEFAULT_CACHE_MODE,
+        ttls=const.CACHE_TTLS,
+        max_size_mb=const.CACHE_MAX_SIZE_MB)
+    rates = {**DEFAULT_RATES, **const.RATE_LIMITS}
+    governor = RequestGovernor(rates={endpoint: rate * rate_share for endpoint, rate in rates.items()},
+                               max_retries=const.MAX_RETRIES)
+    # papers and profiles shared by several authors of the run are only fetched once
+    memo = RunMemo()
+    key_pool = KeyPool(credentials)
+    els_client = ScopusClient(credentials[0].api_key, inst_token=credentials[0].inst_token,
+                              local_dir=const.project_data_dir, cache=response_cache, governor=governor,
+                              base_url=const.API_BASE_URL, memo=memo, key_pool=key_pool if len(key_pool) > 1 else None)
+
+    author_options = dict(author_options, defer_save=True, select_profiles=get_profile_selector(**(selection or {})))
+    if by_name:
+        build = lambda author_name: Author(els_client, full_name=author_name, input_format=input_name_format,
+                                           **author_options)
+    else:
+        build = lambda author_id: Author(els_client, scopus_id=int(author_id), **author_options)
+
+    def build_author(author_input):
+        with metrics.author_hooks(str(author_input)):
+            return build(author_input)
+
+    def get_stats() -> dict:
+        stats = {"Requests": governor.stats, "Run memo": memo.stats}
+        if response_cache.enabled:
+            stats = {"Response cache": response_cache.stats, **stats}
+        if len(key_pool) > 1:
+            stats["Api keys"] = len(key_pool)
+        return stats
+
+    return build_author, get_stats
+
+
+def get_process_pool(processes: int, credentials: list[ApiCredentials], **builder_options) -> ProcessPoolExecutor:
+    # Harvesting processes for harvest_author, every process gets its share of the api keys (KeyPool.split) and a
+    # client of its own. The processes only read from the database, their authors are sent back and saved by the
+    # calling process, the single writer. builder_options are the ones of make_author_builder, they have to be
+    # picklable (a custom select_profiles has to be a module level function)
+    context = multiprocessing.get_context("spawn")
+    shards = context.Queue()
+    for shard in KeyPool(credentials).split(processes):
+        shards.put(shard)
+
+    settings = dict(config=const.CONFIG, db_path=const.db_manager.db_path, project_data_dir=const.project_data_dir,
+                    cache_dir=const.cache_dir, detailed=metrics.detailed)
+    return ProcessPoolExecutor(processes, mp_context=context, initializer=_init_process,
+                               initargs=(shards, settings, builder_options))
+
+
+def _init_process(shards, settings: dict, builder_options: dict):
+    # the settings of the calling process, which may not come from the config file (e.g. in the benchmarks)
+    global _process_builder
+    from .db_manager import DbManager
+
+    const.CONFIG = settings["config"]
+    const.project_data_dir, const.cache_dir = settings["project_data_dir"], settings["cache_dir"]
+    metrics.configure(detailed=settings["detailed"])
+    const.db_manager = DbManager(settings["db_path"])
+
+    credentials, rate_share = shards.get()
+    _process_builder, _ = make_author_builder(credentials, rate_share=rate_share, **builder_options)
+
+
+def harvest_author(author_input) -> dict:
+    # runs in a harvesting process: the author and its profiles as plain data, with the metrics of the harvest
+    metrics.reset()
+    author = _process_builder(author_input)
+    return dict(
+        profiles=[dict(scopus_id=profile.scopus_id, given_name=profile.given_name, surname=profile.surname,
+                       papers=profile.papers, synced=profile.synced, partial=profile.partial)
+                  for profile in author.scopus_authors],
+        verbose=author.verbose,
+        output_format=author.output_format,
+        metrics=metrics.snapshot(),
+    )
+
+
+def load_harvested_author(harvest: dict):
+    # the Author of a harvest_author result, in the calling process
+    from ..models.author import Author
+    from ..models.scopus_author import ScopusAuthor
+
+    metrics.merge(harvest["metrics"])
+    profiles = []
+    for profile in harvest["profiles"]:
+        scopus_author = ScopusAuthor.from_db(profile["scopus_id"], profile["given_name"], profile["surname"],
+                                             profile["papers"], verbose=harvest["verbose"],
+                                             output_format=harvest["output_format"])
+        scopus_author.synced, scopus_author.partial = profile["synced"], profile["partial"]
+        profiles.append(scopus_author)
+    return Author.from_db(profiles, verbose=harvest["verbose"], output_format=harvest["output_format"])
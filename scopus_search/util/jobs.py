@@ -0,0 +1,34 @@
+import csv
+from pathlib import Path
+
+# header cells that mark the column holding the authors
+_AUTHOR_COLUMNS = ["scopus_id", "author_id", "author", "name"]
+
+
+def read_author_file(input_file: str) -> list[str]:
+    # one author (scopus id or name) per line, csv files may have a header naming the author column.
+    # unquoted rows like `Tao, Terence` are joined back together, so name lists do not need quoting
+    with open(input_file, newline="") as file:
+        rows = [[cell.strip() for cell in row] for row in csv.reader(file)]
+    rows = [row for row in rows if any(row) and not row[0].startswith("#")]
+    if not rows:
+        return []
+
+    header = [cell.lower() for cell in rows[0]]
+    author_column = next((header.index(column) for column in _AUTHOR_COLUMNS if column in header), None)
+    if author_column is not None:
+        return [row[author_column] for row in rows[1:] if len(row) > author_column and row[author_column]]
+
+    return [", ".join(cell for cell in row if cell) for row in rows]
+
+
+def dedupe_author_inputs(author_inputs: list[str]) -> list[str]:
+    # ids are normalized to plain integers, names are compared case insensitively (like the name search)
+    author_inputs = [str(author_input).strip() for author_input in author_inputs]
+    if all(author_input.isnumeric() for author_input in author_inputs):
+        return list(dict.fromkeys(str(int(author_input)) for author_input in author_inputs))
+    return list(dict.fromkeys(author_input.lower() for author_input in author_inputs))
+
+
+def get_job_key(input_file: str) -> str:
+    return str(Path(input_file).resolve())
@@ -0,0 +1,66 @@
+import threading
+from typing import NamedTuple
+
+from .. import constants as const
+
+
+class ApiCredentials(NamedTuple):
+    api_key: str
+    inst_token: str | None = None
+
+
+def get_credentials(api_key: str = None) -> list[ApiCredentials]:
+    # the given api key, otherwise the apikey (and insttoken) of the config followed by the keys of its api_keys pool
+    if api_key:
+        return [ApiCredentials(api_key)]
+
+    credentials = []
+    if const.API_KEY and const.API_KEY != const.API_KEY_PLACEHOLDER:
+        credentials.append(ApiCredentials(const.API_KEY, const.INST_TOKEN))
+    for entry in const.API_KEYS:
+        if isinstance(entry, dict):
+            credentials.append(ApiCredentials(entry["apikey"], entry.get("insttoken")))
+        else:
+            credentials.append(ApiCredentials(entry))
+    return list(dict.fromkeys(credentials))
+
+
+class KeyPool:
+    # Hands out the api keys of a run round robin, so the requests (and the quota) are spread over all of them.
+    # The request governor paces every key on its own, n keys allow n times the request rate of one.
+    # A key whose quota of an endpoint is exhausted is not used for that endpoint for the rest of the run
+    def __init__(self, credentials: list[ApiCredentials]):
+        if not credentials:
+            raise ValueError("Could not find an API key!")
+
+        self.credentials = list(credentials)
+        self._exhausted = set()
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def next(self, endpoint: str) -> ApiCredentials | None:
+        # None once every key is exhausted for the endpoint
+        with self._lock:
+            for _ in range(len(self.credentials)):
+                credentials = self.credentials[self._position]
+                self._position = (self._position + 1) % len(self.credentials)
+                if (credentials, endpoint) not in self._exhausted:
+                    return credentials
+            return None
+
+    def mark_exhausted(self, credentials: ApiCredentials, endpoint: str):
+        with self._lock:
+            self._exhausted.add((credentials, endpoint))
+
+    def split(self, shards: int) -> list[tuple[list[ApiCredentials], float]]:
+        # (credentials, rate share) of every shard of a harvest. with at least as many keys as shards, every shard
+        # gets keys of its own. otherwise the shards share the keys and pace them at their share of the rate
+        if len(self.credentials) >= shards:
+            return [(self.credentials[shard::shards], 1.0) for shard in range(shards)]
+
+        users = [len(range(index, shards, len(self.credentials))) for index in range(len(self.credentials))]
+        return [([self.credentials[shard % len(self.credentials)]], 1 / users[shard % len(self.credentials)])
+                for shard in range(shards)]
@@ -0,0 +1,174 @@
+import cProfile
+import json
+import logging
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger("scopus_search.metrics")
+
+_FILE_NAME_PATTERN = re.compile(r"[^\w.-]+")
+
+# stages in the order of a run, for the report
+STAGES = ["name_resolution", "author_download", "doc_download", "search_download", "abstract_lookup", "db_load",
+          "db_insert", "filter", "output"]
+
+
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+
+class Metrics:
+    # Process wide stage timings and counters. Stages of concurrent workers overlap, so their total can exceed the
+    # wall time of the run. Optionally every author is run under cProfile and / or tracemalloc (see author_hooks).
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.authors = {}
+        # counters that cost noticeable time (tracing every sqlite statement) are only collected when detailed
+        self.detailed = False
+        self.cprofile_dir = None
+        self.trace_memory = False
+        self._started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.stages, self.counters, self.authors = {}, {}, {}
+            self._started_at = time.perf_counter()
+
+    def configure(self, detailed: bool = False, cprofile_dir: str = None, trace_memory: bool = False):
+        self.detailed = detailed
+        self.cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self.trace_memory = trace_memory
+        if self.cprofile_dir:
+            self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.stages.setdefault(name, StageStats()).add(seconds)
+            logger.debug("stage finished", extra={"stage": name, "seconds": round(seconds, 6)})
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def author_hooks(self, author_input: str):
+        # the profile only covers the thread the author is built on, the memory peak is process wide
+        profiler = cProfile.Profile() if self.cprofile_dir else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        if profiler:
+            profiler.enable()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            author_stats = {"seconds": round(time.perf_counter() - start, 6)}
+            if profiler:
+                profiler.disable()
+                profile_file = self.cprofile_dir / f"author_{_FILE_NAME_PATTERN.sub('_', author_input)}.prof"
+                profiler.dump_stats(profile_file)
+                author_stats["cprofile"] = str(profile_file)
+            if self.trace_memory:
+                author_stats["peak_memory_mb"] = round((tracemalloc.get_traced_memory()[1] - memory_before) / 2 ** 20, 3)
+
+            with self._lock:
+                self.authors[author_input] = author_stats
+            logger.debug("author finished", extra={"author": author_input, **author_stats})
+
+    def merge(self, snapshot: dict):
+        # adds the stages, counters and authors of a snapshot taken in another process (see util.harvesting)
+        with self._lock:
+            for name, stage in snapshot["stages"].items():
+                stats = self.stages.setdefault(name, StageStats())
+                stats.count += stage["count"]
+                stats.total_s += stage["total_s"]
+                stats.max_s = max(stats.max_s, stage["max_s"])
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.authors.update(snapshot["authors"])
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else len(STAGES))
+            return {
+                "wall_s": round(time.perf_counter() - self._started_at, 6),
+                "stages": {name: {"count": stats.count, "total_s": round(stats.total_s, 6), "max_s": round(stats.max_s, 6)}
+                           for name, stats in stages},
+                "counters": dict(sorted(self.counters.items())),
+                "authors": dict(self.authors),
+            }
+
+    def get_report(self, profile_format: str = "text") -> str:
+        snapshot = self.snapshot()
+        if profile_format == "json":
+            return json.dumps(snapshot, indent=2)
+        if profile_format == "prometheus":
+            return _to_prometheus(snapshot)
+        return _to_text(snapshot)
+
+
+def _to_text(snapshot: dict) -> str:
+    lines = [f"run: {snapshot['wall_s']:.3f}s", f"{'stage':<18}{'count':>8}{'total s':>12}{'max s':>10}{'share':>8}"]
+    for name, stats in snapshot["stages"].items():
+        share = stats["total_s"] / snapshot["wall_s"] if snapshot["wall_s"] else 0
+        lines.append(f"{name:<18}{stats['count']:>8}{stats['total_s']:>12.3f}{stats['max_s']:>10.3f}{share:>8.0%}")
+
+    if snapshot["counters"]:
+        lines.append("")
+        lines += [f"{name:<26}{value:>14,.3f}" if isinstance(value, float) else f"{name:<26}{value:>14,}"
+                  for name, value in snapshot["counters"].items()]
+
+    for author, stats in snapshot["authors"].items():
+        details = ", ".join(f"{key} {value}" for key, value in stats.items())
+        lines.append(f"author {author}: {details}")
+    return "\n".join(lines)
+
+
+def _to_prometheus(snapshot: dict) -> str:
+    lines = [
+        "# HELP scopus_search_run_seconds Wall time of the run.",
+        "# TYPE scopus_search_run_seconds gauge",
+        f"scopus_search_run_seconds {snapshot['wall_s']}",
+        "# HELP scopus_search_stage_seconds_total Time spent in each stage, summed over all threads.",
+        "# TYPE scopus_search_stage_seconds_total counter",
+    ]
+    lines += [f'scopus_search_stage_seconds_total{{stage="{name}"}} {stats["total_s"]}'
+              for name, stats in snapshot["stages"].items()]
+    lines += [
+        "# HELP scopus_search_stage_calls_total Number of times each stage ran.",
+        "# TYPE scopus_search_stage_calls_total counter",
+    ]
+    lines += [f'scopus_search_stage_calls_total{{stage="{name}"}} {stats["count"]}'
+              for name, stats in snapshot["stages"].items()]
+
+    for name, value in snapshot["counters"].items():
+        metric = f"scopus_search_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
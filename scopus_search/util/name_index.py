@@ -0,0 +1,158 @@
+import math
+import re
+import threading
+import unicodedata
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# confidence of a match by surname and compatible initials ("T." for "Terence", "Ben J." for "Ben Joseph")
+INITIALS_SCORE = 0.9
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+_NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+# the blocks of combining marks, what is left of the accents after the NFKD decomposition
+_COMBINING_MARKS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+")
+
+
+def normalize_name(name: str) -> str:
+    # casefolded, accents stripped, punctuation and hyphens as single spaces: "Pérez-Ruiz, J.-P." -> "perez ruiz j p"
+    name = name or ""
+    if not name.isascii():
+        name = _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", name))
+    name = name.casefold()
+    return _NON_ALPHANUMERIC.sub(" ", name).strip()
+
+
+def get_initials(given_name: str) -> str:
+    # of a normalized given name
+    return " ".join(token[0] for token in given_name.split())
+
+
+def get_trigrams(key: str) -> set[str]:
+    key = f"  {key} "
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def _given_names_compatible(given_name: str, other_given_name: str) -> bool:
+    # same number of tokens and every token either equal or an initial of the other one
+    tokens, other_tokens = given_name.split(), other_given_name.split()
+    return len(tokens) == len(other_tokens) and all(
+        token == other or (len(token) == 1 or len(other) == 1) and token[0] == other[0]
+        for token, other in zip(tokens, other_tokens))
+
+
+class NameIndex:
+    # In memory index over the names of the stored scopus authors. Names are normalized (normalize_name) and looked
+    # up exactly first, then by surname and initials, then ranked by trigram similarity (dice coefficient) among the
+    # authors sharing trigrams with the name, so "terence, tao" or "Perez" find "Terence, Tao" / "Pérez" without a
+    # request. The trigram postings are numpy arrays of positions (in scopus_ids), counted with one bincount.
+    # The authors table is append only, refresh() only reads the rows created since the last load.
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.scopus_ids = []
+        self._base_ids = []
+        self._given_names = []
+        self._names = []
+        self._trigram_counts = _EMPTY
+        self._keys = {}
+        self._initial_keys = {}
+        self._trigrams = {}
+        self._known_ids = set()
+        self._last_created_at = ""
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.scopus_ids)
+
+    def refresh(self) -> int:
+        # indexes the authors inserted since the last refresh, returns their number
+        with self._lock:
+            # created_at has a resolution of one second, the authors of the last loaded second are read again
+            authors = self.db_manager.get_author_names(self._last_created_at)
+            added = 0
+            for scopus_id, base_id, given_name, surname in zip(
+                    authors["scopus_id"].tolist(), authors["base_id"].tolist(),
+                    authors["given_name"].tolist(), authors["surname"].tolist()):
+                if scopus_id not in self._known_ids:
+                    self._add(int(scopus_id), int(base_id) if pd.notna(base_id) else None, given_name, surname)
+                    added += 1
+            if len(authors):
+                self._last_created_at = authors["created_at"].max()
+            return added
+
+    def _add(self, scopus_id: int, base_id: int | None, given_name: str, surname: str):
+        given_name, surname = normalize_name(given_name), normalize_name(surname)
+        key = f"{surname} {given_name}"
+        position = len(self.scopus_ids)
+
+        self.scopus_ids.append(scopus_id)
+        self._known_ids.add(scopus_id)
+        self._base_ids.append(base_id or scopus_id)
+        self._given_names.append(given_name)
+        self._names.append(key)
+        self._keys.setdefault(key, []).append(position)
+        self._initial_keys.setdefault(f"{surname} {get_initials(given_name)}", []).append(position)
+
+    def _index_trigrams(self):
+        # the trigram postings are only needed by the fuzzy lookup, they are built on its first use for the authors
+        # added since, grouped by trigram without a python loop over every (trigram, author) pair
+        with self._lock:
+            first_position = len(self._trigram_counts)
+            if first_position == len(self._names):
+                return
+
+            trigrams = [get_trigrams(name) for name in self._names[first_position:]]
+            trigram_counts = np.array([len(name_trigrams) for name_trigrams in trigrams], dtype=np.int64)
+            positions = np.repeat(np.arange(first_position, len(self._names)), trigram_counts)
+            codes, unique_trigrams = pd.factorize(pd.Series(list(chain.from_iterable(trigrams)), dtype=object))
+            order = np.argsort(codes, kind="stable")
+            bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(unique_trigrams)))]
+            for code, trigram in enumerate(unique_trigrams):
+                new_positions = positions[order[bounds[code]:bounds[code + 1]]]
+                self._trigrams[trigram] = np.concatenate([self._trigrams[trigram], new_positions]) \
+                    if trigram in self._trigrams else new_positions
+            self._trigram_counts = np.concatenate([self._trigram_counts, trigram_counts])
+
+    def _match(self, given_name: str, surname: str, threshold: float, limit: int | None) -> list[tuple[float, int]]:
+        # (confidence, position) of the best matches. the fuzzy ranking only runs if neither the exact nor the
+        # initials lookup found an author, names given by initials alone are only matched by the initials lookup
+        given_name, surname = normalize_name(given_name), normalize_name(surname)
+        key = f"{surname} {given_name}"
+        initials_only = all(len(token) == 1 for token in given_name.split())
+
+        scores = {} if initials_only else {position: 1.0 for position in self._keys.get(key, [])}
+        initial_matches = self._initial_keys.get(f"{surname} {get_initials(given_name)}", [])
+        # the initials only decide if all stored names with them belong to one author ("T. Tao" is not "Tiffany Tao")
+        if not scores and INITIALS_SCORE >= threshold \
+                and len({self._base_ids[position] for position in initial_matches}) == 1:
+            scores = {position: INITIALS_SCORE for position in initial_matches
+                      if _given_names_compatible(given_name, self._given_names[position])}
+        if not scores and not initials_only:
+            self._index_trigrams()
+            trigrams = get_trigrams(key)
+            postings = [self._trigrams[trigram] for trigram in trigrams if trigram in self._trigrams]
+            if postings:
+                shared = np.bincount(np.concatenate(postings), minlength=len(self.scopus_ids))
+                # a dice coefficient >= threshold needs at least threshold * n / (2 - threshold) shared trigrams
+                positions = np.flatnonzero(shared >= max(math.ceil(threshold * len(trigrams) / (2 - threshold)), 1))
+                dice = 2 * shared[positions] / (len(trigrams) + self._trigram_counts[positions])
+                keep = dice >= threshold
+                scores = dict(zip(positions[keep].tolist(), dice[keep].tolist()))
+
+        return sorted(((score, position) for position, score in scores.items() if score >= threshold),
+                      key=lambda match: -match[0])[:limit]
+
+    def lookup(self, given_name: str, surname: str, threshold: float = 0.85, limit: int = 10) -> pd.Series:
+        # scopus id -> confidence (1: same normalized name) of the stored authors matching the name, best first
+        matches = self._match(given_name, surname, threshold, limit)
+        return pd.Series([score for score, _ in matches], index=pd.Index(
+            [self.scopus_ids[position] for _, position in matches], name="scopus_id", dtype="int64"),
+            name="confidence", dtype="float64")
+
+    def resolve(self, given_name: str, surname: str, threshold: float = 0.85) -> int | None:
+        # the base author of the name, None if no stored author matches or the matches belong to several base authors
+        bases = {self._base_ids[position] for _, position in self._match(given_name, surname, threshold, limit=None)}
+        return bases.pop() if len(bases) == 1 else None
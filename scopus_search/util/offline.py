@@ -0,0 +1,101 @@
+from typing import Iterator
+
+import numpy as np
+
+from .. import constants as const
+from ..models.author import Author, _extract_names_from_full_name
+from ..models.paper import COLUMNS
+from ..models.scopus_author import ScopusAuthor
+from .commandline_util import log_and_print_if_verbose
+from .metrics import metrics
+
+# authors whose papers are loaded with one query
+CHUNK_SIZE = 200
+
+
+def _resolve_profiles(author_inputs: list[str], by_name: bool, input_name_format: str,
+                      exclude_scopus_ids: list[int]) -> dict[str, list[tuple]]:
+    # author input -> its stored profiles as (scopus_id, given_name, surname), the base author first.
+    # like the online lookup, a scopus id stands for that profile alone and a name for all profiles linked to it
+    db_manager = const.db_manager
+    if not by_name:
+        authors = db_manager.get_scopus_authors([int(author_input) for author_input in author_inputs])
+        authors = {int(author.scopus_id): (int(author.scopus_id), author.given_name, author.surname)
+                   for author in authors.itertuples(index=False)}
+        return {
+            author_input: [authors[int(author_input)]]
+            for author_input in author_inputs if int(author_input) in authors
+        }
+
+    name_index = db_manager.name_index
+    bases = {}
+    for position, author_input in enumerate(author_inputs):
+        base_id = name_index.resolve(*_extract_names_from_full_name(author_input, input_name_format),
+                                     const.NAME_MATCH_THRESHOLD)
+        if base_id is not None:
+            bases[position] = base_id
+    linked = db_manager.get_linked_scopus_authors(set(bases.values()))
+    linked = linked[~linked["scopus_id"].isin(exclude_scopus_ids)]
+    profiles = {}
+    for author in linked.itertuples(index=False):
+        profiles.setdefault(int(author.base), []).append((int(author.scopus_id), author.given_name, author.surname))
+    return {author_inputs[name]: profiles[base] for name, base in bases.items() if base in profiles}
+
+
+def iter_offline_authors(authors: list,
+                         by_name: bool = None,
+                         verbose: bool = False,
+                         input_name_format: str = const.DEFAULT_NAME_INPUT_FORMAT,
+                         output_name_format: str = const.DEFAULT_NAME_OUTPUT_FORMAT,
+                         exclude_scopus_ids: list[int] = None,
+                         max_year: int = None,
+                         min_year: int = None,
+                         include_authors: list[int] = None,
+                         include_all_authors: list[int] = None,
+                         not_include_authors: list[int] = None) -> Iterator[Author]:
+    # Builds the authors from the database alone, in input order and without a single request. The papers of
+    # CHUNK_SIZE authors are loaded with one query that already applies the year and co-author filters.
+    # Raises before loading anything if an author (or one of its profiles) is not stored with its papers.
+    author_inputs = list(dict.fromkeys(str(author).strip() for author in authors))
+    if not author_inputs:
+        raise ValueError("No author data was input!")
+    if by_name is None:
+        by_name = not all(author_input.isnumeric() for author_input in author_inputs)
+
+    with metrics.stage("name_resolution"):
+        profiles = _resolve_profiles(author_inputs, by_name, input_name_format, exclude_scopus_ids or [])
+        paper_counts = const.db_manager.get_paper_counts(
+            {scopus_id for author_profiles in profiles.values() for scopus_id, _, _ in author_profiles})
+
+    missing = [author_input for author_input in author_inputs if author_input not in profiles
+               or not all(scopus_id in paper_counts for scopus_id, _, _ in profiles[author_input])]
+    if missing:
+        raise ValueError(f"Not stored in the database, run without --offline first: {', '.join(missing)}")
+
+    for start in range(0, len(author_inputs), CHUNK_SIZE):
+        chunk = author_inputs[start:start + CHUNK_SIZE]
+        with metrics.stage("db_load"):
+            papers = const.db_manager.get_papers_of_authors(
+                {scopus_id for author_input in chunk for scopus_id, _, _ in profiles[author_input]},
+                min_year, max_year, include_authors, include_all_authors, not_include_authors, with_affiliations=True)
+        papers["from_db"] = True
+        # the papers come sorted by author, so every author gets a slice of them
+        owners = papers["owner"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]]) if len(owners) else []
+        ends = np.r_[starts[1:], len(owners)] if len(owners) else []
+        papers = papers[COLUMNS]
+        papers_by_author = {int(owners[start]): papers.iloc[start:end].reset_index(drop=True)
+                            for start, end in zip(starts, ends)}
+
+        for author_input in chunk:
+            scopus_authors = [
+                ScopusAuthor.from_db(
+                    scopus_id, given_name, surname,
+                    papers_by_author[scopus_id] if scopus_id in papers_by_author else papers.iloc[:0],
+                    verbose=verbose, output_format=output_name_format)
+                for scopus_id, given_name, surname in profiles[author_input]
+            ]
+            log_and_print_if_verbose(
+                f"Loaded {sum(len(auth.papers) for auth in scopus_authors)} papers of {author_input} from the database",
+                verbose)
+            yield Author.from_db(scopus_authors, verbose=verbose, output_format=output_name_format)
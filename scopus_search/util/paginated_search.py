@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from urllib.parse import quote_plus
+
+from elsapy.elsclient import ElsClient
+
+from .. import constants as const
+from .metrics import metrics
+
+SEARCH_URL = "https://api.elsevier.com/content/search/"
+
+# the complete view of the scopus index returns at most 25 entries per request, the other views 200
+_MAX_PAGE_SIZES = {"COMPLETE": 25}
+_DEFAULT_MAX_PAGE_SIZE = 200
+
+# only the scopus index supports cursors, the other indexes are paged with start offsets up to 5000 results
+_CURSOR_INDEXES = ["scopus"]
+_MAX_OFFSET_RESULTS = 5000
+
+
+class PaginatedSearch:
+    # Replacement for ElsSearch.execute that reads every result page instead of only the first one.
+    # Pages are yielded as soon as they arrive, the request for the next page is sent before the current
+    # page is handed to the caller, so it downloads while the caller is processing the current one.
+    def __init__(self,
+                 els_client: ElsClient,
+                 query: str,
+                 index: str,
+                 view: str = None,
+                 sort: str = None,
+                 page_size: int = None,
+                 max_results: int = None):
+        page_size = page_size or const.SEARCH_PAGE_SIZE
+        max_results = max_results or const.MAX_SEARCH_RESULTS
+
+        max_page_size = _MAX_PAGE_SIZES.get(view, _DEFAULT_MAX_PAGE_SIZE)
+        if page_size is not None and page_size < 1:
+            raise ValueError("The page size has to be at least 1!")
+
+        self.query = query
+        self.index = index
+        self.view = view
+        self.sort = sort
+        self.page_size = min(page_size or max_page_size, max_page_size)
+        self.max_results = max_results
+        self.use_cursor = index in _CURSOR_INDEXES
+
+        # set once the first page arrived
+        self.total_results = None
+        self._els_client = els_client
+
+    def get_results(self) -> list[dict]:
+        return [entry for page in self.iter_pages() for entry in page]
+
+    def iter_pages(self) -> Iterator[list[dict]]:
+        position = "*" if self.use_cursor else 0
+        fetched = 0
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scopus_search_pages")
+        pending = executor.submit(self._fetch_page, position)
+        try:
+            while pending is not None:
+                total_results, entries, next_cursor = pending.result()
+                pending = None
+                self.total_results = total_results
+
+                limit = min(filter(None, [
+                    total_results,
+                    self.max_results,
+                    None if self.use_cursor else _MAX_OFFSET_RESULTS]), default=0)
+                entries = entries[:max(limit - fetched, 0)]
+                fetched += len(entries)
+
+                # a missing or repeated cursor means the index has no more results, even if the total says otherwise
+                next_position = next_cursor if self.use_cursor else fetched
+                if entries and fetched < limit and next_position is not None and next_position != position:
+                    pending = executor.submit(self._fetch_page, next_position)
+                    position = next_position
+
+                if entries:
+                    yield entries
+        finally:
+            # when the caller stopped early the prefetched page is not needed anymore, we do not wait for it
+            if pending is not None:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+    def _get_url(self, position) -> str:
+        # position is a cursor for cursored indexes and a start offset for the others
+        url = f"{SEARCH_URL}{self.index}?query={quote_plus(self.query)}&count={self.page_size}"
+        if self.view:
+            url += f"&view={self.view}"
+        if self.sort:
+            url += f"&sort={self.sort}"
+
+        if self.use_cursor:
+            return url + f"&cursor={quote_plus(position)}"
+        return url + f"&start={position}"
+
+    def _fetch_page(self, position) -> (int, list, str):
+        with metrics.stage("search_download" if self.index == "scopus" else "name_resolution"):
+            results = self._els_client.exec_request(self._get_url(position))["search-results"]
+
+        # empty result sets consist of a single entry with an error message
+        entries = [entry for entry in results.get("entry", []) if "error" not in entry]
+        next_cursor = (results.get("cursor") or {}).get("@next")
+        return int(results.get("opensearch:totalResults") or 0), entries, next_cursor
@@ -0,0 +1,128 @@
+from itertools import chain
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from .. import constants as const
+from .metrics import metrics
+
+
+def get_pub_years(dates: pd.Series) -> pd.Series:
+    # the publication year of cover dates like "2021-03-01", missing or malformed dates become NA
+    return pd.to_numeric(dates.astype("string").str[:4], errors="coerce").astype("Int64")
+
+
+class AuthorIndex:
+    # exploded author membership of a set of papers: paper row i has the authors flat[rows == i]
+    def __init__(self, authors: Sequence):
+        authors = [paper_authors if isinstance(paper_authors, (tuple, list)) else () for paper_authors in authors]
+        lengths = np.fromiter((len(paper_authors) for paper_authors in authors), dtype=np.int64, count=len(authors))
+
+        self.size = len(authors)
+        self.rows = np.repeat(np.arange(self.size), lengths)
+        self.flat = np.fromiter(chain.from_iterable(authors), dtype=np.int64, count=int(lengths.sum()))
+
+    def contains_any(self, scopus_ids: list[int]) -> np.ndarray:
+        found = np.zeros(self.size, dtype=bool)
+        found[self.rows[np.isin(self.flat, scopus_ids)]] = True
+        return found
+
+    def contains_all(self, scopus_ids: list[int]) -> np.ndarray:
+        wanted = np.unique(np.asarray(scopus_ids, dtype=np.int64))
+        matched = np.isin(self.flat, wanted)
+
+        # (row, author) pairs are deduplicated, so authors listed twice on a paper are only counted once
+        pairs = np.unique(self.rows[matched] * len(wanted) + np.searchsorted(wanted, self.flat[matched]))
+        return np.bincount(pairs // len(wanted), minlength=self.size) == len(wanted)
+
+
+class PaperFilter:
+    def __init__(self,
+                 max_year: int = None,
+                 min_year: int = None,
+                 include_authors: list[int] = None,
+                 include_all_authors: list[int] = None,
+                 not_include_authors: list[int] = None,
+                 title_query: str = None,
+                 venue_query: str = None):
+        self.max_year = max_year
+        self.min_year = min_year
+        self.include_authors = list(include_authors or [])
+        self.include_all_authors = list(include_all_authors or [])
+        self.not_include_authors = list(not_include_authors or [])
+        # full text queries over the stored papers (see DbManager.match_papers), papers that are not stored never match
+        self.title_query = title_query
+        self.venue_query = venue_query
+
+    @property
+    def active(self) -> bool:
+        return bool(self.max_year or self.min_year or self.filters_authors or self.filters_text)
+
+    @property
+    def filters_authors(self) -> bool:
+        return bool(self.include_authors or self.include_all_authors or self.not_include_authors)
+
+    @property
+    def filters_text(self) -> bool:
+        return bool(self.title_query or self.venue_query)
+
+    def get_mask(self, pub_years: pd.Series | np.ndarray, authors: Sequence,
+                 scopus_ids: pd.Series | np.ndarray = None) -> np.ndarray:
+        # pub_years, authors and scopus_ids are the columns of one or more (concatenated) paper frames
+        years = pd.Series(pub_years).to_numpy(dtype=float, na_value=np.nan)
+        keep = np.ones(len(years), dtype=bool)
+
+        if self.max_year:
+            keep &= years <= self.max_year
+        if self.min_year:
+            keep &= years >= self.min_year
+
+        if self.filters_authors:
+            index = AuthorIndex(authors)
+            if self.not_include_authors:
+                keep &= ~index.contains_any(self.not_include_authors)
+            if self.include_authors:
+                keep &= index.contains_any(self.include_authors)
+            if self.include_all_authors:
+                keep &= index.contains_all(self.include_all_authors)
+
+        if self.filters_text:
+            keep &= np.isin(np.asarray(scopus_ids, dtype=np.int64),
+                            const.db_manager.match_papers(self.title_query, self.venue_query))
+
+        return keep
+
+    def apply(self, papers: pd.DataFrame) -> pd.DataFrame:
+        if not self.active or papers.empty:
+            return papers
+
+        with metrics.stage("filter"):
+            pub_years = papers["pub_year"] if "pub_year" in papers else get_pub_years(papers["date"])
+            return papers[self.get_mask(pub_years, papers["authors"].tolist(), papers["scopus_id"])]
+
+    def apply_to_all(self, paper_frames: list[pd.DataFrame]) -> list[pd.DataFrame]:
+        # evaluates the filter once over the papers of all frames and splits the result up again
+        if not self.active or not paper_frames:
+            return paper_frames
+
+        non_empty = [papers for papers in paper_frames if not papers.empty]
+        if not non_empty:
+            return paper_frames
+
+        with metrics.stage("filter"):
+            pub_years = np.concatenate([
+                (papers["pub_year"] if "pub_year" in papers else get_pub_years(papers["date"]))
+                .to_numpy(dtype=float, na_value=np.nan)
+                for papers in non_empty])
+            mask = self.get_mask(pub_years, list(chain.from_iterable(papers["authors"].tolist() for papers in non_empty)),
+                                 np.concatenate([papers["scopus_id"].to_numpy(dtype=np.int64) for papers in non_empty]))
+
+            filtered, start = [], 0
+            for papers in paper_frames:
+                if papers.empty:
+                    filtered.append(papers)
+                    continue
+                filtered.append(papers[mask[start:start + len(papers)]])
+                start += len(papers)
+            return filtered
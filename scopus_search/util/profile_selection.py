@@ -0,0 +1,64 @@
+import sys
+from typing import Callable
+
+# picks the profiles of an author search to download, they only carry the metadata of their search entry
+ProfileSelector = Callable[[list], list]
+
+
+def by_document_count(min_document_count: int) -> ProfileSelector:
+    # profiles with an unknown document count are kept
+    return lambda profiles: [
+        profile for profile in profiles
+        if profile.document_count is None or profile.document_count >= min_document_count
+    ]
+
+
+def by_affiliation(affiliation: str) -> ProfileSelector:
+    # the current affiliation has to be the given affiliation id or contain the given text (case insensitive),
+    # profiles with an unknown affiliation are left out
+    affiliation = str(affiliation).strip()
+
+    def select(profiles: list) -> list:
+        if affiliation.isdigit():
+            return [profile for profile in profiles if profile.affiliation_id == int(affiliation)]
+        return [profile for profile in profiles
+                if profile.affiliation and affiliation.casefold() in profile.affiliation.casefold()]
+
+    return select
+
+
+def interactively(profiles: list) -> list:
+    # asks the user to pick from several profiles, a single one is kept without asking
+    from .commandline_util import select_from_author_search_entries
+
+    if len(profiles) < 2:
+        return profiles
+    return select_from_author_search_entries([
+        (f"{profile.given_name} {profile.surname} ({profile.scopus_id}): "
+         f"{profile.document_count if profile.document_count is not None else '?'} documents, "
+         f"{profile.affiliation or 'unknown affiliation'}", profile)
+        for profile in profiles
+    ])
+
+
+def get_profile_selector(min_document_count: int = None, affiliation: str = None,
+                         select_profiles: ProfileSelector = None, interactive: bool = False) -> ProfileSelector | None:
+    # the selectors run in this order, the interactive one only if there is a terminal to ask
+    selectors = []
+    if min_document_count:
+        selectors.append(by_document_count(min_document_count))
+    if affiliation:
+        selectors.append(by_affiliation(affiliation))
+    if select_profiles:
+        selectors.append(select_profiles)
+    if interactive and sys.stdin.isatty():
+        selectors.append(interactively)
+    if not selectors:
+        return None
+
+    def select(profiles: list) -> list:
+        for selector in selectors:
+            profiles = selector(profiles)
+        return profiles
+
+    return select
@@ -0,0 +1,45 @@
+from .paper_filter import PaperFilter
+
+
+class QueryPlan:
+    # Decides where the paper filters of a run are evaluated. The year and co-author filters are pushed down into the
+    # scopus search (PUBYEAR / AU-ID clauses, only matching papers are downloaded) and into the database queries
+    # (where / exists clauses, only matching papers are loaded). The PaperFilter still runs on every result, it covers
+    # what is not pushed down: the full text queries and the papers of the documents view, which cannot be filtered
+    def __init__(self, paper_filter: PaperFilter):
+        self.paper_filter = paper_filter
+
+    @property
+    def pushdown(self) -> bool:
+        paper_filter = self.paper_filter
+        return bool(paper_filter.max_year or paper_filter.min_year or paper_filter.filters_authors)
+
+    def get_search_clauses(self) -> list[str]:
+        # joined with AND to the AU-ID(<author>) query of the scopus search
+        paper_filter = self.paper_filter
+        clauses = []
+        if paper_filter.min_year:
+            clauses.append(f"PUBYEAR > {paper_filter.min_year - 1}")
+        if paper_filter.max_year:
+            clauses.append(f"PUBYEAR < {paper_filter.max_year + 1}")
+        if paper_filter.include_authors:
+            co_authors = " OR ".join(f"AU-ID({int(author)})" for author in dict.fromkeys(paper_filter.include_authors))
+            clauses.append(f"({co_authors})")
+        clauses += [f"AU-ID({int(author)})" for author in dict.fromkeys(paper_filter.include_all_authors)]
+        clauses += [f"NOT AU-ID({int(author)})" for author in dict.fromkeys(paper_filter.not_include_authors)]
+        return clauses
+
+    def get_db_filters(self) -> dict:
+        # keyword arguments of DbManager.get_papers_of_authors
+        paper_filter = self.paper_filter
+        return dict(min_year=paper_filter.min_year, max_year=paper_filter.max_year,
+                    include_authors=paper_filter.include_authors,
+                    include_all_authors=paper_filter.include_all_authors,
+                    not_include_authors=paper_filter.not_include_authors)
+
+
+def get_query_plan(max_year: int = None, min_year: int = None, include_authors: list[int] = None,
+                   include_all_authors: list[int] = None, not_include_authors: list[int] = None) -> QueryPlan | None:
+    # None if there is nothing to push down
+    plan = QueryPlan(PaperFilter(max_year, min_year, include_authors, include_all_authors, not_include_authors))
+    return plan if plan.pushdown else None
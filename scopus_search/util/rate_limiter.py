@@ -0,0 +1,191 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from .metrics import metrics
+from .response_cache import get_endpoint
+
+# requests per second the apis allow a default api key, per endpoint (see https://dev.elsevier.com/api_key_settings.html)
+DEFAULT_RATES = {
+    "author": 3,
+    "author_search": 2,
+    "scopus_search": 9,
+    "abstract": 9,
+    "other": 2,
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class QuotaExceededError(Exception):
+    # deliberately no requests exception: elsapy swallows those and reports them as an empty result
+    pass
+
+
+class TokenBucket:
+    # Thread safe token bucket. reserve() hands out tokens in advance and returns how long the caller has to wait
+    # for its token, so waiting callers never hold the lock. _updated_at in the future is a pause (Retry-After).
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("The request rate has to be positive!")
+
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # negative tokens are owed to earlier reservations
+            return max(self._updated_at - now, 0) + max(-self._tokens, 0) / self.rate
+
+    def pause(self, seconds: float):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0)
+            self._updated_at = max(self._updated_at, now + seconds)
+
+    def limit(self, remaining: int):
+        # the server knows better how many requests are left, e.g. when other processes share the api key
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, remaining)
+
+    def _refill(self, now: float):
+        if now > self._updated_at:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+
+class RequestGovernor:
+    # Paces all requests with one token bucket per api key and endpoint, adjusted by the X-RateLimit-* headers of the
+    # responses. 429 and 5xx responses (and connection errors) are retried with jittered exponential backoff,
+    # a Retry-After header takes precedence and pauses every request to the endpoint, not only the retried one.
+    def __init__(self,
+                 rates: dict = None,
+                 max_retries: int = 5,
+                 backoff_base: float = 1,
+                 backoff_max: float = 60,
+                 max_quota_wait: float = 300):
+        self.rates = {**DEFAULT_RATES, **(rates or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # the quota resets weekly, waiting for a reset further away than this raises a QuotaExceededError instead
+        self.max_quota_wait = max_quota_wait
+
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        return dict(requests=self.requests, retries=self.retries, throttled_seconds=round(self.throttled_seconds, 3))
+
+    def send(self, api_key: str, url: str, send_request) -> requests.Response:
+        # send_request() performs the actual request, it is called again for every retry
+        endpoint = get_endpoint(url)
+        bucket = self._get_bucket(api_key, endpoint)
+
+        for attempt in range(self.max_retries + 1):
+            self._wait(bucket.reserve())
+            self._count(requests=1)
+
+            try:
+                response = send_request()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._count(retries=1)
+                self._wait(self._get_backoff(attempt))
+                continue
+
+            self._apply_quota_headers(bucket, response)
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+
+            if response.status_code == 429 and response.headers.get("X-RateLimit-Remaining") == "0":
+                reset_in = self._get_reset_in(response)
+                if reset_in is None or reset_in > self.max_quota_wait:
+                    raise QuotaExceededError(f"The {endpoint} quota of the api key is exhausted" + (
+                        f", it resets in {reset_in / 3600:.1f} hours" if reset_in is not None else ""))
+
+            if attempt == self.max_retries:
+                break
+
+            self._count(retries=1)
+            delay = self._get_retry_after(response)
+            delay = self._get_backoff(attempt) if delay is None else delay + random.uniform(0, self.backoff_base)
+            if response.status_code == 429:
+                bucket.pause(delay)
+            else:
+                self._wait(delay)
+
+        if response.status_code == 429:
+            raise QuotaExceededError(f"Still rate limited by the {endpoint} api after {self.max_retries} retries")
+        return response
+
+    def _get_bucket(self, api_key: str, endpoint: str) -> TokenBucket:
+        with self._lock:
+            if (api_key, endpoint) not in self._buckets:
+                self._buckets[(api_key, endpoint)] = TokenBucket(self.rates.get(endpoint, self.rates["other"]))
+            return self._buckets[(api_key, endpoint)]
+
+    def _apply_quota_headers(self, bucket: TokenBucket, response: requests.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is None or not remaining.isdigit():
+            return
+
+        bucket.limit(int(remaining))
+        if int(remaining) == 0:
+            reset_in = self._get_reset_in(response)
+            if reset_in is not None and reset_in <= self.max_quota_wait:
+                bucket.pause(reset_in)
+
+    def _get_backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def _wait(self, seconds: float):
+        if seconds > 0:
+            self._count(throttled_seconds=seconds)
+            time.sleep(seconds)
+
+    def _count(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+        for name, value in counters.items():
+            metrics.count(f"http_{name}", value)
+
+    @staticmethod
+    def _get_reset_in(response: requests.Response) -> float | None:
+        # X-RateLimit-Reset is the epoch second at which the quota resets
+        reset = response.headers.get("X-RateLimit-Reset")
+        if reset is None or not reset.isdigit():
+            return None
+        return max(int(reset) - time.time(), 0)
+
+    @staticmethod
+    def _get_retry_after(response: requests.Response) -> float | None:
+        retry_after = response.headers.get("Retry-After")
+        if not retry_after:
+            return None
+        if retry_after.isdigit():
+            return float(retry_after)
+
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
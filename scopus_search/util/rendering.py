@@ -0,0 +1,153 @@
+import json
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .. import constants as const
+from ..models.author import Author
+
+# the paper fields of the json, ndjson, csv and markdown output
+PAPER_FIELDS = ["scopus_id", "title", "authors", "date"]
+# one row per paper of one scopus profile of a base author, like the arrow / parquet table
+TABLE_COLUMNS = ["base_author", "scopus_author", "name", *PAPER_FIELDS]
+SORT_COLUMNS = ["scopus_id", "eid", "title", "date", "pub_year", "origin", "publication_name", "issn", "isbn",
+                "issue_id", "page_range"]
+_SORT_ORDERS = {"asc": True, "desc": False}
+
+_MARKDOWN_HEADER = "| Date | Title | Scopus id | Authors |\n| --- | --- | --- | --- |"
+
+
+def parse_sort_by(sort_by: list[str] = None) -> tuple[list[str], list[bool]]:
+    # "column" (ascending) or "column:asc" / "column:desc" to the by and ascending arguments of sort_values
+    columns, ascending = [], []
+    for key in sort_by or const.DEFAULT_SORT_BY:
+        column, _, order = key.partition(":")
+        order = order.lower() or "asc"
+        if column not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort papers by {column}, possible columns: {', '.join(SORT_COLUMNS)}")
+        if order not in _SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {order}, possible orders: {', '.join(_SORT_ORDERS)}")
+        columns.append(column)
+        ascending.append(_SORT_ORDERS[order])
+    return columns, ascending
+
+
+def sort_papers(papers: pd.DataFrame, sort_by: list[str] = None) -> pd.DataFrame:
+    # stable, so papers with equal keys are listed in the same order by every output format
+    columns, ascending = parse_sort_by(sort_by)
+    return papers.sort_values(by=columns, ascending=ascending, kind="stable")
+
+
+def get_paper_records(papers: pd.DataFrame) -> list[dict]:
+    # zipped from whole columns, tolist also turns the numpy scalars into python values
+    columns = [papers[field].tolist() for field in PAPER_FIELDS]
+    return [dict(zip(PAPER_FIELDS, values)) for values in zip(*columns)]
+
+
+def to_json_value(value):
+    # numpy scalars are converted to their python counterpart
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_json(value) -> str:
+    # one call of the c encoder for the whole output
+    return json.dumps(value, default=to_json_value, check_circular=False)
+
+
+def get_paper_table(authors: Iterable[Author], sort_by: list[str] = None) -> pd.DataFrame:
+    # the papers of all profiles concatenated once and sorted with one stable sort by profile and sort keys (the
+    # order of sort_papers per profile), the author columns are repeated per profile
+    columns, ascending = parse_sort_by(sort_by)
+    keys, frames = [], []
+    for author in authors:
+        for auth in author.scopus_authors:
+            keys.append((author.base_author.scopus_id, auth.scopus_id, auth._get_output_key()))
+            frames.append(auth.papers[list(dict.fromkeys(PAPER_FIELDS + columns))])
+    if not frames:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+
+    lengths = [len(papers) for papers in frames]
+    table = pd.concat(frames, ignore_index=True)
+    table["_profile"] = np.repeat(np.arange(len(frames)), lengths)
+    table = table.sort_values(["_profile", *columns], ascending=[True, *ascending], kind="stable", ignore_index=True)
+    for column, values in zip(TABLE_COLUMNS, zip(*keys)):
+        table[column] = np.repeat(np.array(values, dtype=object if column == "name" else np.int64), lengths)
+    return table[TABLE_COLUMNS]
+
+
+def _join_authors(authors: pd.Series, separator: str) -> pd.Series:
+    return pd.Series([separator.join(map(str, author_list)) if isinstance(author_list, (tuple, list)) else ""
+                      for author_list in authors.tolist()], index=authors.index, dtype=str)
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    # str columns (arrow backed since pandas 3) are concatenated in bulk, several times faster than the string dtype.
+    # missing values become empty strings, also of nullable integer columns like pub_year
+    text = values.astype(str)
+    return text.where(values.notna(), "") if values.hasnans else text
+
+
+def _quote_csv(values: pd.Series) -> pd.Series:
+    return '"' + _as_text(values).str.replace('"', '""', regex=False) + '"'
+
+
+def get_csv(papers: pd.DataFrame) -> str:
+    # every row is concatenated column by column, the text columns are always quoted and the author ids of a
+    # paper are joined with ";"
+    columns = []
+    for column in papers.columns:
+        if column == "authors":
+            columns.append(_join_authors(papers[column], ";"))
+        elif pd.api.types.is_numeric_dtype(papers[column]):
+            columns.append(_as_text(papers[column]))
+        else:
+            columns.append(_quote_csv(papers[column]))
+
+    header = ",".join(papers.columns)
+    if not columns or papers.empty:
+        return header + "\n"
+    rows = columns[0]
+    for values in columns[1:]:
+        rows = rows + "," + values
+    return "\n".join([header, *rows.tolist(), ""])
+
+
+def render_csv(authors: Iterable[Author], sort_by: list[str] = None) -> str:
+    return get_csv(get_paper_table(authors, sort_by))
+
+
+def _escape_markdown(values: pd.Series) -> pd.Series:
+    return _as_text(values).str.replace("|", "\\|", regex=False).str.replace("\n", " ", regex=False)
+
+
+def get_markdown_rows(papers: pd.DataFrame) -> list[str]:
+    # one table row per paper, built column by column
+    rows = ("| " + _escape_markdown(papers["date"])
+            + " | " + _escape_markdown(papers["title"])
+            + " | " + _as_text(papers["scopus_id"])
+            + " | " + _join_authors(papers["authors"], ", ")
+            + " |")
+    return rows.tolist()
+
+
+def get_markdown_table(papers: pd.DataFrame) -> str:
+    return "\n".join([_MARKDOWN_HEADER, *get_markdown_rows(papers)])
+
+
+def render_markdown(authors: Iterable[Author], sort_by: list[str] = None) -> str:
+    # a section per base author and a table per scopus profile, the rows of all profiles are formatted at once
+    authors = list(authors)
+    table = get_paper_table(authors, sort_by)
+    rows = get_markdown_rows(table)
+
+    lines, start = [], 0
+    for author in authors:
+        lines += [f"# {author.base_author._get_output_key()} ({author.base_author.scopus_id})", ""]
+        for auth in author.scopus_authors:
+            end = start + len(auth.papers)
+            lines += [f"## {auth._get_output_key()} ({auth.scopus_id})", "", _MARKDOWN_HEADER, *rows[start:end], ""]
+            start = end
+    return "\n".join(lines)
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+from ..constants import CACHE_MODES
+
+# seconds until a cached response has to be fetched (or revalidated) again
+DEFAULT_TTLS = {
+    "author": 7 * 24 * 60 * 60,
+    "author_search": 24 * 60 * 60,
+    "scopus_search": 24 * 60 * 60,
+    "abstract": 30 * 24 * 60 * 60,
+    "other": 24 * 60 * 60,
+}
+
+_CREATE_ENTRIES_QUERY = """
+create table if not exists entries
+(
+    key           TEXT not null
+        constraint entries_pk
+            primary key,
+    url           TEXT not null,
+    endpoint      TEXT not null,
+    size          INTEGER not null,
+    etag          TEXT,
+    last_modified TEXT,
+    fetched_at    REAL not null,
+    accessed_at   REAL not null
+);"""
+
+_CREATE_ENTRIES_IDX_QUERY = "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);"
+
+
+def get_endpoint(url: str) -> str:
+    path = urlparse(url).path
+    if path.startswith("/content/search/author"):
+        return "author_search"
+    if path.startswith("/content/search/"):
+        return "scopus_search"
+    if path.startswith("/content/author/"):
+        return "author"
+    if path.startswith("/content/abstract/"):
+        return "abstract"
+    return "other"
+
+
+def get_cache_key(url: str) -> str:
+    # the query parameters are sorted, so equivalent urls share one entry
+    parsed = urlparse(url)
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return hashlib.sha256(f"{parsed.netloc}{parsed.path}?{query}".encode()).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    data: dict
+    fresh: bool
+    etag: str = None
+    last_modified: str = None
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: Path, mode: str = "readwrite", ttls: dict = None, max_size_mb: float = 512):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}, expected one of {CACHE_MODES}")
+
+        self.mode = mode
+        self.cache_dir = Path(cache_dir)
+        self.ttls = DEFAULT_TTLS | (ttls or {})
+        self.max_size = int(max_size_mb * 1024 * 1024)
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def writable(self) -> bool:
+        return self.mode == "readwrite"
+
+    @property
+    def stats(self) -> dict:
+        return dict(hits=self.hits, misses=self.misses, revalidations=self.revalidations,
+                    stores=self.stores, evictions=self.evictions)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.cache_dir / "index.db"), check_same_thread=False)
+            self._conn.execute(_CREATE_ENTRIES_QUERY)
+            self._conn.execute(_CREATE_ENTRIES_IDX_QUERY)
+            self._conn.commit()
+        return self._conn
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        if not self.enabled:
+            return None
+
+        key = get_cache_key(url)
+        with self._lock:
+            row = self._connection().execute(
+                "select endpoint, etag, last_modified, fetched_at from entries where key=?", [key]).fetchone()
+            if row is None:
+                return None
+
+            try:
+                data = json.loads(self._body_path(key).read_text())
+            except (OSError, ValueError):
+                # the body went missing or is corrupt, the entry is dropped and fetched again
+                self._delete(key)
+                return None
+
+            endpoint, etag, last_modified, fetched_at = row
+            if self.writable:
+                self._connection().execute("update entries set accessed_at=? where key=?", [time.time(), key])
+                self._connection().commit()
+
+        fresh = time.time() - fetched_at < self.ttls.get(endpoint, self.ttls["other"])
+        return CacheEntry(url, data, fresh, etag, last_modified)
+
+    def store(self, url: str, body: str, etag: str = None, last_modified: str = None):
+        if not self.writable:
+            return
+
+        key = get_cache_key(url)
+        path = self._body_path(key)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(body)
+            os.replace(tmp_path, path)
+
+            now = time.time()
+            self._connection().execute(
+                "insert or replace into entries (key, url, endpoint, size, etag, last_modified, fetched_at, accessed_at) "
+                "values (?,?,?,?,?,?,?,?)",
+                [key, url, get_endpoint(url), len(body.encode()), etag, last_modified, now, now])
+            self._connection().commit()
+            self.stores += 1
+            self._evict()
+
+    def mark_revalidated(self, url: str):
+        # the server answered 304 not modified, the cached body is valid for another ttl
+        self.revalidations += 1
+        if not self.writable:
+            return
+
+        with self._lock:
+            now = time.time()
+            self._connection().execute(
+                "update entries set fetched_at=?, accessed_at=? where key=?", [now, now, get_cache_key(url)])
+            self._connection().commit()
+
+    def _delete(self, key: str):
+        self._body_path(key).unlink(missing_ok=True)
+        self._connection().execute("delete from entries where key=?", [key])
+        self._connection().commit()
+
+    def _evict(self):
+        # least recently used entries are dropped until the cache fits its size cap again
+        conn = self._connection()
+        total_size = conn.execute("select coalesce(sum(size), 0) from entries").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        for key, size in conn.execute("select key, size from entries order by accessed_at").fetchall():
+            if total_size <= self.max_size:
+                break
+            self._body_path(key).unlink(missing_ok=True)
+            conn.execute("delete from entries where key=?", [key])
+            total_size -= size
+            self.evictions += 1
+        conn.commit()
+
+    def clear(self):
+        with self._lock:
+            for key, in self._connection().execute("select key from entries").fetchall():
+                self._body_path(key).unlink(missing_ok=True)
+            self._connection().execute("delete from entries")
+            self._connection().commit()
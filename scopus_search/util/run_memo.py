@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, Iterable
+
+from .metrics import metrics
+
+
+class RunMemo:
+    # Entities fetched during one run (paper author lists, author profiles, ...), shared by every author, profile and
+    # worker of the run. get() has single flight semantics: the first caller of a key computes it, concurrent callers
+    # of the same key wait for that result instead of sending the same requests again. Failed computations are not
+    # kept, the next caller tries again.
+    def __init__(self):
+        self._values = {}
+        self._pending = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: Hashable, compute: Callable, keep: bool = True):
+        # keep=False only coalesces concurrent calls, for large values that are stored in the database right after
+        memo_key = (namespace, key)
+        with self._lock:
+            if memo_key in self._values:
+                self._count(namespace, "hits")
+                return self._values[memo_key]
+            future = self._pending.get(memo_key)
+            if future is None:
+                future = self._pending[memo_key] = Future()
+                self._count(namespace, "misses")
+                owner = True
+            else:
+                self._count(namespace, "waits")
+                owner = False
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as error:
+            with self._lock:
+                del self._pending[memo_key]
+            future.set_exception(error)
+            raise
+
+        with self._lock:
+            if keep:
+                self._values[memo_key] = value
+            del self._pending[memo_key]
+        future.set_result(value)
+        return value
+
+    def add(self, namespace: str, items: Iterable[tuple]):
+        # (key, value) pairs learned on the way, e.g. the author lists of search results
+        with self._lock:
+            for key, value in items:
+                self._values.setdefault((namespace, key), value)
+
+    def _count(self, namespace: str, outcome: str):
+        counts = self._counts.setdefault(namespace, {"misses": 0, "hits": 0, "waits": 0})
+        counts[outcome] += 1
+        if outcome != "misses":
+            metrics.count(f"memo_saved_{namespace}")
+
+    @property
+    def stats(self) -> dict:
+        # misses were computed, hits and waits are the lookups (and requests) saved by the memo
+        with self._lock:
+            stats = {namespace: dict(counts) for namespace, counts in self._counts.items()}
+        stats["saved"] = sum(counts["hits"] + counts["waits"] for counts in stats.values())
+        return stats
+
+
+def get_memo(client) -> RunMemo:
+    # the memo of the run is carried by its ScopusClient, other clients get one of their own
+    return getattr(client, "memo", None) or RunMemo()
@@ -0,0 +1,74 @@
+import heapq
+import sys
+import traceback
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator
+
+from .commandline_util import log_and_print_if_verbose
+from .rate_limiter import QuotaExceededError
+
+
+class AuthorScheduler:
+    # Resolves authors on a thread pool while the calling thread acts as the only database writer.
+    # build_author has to return an Author created with defer_save=True, it is saved once its future completes.
+    # build_author runs on a thread pool of workers threads unless another executor (with workers workers) is given,
+    # e.g. the processes of util.harvesting, load_author then turns its results into Authors in the calling thread
+    def __init__(self, build_author: Callable, workers: int = 1, verbose: bool = False, executor: Executor = None,
+                 load_author: Callable = None):
+        if workers < 1:
+            raise ValueError("The number of workers has to be at least 1!")
+
+        self.workers = workers
+        self.verbose = verbose
+        self._build_author = build_author
+        self._executor = executor
+        self._load_author = load_author
+
+    def run(self, author_inputs: Iterable) -> list:
+        return list(self.iter_authors(author_inputs))
+
+    def iter_authors(self, author_inputs: Iterable) -> Iterator:
+        for _, author, _ in self.iter_results(author_inputs):
+            if author is not None:
+                yield author
+
+    def iter_results(self, author_inputs: Iterable) -> Iterator[tuple]:
+        # yields (author_input, author, error) in input order, as soon as every author before them is done.
+        # failed authors have no author but the error message.
+        # at most 2 * workers authors are in flight or waiting to be yielded, which bounds the memory use
+        author_inputs = list(author_inputs)
+        max_pending = 2 * self.workers
+        futures, finished = {}, []
+        next_submit, next_index = 0, 0
+
+        executor = self._executor or ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scopus_search")
+        with executor:
+            while next_index < len(author_inputs):
+                while next_submit < len(author_inputs) and len(futures) + len(finished) < max_pending:
+                    futures[executor.submit(self._build_author, author_inputs[next_submit])] = next_submit
+                    next_submit += 1
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    heapq.heappush(finished, (index, *self._save(future, author_inputs[index])))
+
+                while finished and finished[0][0] == next_index:
+                    _, author, error = heapq.heappop(finished)
+                    yield author_inputs[next_index], author, error
+                    next_index += 1
+
+    def _save(self, future, author_input) -> tuple:
+        try:
+            author = future.result()
+            if self._load_author:
+                author = self._load_author(author)
+            author.save_to_db()
+            return author, None
+        except QuotaExceededError as error:
+            # reported even when not verbose, the author is missing from the output because of it
+            print(f"Skipping author {author_input}: {error}", file=sys.stderr)
+            return None, str(error)
+        except Exception as error:
+            log_and_print_if_verbose(f"Error!, ran into exception:\n {traceback.format_exc()} \nwhile working on author: {author_input}\ncontinuing to next entry\n\n", self.verbose)
+            return None, f"{type(error).__name__}: {error}"
@@ -0,0 +1,109 @@
+import json
+
+import requests
+from elsapy import version as elsapy_version
+from elsapy.elsclient import ElsClient
+
+from .key_pool import ApiCredentials, KeyPool
+from .metrics import metrics
+from .rate_limiter import QuotaExceededError, RequestGovernor
+from .response_cache import ResponseCache, get_endpoint
+from .run_memo import RunMemo
+
+_USER_AGENT = f"elsapy-v{elsapy_version}"
+API_BASE_URL = "https://api.elsevier.com"
+
+
+class ScopusClient(ElsClient):
+    # ElsClient whose requests all go through exec_request below, which serves them from the response cache if possible
+    # and paces the remaining ones with the request governor. A client is made per run, its memo is shared by all
+    # authors of the run (see util.run_memo). With a key pool every request is sent with the next key of the pool
+    def __init__(self, api_key, inst_token=None, num_res=25, local_dir=None, cache: ResponseCache = None,
+                 governor: RequestGovernor = None, base_url: str = None, memo: RunMemo = None,
+                 key_pool: KeyPool = None):
+        super().__init__(api_key, inst_token=inst_token, num_res=num_res, local_dir=local_dir)
+        self.key_pool = key_pool
+        # requests are sent to base_url instead of the elsevier api (e.g. a mock server), cache keys keep the original urls
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.cache = cache or ResponseCache(self.local_dir / "cache", mode="off")
+        self.governor = governor or RequestGovernor()
+        self.memo = memo or RunMemo()
+        self._status_code = None
+        self._status_msg = None
+
+    def exec_request(self, URL):
+        entry = self.cache.lookup(URL)
+
+        if entry and (entry.fresh or self.cache.mode == "only"):
+            self.cache.hits += 1
+            metrics.count("cache_hits")
+            return entry.data
+
+        if self.cache.mode == "only":
+            self.cache.misses += 1
+            self._status_code, self._status_msg = None, f"cache miss for {URL}"
+            raise requests.HTTPError(f"Cache miss for {URL} while only reading from the response cache")
+
+        conditional_headers = {}
+        if entry and entry.etag:
+            conditional_headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            conditional_headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._send(URL, conditional_headers)
+        if response.status_code == 304 and entry:
+            self.cache.mark_revalidated(URL)
+            metrics.count("cache_revalidations")
+            return entry.data
+
+        if self.cache.enabled:
+            self.cache.misses += 1
+            metrics.count("cache_misses")
+        data = self._decode(URL, response)
+        self.cache.store(URL, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return data
+
+    def _send(self, url: str, extra_headers: dict = None) -> requests.Response:
+        if not self.key_pool:
+            return self._send_with(ApiCredentials(self.api_key, self.inst_token), url, extra_headers)
+
+        # a key whose quota is exhausted is left out, the request is sent again with the next one
+        endpoint = get_endpoint(url)
+        while (credentials := self.key_pool.next(endpoint)) is not None:
+            try:
+                return self._send_with(credentials, url, extra_headers)
+            except QuotaExceededError:
+                self.key_pool.mark_exhausted(credentials, endpoint)
+                metrics.count("api_keys_exhausted")
+        raise QuotaExceededError(f"The {endpoint} quota of all {len(self.key_pool)} api keys is exhausted")
+
+    def _send_with(self, credentials: ApiCredentials, url: str, extra_headers: dict = None) -> requests.Response:
+        # same headers as ElsClient.exec_request, its fixed one request per second throttle is replaced by the governor
+        headers = {
+            "X-ELS-APIKey": credentials.api_key,
+            "User-Agent": _USER_AGENT,
+            "Accept": "application/json",
+            **(extra_headers or {})
+        }
+        if credentials.inst_token:
+            headers["X-ELS-Insttoken"] = credentials.inst_token
+
+        if self.base_url != API_BASE_URL and url.startswith(API_BASE_URL):
+            url = self.base_url + url[len(API_BASE_URL):]
+
+        with metrics.stage("http"):
+            response = self.governor.send(credentials.api_key, url, lambda: requests.get(url, headers=headers))
+        metrics.count("http_bytes", len(response.content))
+        if response.status_code >= 400:
+            metrics.count(f"http_errors_{response.status_code}")
+        self._status_code = response.status_code
+        return response
+
+    def _decode(self, url: str, response: requests.Response) -> dict:
+        if response.status_code == 200:
+            self._status_msg = "data retrieved"
+            return json.loads(response.text)
+
+        # unlike ElsClient the headers are left out of the message, they contain the api key
+        self._status_msg = f"HTTP {response.status_code} Error from {url}: {response.text}"
+        raise requests.HTTPError(f"HTTP {response.status_code} Error from {url}:\n{response.text}", response=response)
@@ -16,6 +16,9 @@ setuptools.setup(
 
     include_package_data=True,
     packages=setuptools.find_packages(),
+    extras_require={
+        "arrow": ["pyarrow"],
+    },
 
     entry_points={
         "console_scripts": ["scopus_search = scopus_search.main:main"]
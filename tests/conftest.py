@@ -0,0 +1,47 @@
+import pytest
+
+from benchmarks.mock_scopus import MockScopusServer, SyntheticScopus
+from benchmarks.pipeline_benchmark import get_config
+from scopus_search import constants
+from scopus_search.util.db_manager import DbManager
+from scopus_search.util.metrics import metrics
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_manager = DbManager(str(tmp_path / "test.db"))
+    yield db_manager
+    db_manager.conn.close()
+
+
+@pytest.fixture
+def scopus():
+    # author id -> papers, overridden by the tests that need other profiles
+    return SyntheticScopus({1: 60, 2: 20, 3: 40})
+
+
+@pytest.fixture
+def server_options():
+    return {}
+
+
+@pytest.fixture
+def server(scopus, server_options):
+    with MockScopusServer(scopus, **server_options) as server:
+        yield server
+
+
+@pytest.fixture
+def configured(tmp_path, server, db, monkeypatch):
+    # the settings, data directories and database of the package point into tmp_path, the requests go to the mock
+    # server. the module dict is patched directly, so the real config file is never read
+    config = get_config(server, tmp_path / "test.db")
+    settings = vars(constants)
+    monkeypatch.setitem(settings, "CONFIG", config)
+    for name, (key, default) in constants._CONFIG_SETTINGS.items():
+        monkeypatch.setitem(settings, name, config.get(key, default))
+    monkeypatch.setitem(settings, "db_manager", db)
+    monkeypatch.setitem(settings, "project_data_dir", tmp_path)
+    monkeypatch.setitem(settings, "cache_dir", tmp_path / "cache")
+    metrics.reset()
+    return server
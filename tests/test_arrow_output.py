@@ -0,0 +1,24 @@
+import pyarrow.parquet as pq
+import pytest
+
+from scopus_search import api
+
+
+def _affiliations(path) -> dict[int, dict]:
+    table = pq.read_table(path, columns=["scopus_id", "affiliations", "from_db"]).to_pydict()
+    assert all(table["from_db"])
+    return {scopus_id: dict(affiliations) if affiliations is not None else None
+            for scopus_id, affiliations in zip(table["scopus_id"], table["affiliations"])}
+
+
+@pytest.mark.parametrize("options", [dict(refresh="never"), dict(offline=True), dict(min_year=2000, refresh="never")])
+def test_stored_authors_are_written_with_their_affiliations(configured, scopus, tmp_path, options):
+    api.get_authors([1])
+    expected = {paper["scopus_id"]: {int(afil["afid"]): afil["affilname"] for afil in paper["affiliations"]}
+                for paper in scopus.get_papers(1) if paper["year"] >= options.get("min_year", 0)}
+
+    configured.requests.clear()
+    assert api.write_authors_table([1], tmp_path / "papers.parquet", **options) == 1
+    assert _affiliations(tmp_path / "papers.parquet") == expected
+    if options.get("offline"):
+        assert not configured.requests
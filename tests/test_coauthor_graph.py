@@ -0,0 +1,111 @@
+import io
+from collections import Counter
+from itertools import combinations
+
+import pandas as pd
+import pytest
+
+from benchmarks.ingest_benchmark import synthetic_papers
+from scopus_search import constants
+from scopus_search.main import main
+from scopus_search.util.coauthor_graph import CoauthorGraph
+
+
+def _joint_papers(db) -> Counter:
+    # (author, co-author) -> joint papers, counted over written_by in python
+    authors_of_papers = {}
+    for author, paper in db.cursor.execute("select author, paper from written_by"):
+        authors_of_papers.setdefault(paper, set()).add(author)
+    joint = Counter()
+    for authors in authors_of_papers.values():
+        for first, second in combinations(sorted(authors), 2):
+            joint[first, second] += 1
+            joint[second, first] += 1
+    return joint
+
+
+def _edges(joint: Counter, author_ids, hops: int, min_papers: int = 1) -> set[tuple]:
+    # the edges of every author less than hops hops away from author_ids
+    distances, frontier = {author: 0 for author in author_ids}, set(author_ids)
+    for hop in range(1, hops):
+        frontier = {coauthor for (author, coauthor) in joint if author in frontier} - set(distances)
+        distances.update(dict.fromkeys(frontier, hop))
+    return {(first, second, papers) for (first, second), papers in joint.items()
+            if first < second and papers >= min_papers and (first in distances or second in distances)}
+
+
+def _edge_set(edges: pd.DataFrame) -> set[tuple]:
+    return set(edges[["source", "target", "papers"]].itertuples(index=False, name=None))
+
+
+@pytest.fixture
+def papers():
+    # small author pools, so the authors share many papers. the first 250 papers only have authors with even ids,
+    # the authors of the later ones are sorted in between them when the graph is refreshed
+    first = synthetic_papers(250, author_pool=80)
+    first["authors"] = [tuple(2 * author for author in authors) for authors in first["authors"]]
+    second = synthetic_papers(150, author_pool=160, seed=1)
+    second["scopus_id"] += 1000
+    return pd.concat([first, second], ignore_index=True)
+
+
+def test_incremental_refresh_matches_a_full_load(db, papers):
+    db.insert_paper_df(papers.iloc[:250].copy())
+    first_rowid, _, _ = db.get_authorships()
+    graph = db.coauthor_graph
+    assert graph.stats["authorships"] == db.cursor.execute("select count(*) from written_by").fetchone()[0]
+    assert (graph.author_ids % 2 == 0).all()
+
+    db.insert_paper_df(papers.iloc[150:].copy())
+    last_rowid, authors, new_papers = db.get_authorships(first_rowid)
+    assert last_rowid > first_rowid
+    assert len(authors) == len(new_papers) == sum(len(authors) for authors in papers["authors"][250:])
+    assert db.coauthor_graph is graph
+
+    fresh = CoauthorGraph(db)
+    fresh.refresh()
+    assert graph.stats == fresh.stats
+    assert (graph.author_ids == fresh.author_ids).all()
+    assert (graph.paper_ids == fresh.paper_ids).all()
+
+    joint = _joint_papers(db)
+    for author in [1, 2, 7, 42]:
+        coauthors = graph.get_coauthors(author)
+        assert coauthors.to_dict() == {coauthor: count for (first, coauthor), count in joint.items() if first == author}
+        assert coauthors.is_monotonic_decreasing
+        assert sorted(graph.get_papers(author).tolist()) == sorted(
+            scopus_id for scopus_id, authors in zip(papers["scopus_id"], papers["authors"]) if author in authors)
+        assert graph.get_joint_paper_count(author, 4) == joint[author, 4]
+
+
+@pytest.mark.parametrize("author_ids, hops, min_papers", [
+    ([1], 1, 1), ([1], 2, 1), ([1, 2], 1, 2), ([3], 2, 3), ([3], 3, 1), ([999], 1, 1), ([1], 0, 1),
+])
+def test_edges_match_a_brute_force_count(db, papers, author_ids, hops, min_papers):
+    db.insert_paper_df(papers.iloc[:200].copy())
+    db.coauthor_graph
+    db.insert_paper_df(papers.iloc[200:].copy())
+
+    edges = db.coauthor_graph.get_edges(author_ids, hops=hops, min_papers=min_papers)
+    expected = _edges(_joint_papers(db), author_ids, hops, min_papers) if hops else set()
+    assert _edge_set(edges) == expected
+    assert (edges["source"] < edges["target"]).all()
+
+
+def test_neighborhood(db, papers):
+    db.insert_paper_df(papers.copy())
+    joint = _joint_papers(db)
+
+    neighborhood = db.coauthor_graph.get_neighborhood([1], hops=1)
+    assert neighborhood[1] == 0
+    assert set(neighborhood.index) == {1} | {coauthor for (author, coauthor) in joint if author == 1}
+    assert (neighborhood.drop(1) == 1).all()
+
+
+def test_coauthor_edges_command(configured, capsys):
+    main(["1", "--no_input", "--coauthor_edges", "--hops", "2", "--min_joint_papers", "1"])
+    edges = pd.read_csv(io.StringIO(capsys.readouterr().out))
+
+    assert list(edges.columns) == ["source", "target", "papers"]
+    assert not edges.empty
+    assert _edge_set(edges) == _edges(_joint_papers(constants.db_manager), [1], hops=2, min_papers=1)
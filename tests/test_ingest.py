@@ -0,0 +1,48 @@
+from benchmarks.ingest_benchmark import synthetic_papers
+
+
+def _count(db, table: str) -> int:
+    return db.cursor.execute(f"select count(*) from {table}").fetchone()[0]
+
+
+def _count_duplicates(db, table: str, columns: str) -> int:
+    return db.cursor.execute(
+        f"select count(*) from (select 1 from {table} group by {columns} having count(*) > 1)").fetchone()[0]
+
+
+def test_insert_paper_df_stores_papers_and_links(db):
+    papers = synthetic_papers(50)
+    db.insert_paper_df(papers)
+
+    assert _count(db, "papers") == 50
+    assert _count(db, "written_by") == sum(len(authors) for authors in papers["authors"])
+    assert _count(db, "affiliated_to") == sum(len(afils or {}) for afils in papers["affiliation"])
+    assert _count(db, "affiliations") == len({afid for afils in papers["affiliation"] for afid in (afils or {})})
+    assert not papers["from_db"].any()
+
+    stored = db.get_paper(int(papers["scopus_id"][0]))
+    assert stored["title"][0] == papers["title"][0]
+    assert stored["pub_year"][0] == int(papers["date"][0][:4])
+
+
+def test_insert_paper_df_skips_stored_rows(db):
+    # the second batch overlaps the first one, only the new papers and links are inserted
+    papers = synthetic_papers(60)
+    db.insert_paper_df(papers.iloc[:40].copy())
+    second = papers.iloc[20:].copy()
+    db.insert_paper_df(second)
+
+    assert _count(db, "papers") == 60
+    assert second["from_db"].tolist() == [True] * 20 + [False] * 20
+    assert _count(db, "written_by") == sum(len(authors) for authors in papers["authors"])
+    assert _count_duplicates(db, "written_by", "author, paper") == 0
+    assert _count_duplicates(db, "affiliated_to", "afil, paper") == 0
+    assert _count_duplicates(db, "affiliations", "afid") == 0
+
+
+def test_insert_paper_df_deduplicates_within_a_batch(db):
+    papers = synthetic_papers(10)
+    db.insert_paper_df(papers.iloc[[0, 1, 1, 2, 2, 2]].reset_index(drop=True))
+
+    assert _count(db, "papers") == 3
+    assert _count_duplicates(db, "written_by", "author, paper") == 0
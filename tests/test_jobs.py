@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from scopus_search import api, constants
+from scopus_search.main import main
+from scopus_search.util.jobs import get_job_key
+
+
+@pytest.fixture
+def author_file(tmp_path) -> str:
+    path = tmp_path / "authors.csv"
+    path.write_text("scopus_id\n1\n2\n3\n")
+    return str(path)
+
+
+@pytest.fixture
+def chunks(monkeypatch) -> list:
+    # the author chunks run_job downloads
+    chunks = []
+    iter_author_results = api.iter_author_results
+
+    def recording_iter_author_results(authors, **options):
+        chunks.append(list(authors))
+        return iter_author_results(authors, **options)
+
+    monkeypatch.setattr(api, "iter_author_results", recording_iter_author_results)
+    return chunks
+
+
+def _interrupt_after(monkeypatch, chunk_count: int):
+    iter_author_results = api.iter_author_results
+    calls = []
+
+    def interrupted_iter_author_results(authors, **options):
+        calls.append(authors)
+        if len(calls) > chunk_count:
+            raise KeyboardInterrupt
+        return iter_author_results(authors, **options)
+
+    monkeypatch.setattr(api, "iter_author_results", interrupted_iter_author_results)
+
+
+def _job_statuses(author_file: str) -> dict[str, str]:
+    job_id = constants.db_manager.find_job(get_job_key(author_file))
+    return dict(constants.db_manager.cursor.execute(
+        "select input, status from job_entries where job=? order by position", [job_id]).fetchall())
+
+
+def test_interrupted_job_resumes_with_the_remaining_authors(configured, author_file, chunks, monkeypatch):
+    with monkeypatch.context() as patch:
+        _interrupt_after(patch, 1)
+        with pytest.raises(KeyboardInterrupt):
+            api.run_job(author_file, chunk_size=1)
+    # the first chunk was checkpointed before the interruption
+    assert _job_statuses(author_file) == {"1": "done", "2": "pending", "3": "pending"}
+
+    chunks.clear()
+    assert api.run_job(author_file, resume=True, chunk_size=1) == ["1", "2", "3"]
+    assert chunks == [["2"], ["3"]]
+    assert _job_statuses(author_file) == {"1": "done", "2": "done", "3": "done"}
+
+
+def test_failed_authors_are_retried_on_resume(configured, author_file, chunks):
+    with open(author_file, "a") as file:
+        file.write("99\n")
+
+    assert api.run_job(author_file, chunk_size=2) == ["1", "2", "3"]
+    assert _job_statuses(author_file)["99"] == "failed"
+    assert constants.db_manager.cursor.execute("select status from jobs").fetchone() == ("failed",)
+
+    chunks.clear()
+    api.run_job(author_file, resume=True, chunk_size=2)
+    assert chunks == [["99"]]
+
+
+def test_finished_job_resumes_without_downloads(configured, author_file, chunks):
+    api.run_job(author_file, chunk_size=5)
+
+    chunks.clear()
+    assert api.run_job(author_file, resume=True, authors=[2, 1], chunk_size=5) == ["1", "2", "3"]
+    assert chunks == []
+
+    # without resume the job starts over
+    api.run_job(author_file, chunk_size=5)
+    assert chunks == [["1", "2", "3"]]
+    assert constants.db_manager.cursor.execute("select count(*) from jobs").fetchone() == (2,)
+
+
+def test_output_of_a_resumed_job_is_built_from_the_database(configured, author_file, chunks, capsys):
+    main(["--input_file", author_file, "--no_input", "--output_format", "ndjson", "--cache_mode", "off"])
+    assert len(capsys.readouterr().out.splitlines()) == 3
+
+    # every author of the job is done, neither the job nor the output resolves an author online
+    configured.requests.clear()
+    chunks.clear()
+    main(["--input_file", author_file, "--resume", "--no_input", "--output_format", "ndjson", "--cache_mode", "off"])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["scopus_author"] for line in lines] == [1, 2, 3]
+    assert [len(line["papers"]) for line in lines] == [60, 20, 40]
+    assert not configured.requests
+    assert chunks == []
@@ -0,0 +1,116 @@
+from collections import defaultdict
+
+import pytest
+
+from scopus_search import api, constants
+from scopus_search.util.key_pool import ApiCredentials, KeyPool, get_credentials
+from scopus_search.util.metrics import metrics
+from scopus_search.util.rate_limiter import QuotaExceededError, RequestGovernor
+from scopus_search.util.scopus_client import API_BASE_URL, ScopusClient
+
+_SEARCH_URL = f"{API_BASE_URL}/content/search/scopus?query=AU-ID(1)&count=25"
+_ABSTRACT_URL = f"{API_BASE_URL}/content/abstract/scopus_id/{{}}"
+
+
+def _keys(count: int) -> list[ApiCredentials]:
+    return [ApiCredentials(f"key-{key}") for key in range(count)]
+
+
+@pytest.fixture
+def server_options():
+    return {"exhausted_keys": ["key-0"]}
+
+
+@pytest.fixture
+def client(configured, tmp_path):
+    def make_client(key_pool: KeyPool) -> ScopusClient:
+        return ScopusClient("key-0", base_url=configured.url, local_dir=tmp_path, key_pool=key_pool,
+                            governor=RequestGovernor(rates={"scopus_search": 1000, "abstract": 1000}))
+    return make_client
+
+
+@pytest.mark.parametrize("key_count, shards", [(1, 1), (4, 2), (5, 2), (3, 3), (1, 3), (2, 3), (3, 7)])
+def test_split(key_count, shards):
+    split = KeyPool(_keys(key_count)).split(shards)
+    assert len(split) == shards
+
+    # every key is used by some shard, at its full rate over all shards
+    rates = defaultdict(float)
+    for credentials, rate_share in split:
+        assert credentials
+        for key in credentials:
+            rates[key] += rate_share
+    assert rates == pytest.approx(dict.fromkeys(_keys(key_count), 1.0))
+
+    if key_count >= shards:
+        # the shards have keys of their own
+        assert sorted(key for credentials, _ in split for key in credentials) == sorted(_keys(key_count))
+
+
+def test_keys_are_handed_out_round_robin():
+    pool = KeyPool(_keys(3))
+    assert [pool.next("abstract").api_key for _ in range(4)] == ["key-0", "key-1", "key-2", "key-0"]
+
+    # exhausted keys are skipped for their endpoint only
+    pool.mark_exhausted(ApiCredentials("key-2"), "abstract")
+    assert [pool.next("abstract").api_key for _ in range(3)] == ["key-1", "key-0", "key-1"]
+    assert {pool.next("author").api_key for _ in range(3)} == {"key-0", "key-1", "key-2"}
+
+    pool.mark_exhausted(ApiCredentials("key-0"), "abstract")
+    pool.mark_exhausted(ApiCredentials("key-1"), "abstract")
+    assert pool.next("abstract") is None
+
+    with pytest.raises(ValueError):
+        KeyPool([])
+
+
+def test_requests_rotate_to_the_next_key_on_a_quota_error(configured, client, scopus):
+    scopus_client = client(KeyPool(_keys(3)))
+
+    for _ in range(6):
+        assert scopus_client.exec_request(_SEARCH_URL)["search-results"]["entry"]
+    # the exhausted key is tried once, the requests are spread over the others from then on
+    assert configured.keys == {"key-0": 1, "key-1": 3, "key-2": 3}
+    assert metrics.snapshot()["counters"]["api_keys_exhausted"] == 1
+
+    # the key is still tried for the other endpoints
+    configured.keys.clear()
+    for paper in scopus.get_papers(1)[:3]:
+        scopus_client.exec_request(_ABSTRACT_URL.format(paper["scopus_id"]))
+    assert configured.keys["key-0"] == 1
+    assert sum(configured.keys.values()) == 4
+    assert metrics.snapshot()["counters"]["api_keys_exhausted"] == 2
+
+
+def test_quota_error_once_every_key_is_exhausted(configured, client):
+    configured.exhausted_keys.update(["key-1", "key-2"])
+    scopus_client = client(KeyPool(_keys(3)))
+
+    with pytest.raises(QuotaExceededError):
+        scopus_client.exec_request(_SEARCH_URL)
+    assert configured.keys == {"key-0": 1, "key-1": 1, "key-2": 1}
+
+
+def test_credentials_of_the_config(configured, monkeypatch):
+    monkeypatch.setitem(vars(constants), "API_KEYS", ["key-1", {"apikey": "key-2", "insttoken": "token"}, "key-1"])
+
+    assert get_credentials() == [ApiCredentials("benchmark"), ApiCredentials("key-1"), ApiCredentials("key-2", "token")]
+    assert get_credentials("key-3") == [ApiCredentials("key-3")]
+
+
+def test_harvest_in_two_processes(configured, db, scopus, monkeypatch):
+    # the spawned processes read the keys from the config, the shards of KeyPool.split are handed to them
+    configured.exhausted_keys.clear()
+    keys = ["key-1", "key-2"]
+    constants.CONFIG["api_keys"] = keys
+    monkeypatch.setitem(vars(constants), "API_KEYS", keys)
+
+    results = list(api.iter_author_results([1, 2, 3], processes=2, cache_mode="off"))
+
+    assert [author_input for author_input, _, _ in results] == ["1", "2", "3"]
+    assert [error for _, _, error in results] == [None] * 3
+    assert [len(author.base_author.papers) for _, author, _ in results] == [60, 20, 40]
+    # the harvested authors are saved by this process
+    assert db.get_paper_counts([1, 2, 3]) == {1: 60, 2: 20, 3: 40}
+    assert set(configured.keys) <= {"benchmark", *keys}
+    assert sum(configured.keys.values()) == sum(configured.requests.values())
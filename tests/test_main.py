@@ -0,0 +1,23 @@
+import io
+import json
+
+import pyarrow.parquet as pq
+
+from scopus_search.main import main
+
+
+def test_verbose_messages_do_not_mix_into_the_ndjson_output(configured, capsys):
+    main(["1", "2", "--verbose", "--no_input", "--output_format", "ndjson"])
+    out, err = capsys.readouterr()
+
+    lines = [json.loads(line) for line in out.splitlines()]
+    assert [line["scopus_author"] for line in lines] == [1, 2]
+    assert "Received author scopus ids" in err
+
+
+def test_verbose_messages_do_not_corrupt_the_parquet_output(configured, capsysbinary):
+    main(["1", "--verbose", "--no_input", "--output_format", "parquet"])
+    out, err = capsysbinary.readouterr()
+
+    assert pq.read_table(io.BytesIO(out)).num_rows == 60
+    assert b"Received author scopus ids" in err
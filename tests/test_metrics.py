@@ -0,0 +1,135 @@
+import json
+import re
+import threading
+
+import pytest
+
+from scopus_search.main import main
+from scopus_search.util.metrics import STAGES, Metrics
+
+_THREADS = 8
+_CALLS = 50
+# name{labels} value of a prometheus sample line
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{stage="(\w+)"\})? (\S+)$')
+
+
+@pytest.fixture
+def metrics() -> Metrics:
+    # stages and counters recorded by concurrent threads
+    metrics = Metrics()
+
+    def work():
+        for _ in range(_CALLS):
+            with metrics.stage("db_insert"):
+                metrics.count("http_requests")
+            with metrics.stage("name_resolution"):
+                metrics.count("http_bytes", 100)
+        metrics.count("cache_hits")
+
+    threads = [threading.Thread(target=work) for _ in range(_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with metrics.stage("custom_stage"):
+        pass
+    with metrics.author_hooks("Tao, Terence"):
+        pass
+    return metrics
+
+
+def _parse_prometheus(report: str) -> tuple[dict, dict]:
+    # (metric -> type, (metric, stage) -> value)
+    types, samples = {}, {}
+    for line in report.splitlines():
+        if line.startswith("# TYPE"):
+            _, _, metric, metric_type = line.split()
+            types[metric] = metric_type
+        elif not line.startswith("# HELP"):
+            name, stage, value = _SAMPLE.match(line).groups()
+            samples[name, stage] = float(value)
+    return types, samples
+
+
+def test_stages_and_counters_are_summed_over_threads(metrics):
+    snapshot = metrics.snapshot()
+
+    # the stages of the run come first, in run order
+    assert list(snapshot["stages"]) == ["name_resolution", "db_insert", "custom_stage"]
+    assert STAGES.index("name_resolution") < STAGES.index("db_insert")
+    assert {name: stats["count"] for name, stats in snapshot["stages"].items()} == {
+        "name_resolution": _THREADS * _CALLS, "db_insert": _THREADS * _CALLS, "custom_stage": 1}
+    for stats in snapshot["stages"].values():
+        assert 0 <= stats["max_s"] <= stats["total_s"]
+    assert snapshot["counters"] == {"cache_hits": _THREADS, "http_bytes": _THREADS * _CALLS * 100,
+                                    "http_requests": _THREADS * _CALLS}
+    assert list(snapshot["authors"]) == ["Tao, Terence"]
+
+
+def test_json_report(metrics):
+    report = json.loads(metrics.get_report("json"))
+
+    assert report["stages"]["db_insert"]["count"] == _THREADS * _CALLS
+    assert report["counters"]["http_requests"] == _THREADS * _CALLS
+    assert report["authors"]["Tao, Terence"]["seconds"] >= 0
+    assert report["wall_s"] > 0
+
+
+def test_prometheus_report(metrics):
+    report = metrics.get_report("prometheus")
+    types, samples = _parse_prometheus(report)
+
+    assert report.endswith("\n")
+    assert types == {
+        "scopus_search_run_seconds": "gauge",
+        "scopus_search_stage_seconds_total": "counter",
+        "scopus_search_stage_calls_total": "counter",
+        "scopus_search_cache_hits_total": "counter",
+        "scopus_search_http_bytes_total": "counter",
+        "scopus_search_http_requests_total": "counter",
+    }
+    assert samples["scopus_search_stage_calls_total", "db_insert"] == _THREADS * _CALLS
+    assert samples["scopus_search_stage_calls_total", "custom_stage"] == 1
+    assert samples["scopus_search_stage_seconds_total", "name_resolution"] == metrics.snapshot()["stages"][
+        "name_resolution"]["total_s"]
+    assert samples["scopus_search_http_bytes_total", None] == _THREADS * _CALLS * 100
+    assert samples["scopus_search_cache_hits_total", None] == _THREADS
+
+
+def test_text_report(metrics):
+    lines = metrics.get_report("text").splitlines()
+
+    assert re.fullmatch(r"run: \d+\.\d{3}s", lines[0])
+    assert lines[1].split() == ["stage", "count", "total", "s", "max", "s", "share"]
+    assert lines[2].split()[:2] == ["name_resolution", str(_THREADS * _CALLS)]
+    assert lines[3].split()[:2] == ["db_insert", str(_THREADS * _CALLS)]
+    assert f"{'http_bytes':<26}{_THREADS * _CALLS * 100:>14,}" in lines
+    assert lines[-1].startswith("author Tao, Terence: seconds ")
+
+
+def test_merged_snapshots(metrics):
+    merged = Metrics()
+    merged.merge(metrics.snapshot())
+    merged.merge(metrics.snapshot())
+
+    snapshot = merged.snapshot()
+    assert snapshot["stages"]["db_insert"]["count"] == 2 * _THREADS * _CALLS
+    assert snapshot["stages"]["db_insert"]["max_s"] == metrics.snapshot()["stages"]["db_insert"]["max_s"]
+    assert snapshot["counters"]["http_requests"] == 2 * _THREADS * _CALLS
+
+
+@pytest.mark.parametrize("profile_format", ["json", "prometheus"])
+def test_profile_of_a_run(configured, tmp_path, capsys, profile_format):
+    profile_file = tmp_path / "profile.txt"
+    main(["1", "2", "--no_input", "--workers", "2", "--cache_mode", "off", "--profile", profile_format,
+          "--profile_file", str(profile_file)])
+    report = profile_file.read_text()
+
+    if profile_format == "json":
+        counters = json.loads(report)["counters"]
+        assert counters["http_requests"] == sum(configured.requests.values())
+    else:
+        _, samples = _parse_prometheus(report)
+        assert samples["scopus_search_http_requests_total", None] == sum(configured.requests.values())
+        assert samples["scopus_search_stage_calls_total", "db_insert"] >= 2
+    assert "run:" not in capsys.readouterr().err
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from scopus_search.util import db_manager
+from scopus_search.util.db_manager import MIGRATIONS, DbManager
+
+# the schema the package created before versioned migrations
+_BASELINE_SCHEMA = [
+    db_manager._CREATE_PAPERS_QUERY,
+    db_manager._CREATE_AUTHORS_QUERY,
+    db_manager._CREATE_WRITTEN_BY_QUERY,
+    db_manager._CREATE_AFFILIATIONS_QUERY,
+    db_manager._CREATE_AFFILIATED_TO_QUERY,
+    db_manager._CREATE_WRITTEN_BY_IDX_QUERY,
+]
+
+_INDEXES = [
+    "written_by_uniq", "affiliations_afid", "affiliated_to_afil_paper", "written_by_paper_author",
+    "affiliated_to_paper_afil", "authors_given_name_surname", "authors_base_id", "papers_pub_year", "jobs_input_file",
+    "job_entries_job_status_position", "authors_name_nocase", "authors_created_at",
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path) -> str:
+    path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(path)
+    for query in _BASELINE_SCHEMA:
+        conn.execute(query)
+    conn.executemany("insert into papers (scopus_id, title, date, publication_name) values (?,?,?,?)", [
+        (1, "Additive combinatorics", "2008-05-01", "Annals of Mathematics"),
+        (2, "Arithmetic progressions of primes", "2004-01-01", "Acta Mathematica"),
+        (3, "A paper without cover date", None, None),
+    ])
+    conn.execute("insert into authors (scopus_id, given_name, surname) values (10, 'Terence', 'Tao')")
+    conn.executemany("insert into written_by (author, paper) values (?,?)", [(10, 1), (10, 2), (10, 3)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _user_version(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_baseline_database_is_migrated(baseline_db):
+    db = DbManager(baseline_db)
+
+    assert db.schema_version == len(MIGRATIONS)
+    assert db.cursor.execute("select scopus_id, pub_year from papers order by scopus_id").fetchall() == \
+        [(1, 2008), (2, 2004), (3, None)]
+    indexes = {name for name, in db.cursor.execute("select name from sqlite_master where type = 'index'")}
+    assert set(_INDEXES) <= indexes
+    # the stored papers are indexed for the full text search
+    assert db.match_papers("arithmetic").tolist() == [2]
+    db.conn.close()
+
+
+def test_migrations_run_in_steps(baseline_db, monkeypatch):
+    for version in range(1, len(MIGRATIONS) + 1):
+        monkeypatch.setattr(db_manager, "MIGRATIONS", MIGRATIONS[:version])
+        DbManager(baseline_db).conn.close()
+        assert _user_version(baseline_db) == version
+
+    # nothing is left to run for a migrated database
+    monkeypatch.setattr(db_manager, "MIGRATIONS", MIGRATIONS)
+    DbManager(baseline_db).conn.close()
+    assert _user_version(baseline_db) == len(MIGRATIONS)
+
+
+def test_failed_migration_is_rolled_back(baseline_db, monkeypatch):
+    def broken_migration(cursor):
+        cursor.execute("create table half_done (id integer)")
+        raise RuntimeError("broken migration")
+
+    monkeypatch.setattr(db_manager, "MIGRATIONS", MIGRATIONS[:2] + [broken_migration])
+    with pytest.raises(RuntimeError):
+        DbManager(baseline_db)
+
+    assert _user_version(baseline_db) == 2
+    conn = sqlite3.connect(baseline_db)
+    assert conn.execute("select 1 from sqlite_master where name = 'half_done'").fetchone() is None
+    conn.close()
+
+
+def test_new_database_gets_the_full_schema(db):
+    assert db.schema_version == len(MIGRATIONS)
+    indexes = {name for name, in db.cursor.execute("select name from sqlite_master where type = 'index'")}
+    assert set(_INDEXES) <= indexes
@@ -0,0 +1,76 @@
+import pytest
+
+from scopus_search.util.name_index import INITIALS_SCORE, normalize_name
+
+
+@pytest.fixture
+def name_index(db):
+    db.insert_scopus_authors([
+        (1, "Terence", "Tao", None),
+        (2, "T. C.", "Tao", 1),
+        (3, "Tiffany", "Tao", None),
+        (4, "José", "Pérez-Ruiz", None),
+        (5, "Ben Joseph", "Green", None),
+        (6, "Jonathan", "Williamson", None),
+        (7, "Jonathon", "Williamson", None),
+    ])
+    return db.name_index
+
+
+def test_normalize_name():
+    assert normalize_name("Pérez-Ruiz, J.-P.") == "perez ruiz j p"
+    assert normalize_name("  ÉMILE ") == "emile"
+    assert normalize_name(None) == ""
+
+
+def test_exact_names_are_matched_case_and_accent_insensitively(name_index):
+    assert name_index.resolve("terence", "TAO") == 1
+    assert name_index.resolve("Jose", "Perez Ruiz") == 4
+    assert name_index.lookup("José", "pérez-ruiz").to_dict() == {4: 1.0}
+
+
+def test_linked_profiles_resolve_to_their_base_author(name_index):
+    assert name_index.resolve("T. C.", "Tao") == 1
+
+
+def test_initials_match_a_single_author(name_index):
+    assert name_index.lookup("B. J.", "Green").to_dict() == {5: INITIALS_SCORE}
+    assert name_index.resolve("Ben J.", "Green") == 5
+    # the number of given names has to agree
+    assert name_index.resolve("B.", "Green") is None
+
+
+def test_ambiguous_initials_are_not_resolved(name_index):
+    # "T." could be Terence or Tiffany Tao
+    assert name_index.resolve("T.", "Tao") is None
+    assert name_index.lookup("T.", "Tao").empty
+
+
+def test_misspelled_names_are_matched_by_trigrams(name_index):
+    matches = name_index.lookup("Terrence", "Tao")
+    assert matches.index.tolist() == [1]
+    assert 0.85 <= matches[1] < 1
+    assert name_index.resolve("Terrence", "Tao") == 1
+
+
+def test_trigram_matches_of_several_authors_are_not_resolved(name_index):
+    # as close to Jonathan as to Jonathon Williamson
+    assert set(name_index.lookup("Jonathen", "Williamson").index) == {6, 7}
+    assert name_index.resolve("Jonathen", "Williamson") is None
+
+
+def test_threshold(name_index):
+    assert name_index.resolve("Terrence", "Tao", threshold=0.99) is None
+    assert name_index.resolve("Tamara", "Tao") is None
+    assert name_index.lookup("Tamara", "Tao", threshold=0.3).size > 0
+    # the initials are not trusted below their confidence
+    assert name_index.resolve("B. J.", "Green", threshold=0.95) is None
+
+
+def test_new_authors_are_indexed_on_access(db, name_index):
+    assert name_index.resolve("Ben", "Green") is None
+
+    db.insert_scopus_author(8, "Ben", "Green")
+    assert db.name_index is name_index
+    assert db.name_index.resolve("Ben", "Green") == 8
+    assert len(name_index) == 8
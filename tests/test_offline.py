@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from scopus_search import api
+from scopus_search.main import main
+from scopus_search.util.offline import iter_offline_authors
+
+
+@pytest.fixture
+def stored(configured):
+    # authors 1 and 2 are downloaded and stored, author 3 is not
+    api.get_authors([1, 2], cache_mode="off")
+    configured.requests.clear()
+    return configured
+
+
+def test_offline_output_sends_no_requests(stored, scopus, capsys):
+    main(["1", "2", "--offline", "--no_input", "--output_format", "ndjson", "--cache_mode", "off"])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert [line["scopus_author"] for line in lines] == [1, 2]
+    assert [sorted(paper["scopus_id"] for paper in line["papers"]) for line in lines] == [
+        sorted(paper["scopus_id"] for paper in scopus.get_papers(author_id)) for author_id in (1, 2)]
+    assert not stored.requests
+
+
+def test_offline_filters_match_the_online_filters(stored):
+    filters = dict(min_year=2000, max_year=2015, must_not_include_authors=[2])
+    online = api.search_authors([1], output_format="json", refresh="never", cache_mode="off", **filters)
+    stored.requests.clear()
+
+    assert api.search_authors([1], output_format="json", offline=True, **filters) == online
+    assert not stored.requests
+
+
+def test_offline_names(stored, scopus):
+    given_name, surname = scopus.get_name(2)
+    authors = list(iter_offline_authors([f"{surname}, {given_name}"]))
+
+    assert [[auth.scopus_id for auth in author.scopus_authors] for author in authors] == [[2]]
+    assert len(authors[0].base_author.papers) == 20
+    assert not stored.requests
+
+
+@pytest.mark.parametrize("authors, missing", [
+    (["1", "3"], "3"), (["4", "2"], "4"), (["Surname9, Given9"], "Surname9, Given9"),
+])
+def test_authors_that_are_not_stored_fail_before_any_output(stored, capsys, authors, missing):
+    with pytest.raises(ValueError, match=f"run without --offline first: {missing}"):
+        main([*authors, "--offline", "--no_input", "--output_format", "ndjson"])
+
+    assert capsys.readouterr().out == ""
+    assert not stored.requests
+
+
+def test_profiles_without_papers_are_not_stored(stored, db):
+    # a profile only known as the co-author of a stored paper
+    db.insert_scopus_authors([(3, "Given3", "Surname3", None)])
+
+    with pytest.raises(ValueError, match="run without --offline first: 3"):
+        api.search_authors([3], offline=True)
+    assert not stored.requests
@@ -0,0 +1,117 @@
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from benchmarks.mock_scopus import SyntheticScopus
+from scopus_search.util.paginated_search import PaginatedSearch
+from scopus_search.util.scopus_client import ScopusClient
+
+_QUERY = "AU-ID(1)"
+
+
+@pytest.fixture
+def scopus():
+    return SyntheticScopus({1: 110})
+
+
+@pytest.fixture
+def client(configured, tmp_path) -> ScopusClient:
+    return ScopusClient("test", base_url=configured.url, local_dir=tmp_path)
+
+
+class ScriptedClient:
+    # returns the given search results one after the other and records the requested urls
+    def __init__(self, *results: tuple):
+        self.results = list(results)
+        self.urls = []
+        self.second_request = threading.Event()
+
+    def exec_request(self, url: str) -> dict:
+        self.urls.append(url)
+        if len(self.urls) == 2:
+            self.second_request.set()
+        total, count, next_cursor = self.results.pop(0)
+        results = {"opensearch:totalResults": str(total), "entry": [{"dc:identifier": str(i)} for i in range(count)]}
+        if next_cursor is not None:
+            results["cursor"] = {"@next": next_cursor}
+        return {"search-results": results}
+
+    def get_params(self, request: int) -> dict:
+        return {key: values[0] for key, values in parse_qs(urlparse(self.urls[request]).query).items()}
+
+
+@pytest.mark.parametrize("page_size", [7, 25, 50, 100, 110, 200])
+def test_cursor_pagination_reads_every_page(configured, client, scopus, page_size):
+    search = PaginatedSearch(client, _QUERY, index="scopus", page_size=page_size)
+    pages = list(search.iter_pages())
+
+    # the last page is truncated to the remaining results
+    assert [len(page) for page in pages] == [page_size] * (110 // page_size) + ([110 % page_size] if 110 % page_size else [])
+    assert [entry["dc:identifier"] for page in pages for entry in page] == [
+        f"SCOPUS_ID:{paper['scopus_id']}" for paper in scopus.get_papers(1)]
+    assert search.total_results == 110
+    # no request for the page after the last one
+    assert configured.requests["scopus_search"] == len(pages)
+
+
+def test_page_size_is_limited_by_the_view(configured, client):
+    search = PaginatedSearch(client, _QUERY, index="scopus", view="COMPLETE", page_size=200)
+    assert search.page_size == 25
+    assert [len(page) for page in search.iter_pages()] == [25, 25, 25, 25, 10]
+
+    with pytest.raises(ValueError):
+        PaginatedSearch(client, _QUERY, index="scopus", page_size=-1)
+
+
+@pytest.mark.parametrize("page_size, max_results, pages", [(25, 60, [25, 25, 10]), (25, 50, [25, 25]), (200, 5, [5])])
+def test_max_results(configured, client, page_size, max_results, pages):
+    search = PaginatedSearch(client, _QUERY, index="scopus", page_size=page_size, max_results=max_results)
+
+    assert [len(page) for page in search.iter_pages()] == pages
+    assert configured.requests["scopus_search"] == len(pages)
+
+
+def test_empty_result_sets(configured, client):
+    search = PaginatedSearch(client, "AU-ID(1) AND PUBYEAR > 3000", index="scopus")
+
+    assert search.get_results() == []
+    assert search.total_results == 0
+    assert configured.requests["scopus_search"] == 1
+
+
+def test_next_page_is_requested_before_the_current_one_is_processed(configured):
+    client = ScriptedClient((75, 25, "b"), (75, 25, "c"), (75, 25, "d"))
+    pages = PaginatedSearch(client, _QUERY, index="scopus", page_size=25).iter_pages()
+
+    next(pages)
+    assert client.second_request.wait(timeout=5)
+    assert [client.get_params(request)["cursor"] for request in range(2)] == ["*", "b"]
+
+    # stopping early leaves the prefetched page unread and sends no further request
+    pages.close()
+    assert len(client.urls) == 2
+
+
+@pytest.mark.parametrize("next_cursor", [None, "*"])
+def test_a_missing_or_repeated_cursor_ends_the_search(configured, next_cursor):
+    # the total promises more results than the index returns
+    client = ScriptedClient((100, 25, next_cursor))
+
+    assert len(PaginatedSearch(client, _QUERY, index="scopus", page_size=25).get_results()) == 25
+    assert len(client.urls) == 1
+
+
+def test_a_cursor_repeated_later_ends_the_search(configured):
+    client = ScriptedClient((100, 25, "b"), (100, 25, "b"))
+
+    assert len(PaginatedSearch(client, _QUERY, index="scopus", page_size=25).get_results()) == 50
+    assert len(client.urls) == 2
+
+
+def test_other_indexes_are_paged_with_offsets(configured):
+    client = ScriptedClient((60, 25, None), (60, 25, None), (60, 25, None))
+
+    assert len(PaginatedSearch(client, "AUTHLASTNAME(Tao)", index="author", page_size=25).get_results()) == 60
+    assert [client.get_params(request)["start"] for request in range(3)] == ["0", "25", "50"]
+    assert "cursor" not in client.get_params(0)
@@ -0,0 +1,50 @@
+from benchmarks.ingest_benchmark import synthetic_papers
+from scopus_search import api, constants
+from scopus_search.models.paper import _get_search_page_papers
+from scopus_search.util.offline import iter_offline_authors
+from scopus_search.util.paginated_search import PaginatedSearch
+from scopus_search.util.scopus_client import ScopusClient
+
+
+def _author_tuples(papers) -> dict[int, tuple]:
+    return {int(scopus_id): tuple(authors) for scopus_id, authors in zip(papers["scopus_id"], papers["authors"])}
+
+
+def test_stored_author_order_is_the_scopus_order(configured, scopus):
+    # the mock server shuffles the authors of every paper, aggregating them by author id would sort them
+    expected = {paper["scopus_id"]: tuple(paper["authors"]) for paper in scopus.get_papers(1)}
+    assert any(list(authors) != sorted(authors) for authors in expected.values())
+
+    online = _author_tuples(api.get_authors([1])[0].base_author.papers)
+    assert online == expected
+
+    db = constants.db_manager
+    assert _author_tuples(db.get_papers_with_authors(1)) == expected
+    assert _author_tuples(db.get_papers_of_authors([1])) == expected
+    assert db.get_authors_of_papers(expected) == expected
+    assert {scopus_id: db.get_paper_authors(scopus_id) for scopus_id in expected} == expected
+    assert _author_tuples(next(iter_offline_authors([1])).base_author.papers) == expected
+
+
+def test_staged_insert_keeps_the_author_order(db):
+    papers = synthetic_papers(20)
+    papers["authors"] = [tuple(reversed(authors)) for authors in papers["authors"]]
+    db.insert_paper_df(papers.copy())
+
+    assert db.get_authors_of_papers(papers["scopus_id"]) == _author_tuples(papers)
+
+
+def test_only_papers_that_are_not_stored_are_looked_up(configured, tmp_path):
+    # a search page without author lists, with 10 papers of the stored author 1 and 5 of author 3
+    api.get_authors([1])
+    client = ScopusClient("test", base_url=configured.url, local_dir=tmp_path)
+    page = [entry for author_id, count in [(1, 10), (3, 5)]
+            for entry in PaginatedSearch(client, f"AU-ID({author_id})", index="scopus").get_results()[:count]]
+    assert not any("author" in entry for entry in page)
+    configured.requests.clear()
+
+    papers, looked_up, saved = _get_search_page_papers(page, client, 3, max_concurrent_lookups=4)
+    assert looked_up == 5
+    assert saved == 0
+    assert configured.requests == {"abstract": 5}
+    assert papers["authors"].map(len).gt(0).all()
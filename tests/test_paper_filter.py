@@ -0,0 +1,123 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.filter_benchmark import legacy_filter_papers, synthetic_profiles
+from scopus_search.util.paper_filter import AuthorIndex, PaperFilter, get_pub_years
+
+_AUTHOR_POOL = range(1, 9)
+
+
+def _random_papers(rng: random.Random, size: int) -> pd.DataFrame:
+    # few authors, so the filters match often. papers without authors, authors listed twice and missing dates included
+    papers = pd.DataFrame({
+        "scopus_id": np.arange(size, dtype=np.int64),
+        "date": [None if rng.random() < 0.15 else f"{rng.randint(2000, 2010)}-01-01" for _ in range(size)],
+        "authors": [tuple(rng.choices(_AUTHOR_POOL, k=rng.randint(0, 4))) for _ in range(size)],
+    }, index=rng.sample(range(10 * size), size))
+    papers["pub_year"] = get_pub_years(papers["date"])
+    return papers
+
+
+def _random_authors(rng: random.Random) -> list[int]:
+    # empty lists and ids listed twice included
+    return rng.choices([*_AUTHOR_POOL, 99], k=rng.choice([0, 0, 1, 2, 3]))
+
+
+def _random_filters(rng: random.Random) -> dict:
+    return dict(
+        max_year=rng.choice([None, 2003, 2008]),
+        min_year=rng.choice([None, 2002, 2005]),
+        include_authors=_random_authors(rng),
+        include_all_authors=_random_authors(rng),
+        not_include_authors=_random_authors(rng),
+    )
+
+
+def _keeps(date, authors, max_year=None, min_year=None, include_authors=(), include_all_authors=(),
+           not_include_authors=()) -> bool:
+    # ScopusAuthor.filter_papers (see legacy_filter_papers) for a single paper. the legacy filter failed on missing dates
+    # and selected columns instead of rows once a frame was filtered empty, a paper of unknown year never matches a
+    # year filter
+    year = int(date[:4]) if isinstance(date, str) else None
+    if max_year and (year is None or year > max_year):
+        return False
+    if min_year and (year is None or year < min_year):
+        return False
+    if not_include_authors and any(author in authors for author in not_include_authors):
+        return False
+    if include_authors and not any(author in authors for author in include_authors):
+        return False
+    return not include_all_authors or set(include_all_authors) <= set(authors)
+
+
+def _row_wise(papers: pd.DataFrame, **filters) -> pd.DataFrame:
+    return papers[np.array([_keeps(date, authors, **filters) for date, authors in zip(papers["date"], papers["authors"])],
+                           dtype=bool)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_apply_matches_the_row_wise_filter(seed):
+    rng = random.Random(seed)
+    for _ in range(25):
+        papers, filters = _random_papers(rng, rng.randint(0, 40)), _random_filters(rng)
+        expected = _row_wise(papers, **filters)
+
+        pd.testing.assert_frame_equal(PaperFilter(**filters).apply(papers), expected)
+        # the years are read from the dates if the papers come without pub_year
+        pd.testing.assert_frame_equal(PaperFilter(**filters).apply(papers.drop(columns="pub_year")),
+                                      expected.drop(columns="pub_year"))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_apply_to_all_matches_apply(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        # empty frames in between the profiles are kept in place
+        frames = [_random_papers(rng, rng.choice([0, 1, 5, 30])) for _ in range(rng.randint(0, 5))]
+        paper_filter = PaperFilter(**_random_filters(rng))
+
+        filtered = paper_filter.apply_to_all(frames)
+        assert len(filtered) == len(frames)
+        for papers, result in zip(frames, filtered):
+            pd.testing.assert_frame_equal(result, paper_filter.apply(papers))
+
+
+@pytest.mark.parametrize("filters", [
+    dict(max_year=2020, min_year=1990), dict(include_authors=[3, 5, 8]), dict(not_include_authors=[1, 2, 3, 4]),
+    dict(include_all_authors=[2, 3], min_year=2000), dict(include_authors=[1, 2], not_include_authors=[2, 9]),
+])
+def test_row_wise_filter_matches_the_legacy_filter(filters):
+    papers = synthetic_profiles(1, 2_000, author_pool=20)[0]
+    filters = dict(dict.fromkeys(["max_year", "min_year"]), **filters)
+    pd.testing.assert_frame_equal(_row_wise(papers, **filters), legacy_filter_papers(papers, **filters))
+
+
+def test_papers_of_unknown_year():
+    papers = pd.DataFrame({"scopus_id": [1, 2, 3], "date": ["2005-01-01", None, "n/a"], "authors": [(1,), (1,), (1,)]})
+    papers["pub_year"] = get_pub_years(papers["date"])
+
+    assert PaperFilter(include_authors=[1]).apply(papers)["scopus_id"].tolist() == [1, 2, 3]
+    assert PaperFilter(min_year=2000).apply(papers)["scopus_id"].tolist() == [1]
+    assert PaperFilter(max_year=2010).apply(papers)["scopus_id"].tolist() == [1]
+
+
+def test_author_index():
+    index = AuthorIndex([(1, 2, 2), (), None, (2,), [3, 1]])
+
+    assert index.contains_any([2, 2]).tolist() == [True, False, False, True, False]
+    assert index.contains_any([]).tolist() == [False] * 5
+    # authors listed twice on a paper or in the filter are counted once
+    assert index.contains_all([2, 1, 2]).tolist() == [True, False, False, False, False]
+    assert index.contains_all([1, 3]).tolist() == [False, False, False, False, True]
+
+
+def test_inactive_filters_return_the_papers():
+    papers = pd.DataFrame({"scopus_id": [1], "date": [None], "authors": [None]})
+    paper_filter = PaperFilter(max_year=0, include_authors=[], include_all_authors=None)
+
+    assert not paper_filter.active
+    assert paper_filter.apply(papers) is papers
+    assert paper_filter.apply_to_all([papers])[0] is papers
@@ -0,0 +1,64 @@
+import pytest
+
+from benchmarks.ingest_benchmark import synthetic_papers
+
+
+@pytest.fixture
+def papers(db):
+    papers = synthetic_papers(3)
+    papers["title"] = ["Additive combinatorics", "Arithmetic progressions of primes", "Théorie des nombres"]
+    papers["publication_name"] = ["Annals of Mathematics", "Acta Mathematica", "Inventiones Mathematicae"]
+    db.insert_paper_df(papers.copy())
+    return papers["scopus_id"].tolist()
+
+
+def _assert_index_in_sync(db):
+    # raises sqlite3.DatabaseError if the index differs from the papers table
+    db.cursor.execute("insert into papers_fts (papers_fts) values ('integrity-check')")
+
+
+def test_inserted_papers_are_indexed(db, papers):
+    assert db.match_papers("primes").tolist() == [papers[1]]
+    assert db.match_papers(venue_query="annals").tolist() == [papers[0]]
+    # diacritics are removed from the index and the queries
+    assert db.match_papers("theorie").tolist() == [papers[2]]
+    assert db.match_papers("nombres", "inventiones").tolist() == [papers[2]]
+    _assert_index_in_sync(db)
+
+
+def test_updated_titles_are_reindexed(db, papers):
+    db.cursor.execute("update papers set title = 'Multiplicative functions', publication_name = 'Duke' "
+                      "where scopus_id = ?", [papers[1]])
+
+    assert db.match_papers("primes").size == 0
+    assert db.match_papers("multiplicative").tolist() == [papers[1]]
+    assert db.match_papers(venue_query="duke").tolist() == [papers[1]]
+    _assert_index_in_sync(db)
+
+
+def test_deleted_papers_are_removed_from_the_index(db, papers):
+    db.cursor.execute("delete from papers where scopus_id = ?", [papers[0]])
+
+    assert db.match_papers("additive").size == 0
+    assert db.search_papers("combinatorics").empty
+    _assert_index_in_sync(db)
+
+
+def test_search_papers_filters_and_ranks(db, papers):
+    found = db.search_papers(venue_query="math*")
+    assert set(found["scopus_id"]) == set(papers)
+    assert found["rank"].is_monotonic_increasing
+    assert found["authors"].map(len).gt(0).all()
+
+    year = int(db.get_paper(papers[1])["pub_year"][0])
+    assert db.search_papers("primes", min_year=year + 1).empty
+    assert db.search_papers("primes", max_year=year)["scopus_id"].tolist() == [papers[1]]
+
+
+def test_queries_that_are_no_fts_expressions_are_quoted(db, papers):
+    assert db.match_papers('primes"').tolist() == [papers[1]]
+
+
+def test_a_title_or_venue_query_is_needed(db):
+    with pytest.raises(ValueError):
+        db.match_papers()
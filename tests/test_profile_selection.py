@@ -0,0 +1,107 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.mock_scopus import SyntheticScopus
+from scopus_search import api
+from scopus_search.main import main
+from scopus_search.util import commandline_util
+from scopus_search.util.profile_selection import by_affiliation, by_document_count, get_profile_selector
+
+_NAME = "Homonym, Alex"
+
+
+def _profile(scopus_id: int, document_count: int = None, affiliation: str = None, affiliation_id: int = None):
+    return SimpleNamespace(scopus_id=scopus_id, given_name="Alex", surname="Homonym", document_count=document_count,
+                           affiliation=affiliation, affiliation_id=affiliation_id)
+
+
+@pytest.fixture
+def profiles() -> list:
+    return [
+        _profile(1, 60, "Institute of Mathematics, UCLA", 60000001),
+        _profile(2, 5, "Department of Physics", 60000002),
+        _profile(3, None, None, None),
+        _profile(4, 30, "ucla math department", 60000001),
+    ]
+
+
+def _ids(profiles: list) -> list[int]:
+    return [profile.scopus_id for profile in profiles]
+
+
+@pytest.fixture
+def scopus():
+    # one author search finds all three profiles, they are at the institutes 1, 2 and 0
+    return SyntheticScopus({1: 60, 2: 20, 3: 40}, homonyms=True)
+
+
+@pytest.fixture
+def selections(monkeypatch, configured) -> list:
+    # the profiles offered to the user, the first one is selected. stdin is a terminal
+    selections = []
+
+    def select_first(entries):
+        selections.append([value.scopus_id for _, value in entries])
+        return [entries[0][1]]
+
+    monkeypatch.setattr(commandline_util, "select_from_author_search_entries", select_first)
+    monkeypatch.setattr("sys.stdin", SimpleNamespace(isatty=lambda: True))
+    return selections
+
+
+def test_by_document_count(profiles):
+    # unknown document counts are kept
+    assert _ids(by_document_count(30)(profiles)) == [1, 3, 4]
+    assert _ids(by_document_count(61)(profiles)) == [3]
+
+
+@pytest.mark.parametrize("affiliation, expected", [
+    ("60000001", [1, 4]), (" 60000002 ", [2]), ("UCLA", [1, 4]), ("math", [1, 4]), ("physics", [2]), ("MIT", []),
+])
+def test_by_affiliation(profiles, affiliation, expected):
+    # unknown affiliations never match
+    assert _ids(by_affiliation(affiliation)(profiles)) == expected
+
+
+def test_selectors_are_combined_in_order(profiles):
+    assert get_profile_selector() is None
+    assert get_profile_selector(min_document_count=0, affiliation="") is None
+
+    select = get_profile_selector(min_document_count=10, affiliation="ucla", select_profiles=lambda found: found[1:])
+    assert _ids(select(profiles)) == [4]
+
+
+def test_the_user_is_only_asked_with_a_terminal(profiles, selections, monkeypatch):
+    assert _ids(get_profile_selector(interactive=True)(profiles)) == [1]
+    assert selections == [[1, 2, 3, 4]]
+    # a single profile is kept without asking
+    assert _ids(get_profile_selector(interactive=True)(profiles[:1])) == [1]
+    assert len(selections) == 1
+
+    monkeypatch.setattr("sys.stdin", io.StringIO())
+    assert get_profile_selector(interactive=True) is None
+
+
+@pytest.mark.parametrize("options, expected", [
+    (dict(), [1, 2, 3]), (dict(min_document_count=30), [1, 3]), (dict(affiliation="60000002"), [2]),
+    (dict(affiliation="institute 0"), [3]), (dict(min_document_count=30, affiliation="institute 2"), []),
+])
+def test_only_the_selected_profiles_are_downloaded(configured, scopus, options, expected):
+    [(_, author, _)] = api.iter_author_results([_NAME], cache_mode="off", **options)
+
+    # without any selected profile the author fails
+    assert (sorted(auth.scopus_id for auth in author.scopus_authors) if author else []) == expected
+    # one documents view request per 25 papers of the selected profiles, nothing for the others
+    assert configured.requests.get("author", 0) == sum(-(-scopus.profiles[scopus_id] // 25) for scopus_id in expected)
+
+
+@pytest.mark.parametrize("arguments, asked", [([], True), (["--no_input"], False)])
+def test_no_input_turns_off_the_profile_selection(selections, capsys, arguments, asked):
+    main([_NAME, "--output_format", "ndjson", "--cache_mode", "off", *arguments])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert selections == ([[1, 2, 3]] if asked else [])
+    assert [line["scopus_author"] for line in lines] == ([1] if asked else [1, 2, 3])
@@ -0,0 +1,66 @@
+import pytest
+
+from benchmarks.mock_scopus import SyntheticScopus
+from scopus_search import api, constants
+from scopus_search.models.paper import get_papers_from_db
+from scopus_search.util.db_manager import DbManager
+from scopus_search.util.paper_filter import PaperFilter
+from scopus_search.util.query_plan import get_query_plan
+
+_FILTERS = [
+    dict(min_year=2015),
+    dict(min_year=2000, max_year=2010, include_authors=[2]),
+    dict(include_authors=[2, 3]),
+    dict(include_all_authors=[2]),
+    dict(max_year=2005, not_include_authors=[2]),
+]
+
+
+@pytest.fixture
+def scopus():
+    # profile 2 is a frequent co-author of profile 1
+    return SyntheticScopus({1: 150, 2: 30}, cluster=0.2)
+
+
+@pytest.fixture
+def server_options():
+    # the papers of the documents view cannot be filtered, the scopus search is used instead
+    return {"documents_view": False}
+
+
+def _scopus_ids(papers) -> list[int]:
+    return sorted(papers["scopus_id"].tolist())
+
+
+def test_search_clauses():
+    plan = get_query_plan(min_year=2000, max_year=2010, include_authors=[2, 3, 2], include_all_authors=[4],
+                          not_include_authors=[5])
+    assert plan.get_search_clauses() == [
+        "PUBYEAR > 1999", "PUBYEAR < 2011", "(AU-ID(2) OR AU-ID(3))", "AU-ID(4)", "NOT AU-ID(5)"]
+    assert plan.get_db_filters() == dict(min_year=2000, max_year=2010, include_authors=[2, 3, 2],
+                                         include_all_authors=[4], not_include_authors=[5])
+
+
+def test_nothing_to_push_down():
+    assert get_query_plan() is None
+    assert get_query_plan(include_authors=[]) is None
+
+
+@pytest.mark.parametrize("filters", _FILTERS)
+def test_pushdown_finds_the_papers_of_filtering_after_the_download(configured, tmp_path, monkeypatch, filters):
+    pushed = api.get_authors([1], query_plan=get_query_plan(**filters))[0].base_author.papers
+    pushed_requests = sum(configured.requests.values())
+
+    monkeypatch.setitem(vars(constants), "db_manager", DbManager(str(tmp_path / "full.db")))
+    configured.requests.clear()
+    papers = api.get_authors([1])[0].base_author.papers
+    full = PaperFilter(**filters).apply(papers)
+
+    assert 0 < len(full) < len(papers)
+    assert _scopus_ids(pushed) == _scopus_ids(full)
+    assert pushed_requests <= sum(configured.requests.values())
+
+    # the same filters in sql load the same papers from the database of the full download
+    loaded = get_papers_from_db(1, db_filters=get_query_plan(**filters).get_db_filters())
+    assert _scopus_ids(loaded) == _scopus_ids(full)
+    constants.db_manager.conn.close()
@@ -0,0 +1,125 @@
+import pytest
+import requests
+
+from scopus_search.util import rate_limiter
+from scopus_search.util.rate_limiter import QuotaExceededError, RequestGovernor, TokenBucket
+
+_URL = "https://api.elsevier.com/content/abstract/scopus_id/1"
+
+
+def _response(status_code: int, **headers) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update({name.replace("_", "-"): value for name, value in headers.items()})
+    return response
+
+
+class FakeApi:
+    # answers the requests with the given responses (or raises the given exceptions) in order
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self) -> requests.Response:
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list:
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    return sleeps
+
+
+@pytest.fixture
+def governor() -> RequestGovernor:
+    # a rate high enough that the token bucket does not wait
+    return RequestGovernor(rates={"abstract": 1000}, max_retries=3, backoff_base=1, backoff_max=3)
+
+
+def test_server_errors_are_retried_with_exponential_backoff(governor, sleeps):
+    api = FakeApi(_response(503), _response(502), _response(500), _response(200))
+
+    assert governor.send("key", _URL, api).status_code == 200
+    assert api.calls == 4
+    assert governor.stats["requests"] == 4
+    assert governor.stats["retries"] == 3
+    # jittered between half and all of base * 2 ** attempt, capped by backoff_max
+    assert len(sleeps) == 3
+    for delay, (low, high) in zip(sleeps, [(0.5, 1), (1, 2), (1.5, 3)]):
+        assert low <= delay <= high
+
+
+def test_the_last_response_is_returned_after_max_retries(governor, sleeps):
+    api = FakeApi(*[_response(503)] * 4)
+
+    assert governor.send("key", _URL, api).status_code == 503
+    assert api.calls == 4
+
+
+def test_other_errors_are_not_retried(governor, sleeps):
+    api = FakeApi(_response(404))
+
+    assert governor.send("key", _URL, api).status_code == 404
+    assert api.calls == 1
+    assert not sleeps
+
+
+def test_connection_errors_are_retried(governor, sleeps):
+    api = FakeApi(requests.ConnectionError(), requests.Timeout(), _response(200))
+    assert governor.send("key", _URL, api).status_code == 200
+
+    api = FakeApi(*[requests.ConnectionError()] * 4)
+    with pytest.raises(requests.ConnectionError):
+        governor.send("key", _URL, api)
+    assert api.calls == 4
+
+
+def test_retry_after_pauses_the_endpoint(governor, sleeps):
+    api = FakeApi(_response(429, Retry_After="2"), _response(200), _response(200))
+
+    assert governor.send("key", _URL, api).status_code == 200
+    # the retried request waits for the pause of the bucket, plus a jitter of at most backoff_base
+    assert len(sleeps) == 1
+    assert 1.9 <= sleeps[0] <= 3
+
+    # as do other requests to the endpoint that were reserved before the pause is over
+    governor.send("key", _URL, api)
+    assert len(sleeps) == 2
+
+
+def test_persistent_rate_limiting_raises(governor, sleeps):
+    api = FakeApi(*[_response(429, Retry_After="0")] * 4)
+
+    with pytest.raises(QuotaExceededError):
+        governor.send("key", _URL, api)
+    assert api.calls == 4
+
+
+def test_exhausted_quota_raises_without_retrying(governor, sleeps):
+    reset = str(int(rate_limiter.time.time()) + 7 * 24 * 3600)
+    api = FakeApi(_response(429, X_RateLimit_Remaining="0", X_RateLimit_Reset=reset))
+
+    with pytest.raises(QuotaExceededError, match="resets in"):
+        governor.send("key", _URL, api)
+    assert api.calls == 1
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=2, capacity=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.01)
+    assert bucket.reserve() == pytest.approx(1, abs=0.01)
+
+
+def test_token_bucket_follows_the_remaining_quota():
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.limit(0)
+
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
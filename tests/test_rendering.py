@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.ingest_benchmark import synthetic_papers
+from benchmarks.render_benchmark import legacy_json_output, legacy_paper_list, synthetic_authors
+from scopus_search.main import _write_papers
+from scopus_search.models.author import Author
+from scopus_search.models.scopus_author import ScopusAuthor
+from scopus_search.util.data_manager import DataManager, OutputFormats
+from scopus_search.util.rendering import get_paper_table, parse_sort_by, sort_papers, to_json
+
+
+@pytest.fixture
+def authors() -> list:
+    # two profiles per author, with many papers of equal date
+    return synthetic_authors(3, 600)
+
+
+@pytest.fixture
+def author() -> Author:
+    papers = pd.DataFrame({
+        "scopus_id": [3, 1, 2],
+        "title": ['A "quoted" title, with comma', "Pipes | in\ntitles", None],
+        "date": ["2020-01-01", "2021-06-01", "2020-01-01"],
+        "authors": [(7, 5), (5,), None],
+        "pub_year": pd.array([2020, 2021, 2020], dtype="Int64"),
+    })
+    return Author.from_db([ScopusAuthor.from_db(5, "Terence", "Tao", papers)])
+
+
+def _output(authors, output_format: str, sort_by: list[str] = None):
+    return DataManager(authors, OutputFormats[output_format], sort_by).get_output()
+
+
+def test_json_is_identical_to_the_row_wise_rendering(authors):
+    assert to_json(_output(authors, "json")) == to_json(legacy_json_output(authors))
+
+
+def test_ndjson_lines_are_the_json_papers_of_a_profile(authors):
+    lines = [json.loads(line) for line in _output(authors, "ndjson").splitlines()]
+    profiles = [(author, auth) for author in authors for auth in author.scopus_authors]
+
+    assert len(lines) == len(profiles)
+    for line, (author, auth) in zip(lines, profiles):
+        assert line == {"base_author": author.base_author.scopus_id, "scopus_author": auth.scopus_id,
+                        "name": auth._get_output_key(),
+                        "papers": json.loads(to_json(legacy_paper_list(auth.papers)))}
+
+
+@pytest.mark.parametrize("sort_by", [None, ["pub_year:desc", "title"], ["title:asc", "scopus_id:desc"]])
+def test_all_formats_share_the_sort_order(authors, sort_by):
+    expected = [scopus_id for author in authors for auth in author.scopus_authors
+                for scopus_id in sort_papers(auth.papers, sort_by)["scopus_id"].tolist()]
+
+    assert get_paper_table(authors, sort_by)["scopus_id"].tolist() == expected
+    csv_rows = list(csv.DictReader(io.StringIO(_output(authors, "csv", sort_by))))
+    assert [int(row["scopus_id"]) for row in csv_rows] == expected
+    ndjson_papers = [paper["scopus_id"] for line in _output(authors, "ndjson", sort_by).splitlines()
+                     for paper in json.loads(line)["papers"]]
+    assert ndjson_papers == expected
+
+
+def test_papers_of_equal_date_keep_their_order(authors):
+    # the default sort by date is stable
+    papers = authors[0].base_author.papers
+    assert papers["date"].duplicated().any()
+    ties = sort_papers(papers).groupby("date", sort=False)["scopus_id"].agg(list)
+    for date, scopus_ids in ties.items():
+        assert scopus_ids == papers.loc[papers["date"] == date, "scopus_id"].tolist()
+
+
+def test_csv(author):
+    rows = list(csv.reader(io.StringIO(_output([author], "csv"))))
+
+    assert rows == [
+        ["base_author", "scopus_author", "name", "scopus_id", "title", "authors", "date"],
+        ["5", "5", author.scopus_authors[0]._get_output_key(), "1", "Pipes | in\ntitles", "5", "2021-06-01"],
+        ["5", "5", author.scopus_authors[0]._get_output_key(), "3", 'A "quoted" title, with comma', "7;5",
+         "2020-01-01"],
+        ["5", "5", author.scopus_authors[0]._get_output_key(), "2", "", "", "2020-01-01"],
+    ]
+
+
+def test_markdown(author):
+    lines = _output([author], "md").splitlines()
+
+    assert lines[0] == "# " + author.base_author._get_output_key() + " (5)"
+    assert "| Date | Title | Scopus id | Authors |" in lines
+    assert "| 2021-06-01 | Pipes \\| in titles | 1 | 5 |" in lines
+    assert '| 2020-01-01 | A "quoted" title, with comma | 3 | 7, 5 |' in lines
+
+
+def test_csv_of_searched_papers_writes_integer_years(db, tmp_path):
+    papers = synthetic_papers(2)
+    papers.loc[1, "date"] = None
+    db.insert_paper_df(papers.copy())
+    output_file = tmp_path / "papers.csv"
+
+    _write_papers(db.search_papers("synthetic"), "csv", str(output_file), ["scopus_id"])
+    rows = list(csv.DictReader(output_file.open()))
+    assert [row["pub_year"] for row in rows] == [papers["date"][0][:4], ""]
+
+
+def test_unknown_sort_keys():
+    assert parse_sort_by(["pub_year:DESC", "title"]) == (["pub_year", "title"], [False, True])
+    with pytest.raises(ValueError):
+        parse_sort_by(["authors"])
+    with pytest.raises(ValueError):
+        parse_sort_by(["date:up"])
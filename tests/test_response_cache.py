@@ -0,0 +1,85 @@
+import json
+
+from scopus_search.util.response_cache import ResponseCache, get_cache_key, get_endpoint
+
+_AUTHOR_URL = "https://api.elsevier.com/content/author/author_id/1?view=ENHANCED&field=dc:identifier"
+
+
+def test_cache_key_ignores_parameter_order():
+    assert get_cache_key("https://api.elsevier.com/content/search/scopus?query=AU-ID(1)&start=25&count=25") == \
+        get_cache_key("https://api.elsevier.com/content/search/scopus?count=25&start=25&query=AU-ID(1)")
+
+
+def test_cache_key_depends_on_host_path_and_parameters():
+    keys = {
+        get_cache_key("https://api.elsevier.com/content/search/scopus?query=AU-ID(1)&start=0"),
+        get_cache_key("https://api.elsevier.com/content/search/scopus?query=AU-ID(1)&start=25"),
+        get_cache_key("https://api.elsevier.com/content/search/scopus?query=AU-ID(2)&start=0"),
+        get_cache_key("https://api.elsevier.com/content/search/author?query=AU-ID(1)&start=0"),
+        get_cache_key("http://127.0.0.1:8099/content/search/scopus?query=AU-ID(1)&start=0"),
+    }
+    assert len(keys) == 5
+
+
+def test_endpoints():
+    assert get_endpoint(_AUTHOR_URL) == "author"
+    assert get_endpoint("https://api.elsevier.com/content/search/author?query=x") == "author_search"
+    assert get_endpoint("https://api.elsevier.com/content/search/scopus?query=x") == "scopus_search"
+    assert get_endpoint("https://api.elsevier.com/content/abstract/scopus_id/1") == "abstract"
+    assert get_endpoint("https://api.elsevier.com/content/serial/title") == "other"
+
+
+def test_store_and_lookup(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.store(_AUTHOR_URL, json.dumps({"author": 1}), etag='"v1"')
+
+    # an equivalent url is answered by the same entry
+    entry = cache.lookup("https://api.elsevier.com/content/author/author_id/1?field=dc:identifier&view=ENHANCED")
+    assert entry.data == {"author": 1}
+    assert entry.fresh
+    assert entry.etag == '"v1"'
+    assert cache.lookup(_AUTHOR_URL.replace("author_id/1", "author_id/2")) is None
+
+
+def test_expired_entries_are_stale(tmp_path):
+    cache = ResponseCache(tmp_path, ttls={"author": 0})
+    cache.store(_AUTHOR_URL, "{}")
+    assert not cache.lookup(_AUTHOR_URL).fresh
+
+    cache.ttls["author"] = 60
+    cache.mark_revalidated(_AUTHOR_URL)
+    assert cache.lookup(_AUTHOR_URL).fresh
+
+
+def test_modes(tmp_path):
+    ResponseCache(tmp_path, mode="read").store(_AUTHOR_URL, "{}")
+    assert ResponseCache(tmp_path).lookup(_AUTHOR_URL) is None
+
+    ResponseCache(tmp_path).store(_AUTHOR_URL, "{}")
+    assert ResponseCache(tmp_path, mode="read").lookup(_AUTHOR_URL) is not None
+    assert ResponseCache(tmp_path, mode="off").lookup(_AUTHOR_URL) is None
+
+
+def test_corrupt_bodies_are_dropped(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.store(_AUTHOR_URL, "{}")
+    cache._body_path(get_cache_key(_AUTHOR_URL)).write_text("{not json")
+
+    assert cache.lookup(_AUTHOR_URL) is None
+    assert cache._connection().execute("select count(*) from entries").fetchone()[0] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    body = json.dumps({"padding": "x" * 400})
+    cache = ResponseCache(tmp_path, max_size_mb=2.5 * len(body) / 1024 / 1024)
+    urls = [f"https://api.elsevier.com/content/abstract/scopus_id/{scopus_id}" for scopus_id in range(3)]
+
+    cache.store(urls[0], body)
+    cache.store(urls[1], body)
+    cache.lookup(urls[0])
+    cache.store(urls[2], body)
+
+    assert cache.evictions == 1
+    assert cache.lookup(urls[1]) is None
+    assert cache.lookup(urls[0]) is not None
+    assert cache.lookup(urls[2]) is not None
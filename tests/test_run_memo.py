@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from scopus_search.util.run_memo import RunMemo
+
+_THREADS = 8
+
+
+class SlowLoader:
+    # blocks until every other thread waits for the same key, then returns (or raises) once per call
+    def __init__(self, memo: RunMemo, namespace: str, error: Exception = None):
+        self.memo = memo
+        self.namespace = namespace
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        deadline = time.monotonic() + 5
+        while self.memo.stats.get(self.namespace, {}).get("waits", 0) < _THREADS - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if self.error:
+            raise self.error
+        return f"value {call}"
+
+
+def _get_concurrently(memo: RunMemo, loader: SlowLoader, keep: bool = True) -> list:
+    # the results (or errors) of _THREADS concurrent calls of memo.get for the same key
+    def get():
+        try:
+            return memo.get(loader.namespace, 1, loader, keep=keep)
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(_THREADS) as executor:
+        return list(executor.map(lambda _: get(), range(_THREADS)))
+
+
+@pytest.mark.parametrize("keep", [True, False])
+def test_concurrent_calls_load_once(keep):
+    memo = RunMemo()
+    loader = SlowLoader(memo, "papers")
+
+    assert _get_concurrently(memo, loader, keep) == ["value 1"] * _THREADS
+    assert loader.calls == 1
+    assert memo.stats == {"papers": {"misses": 1, "hits": 0, "waits": _THREADS - 1}, "saved": _THREADS - 1}
+
+    # without keep the value is only shared with the concurrent calls
+    assert memo.get("papers", 1, loader, keep=keep) == ("value 1" if keep else "value 2")
+    assert loader.calls == (1 if keep else 2)
+
+
+@pytest.mark.parametrize("keep", [True, False])
+def test_failures_are_shared_but_not_kept(keep):
+    memo = RunMemo()
+    error = ValueError("quota exceeded")
+    loader = SlowLoader(memo, "authors", error)
+
+    assert _get_concurrently(memo, loader, keep) == [error] * _THREADS
+    assert loader.calls == 1
+
+    # the next call tries again
+    loader.error = None
+    assert memo.get("authors", 1, loader, keep=keep) == "value 2"
+    assert loader.calls == 2
+
+
+def test_namespaces_and_added_items():
+    memo = RunMemo()
+    memo.add("papers", [(1, "added"), (2, "added")])
+
+    assert memo.get("papers", 1, lambda: "loaded") == "added"
+    assert memo.get("authors", 1, lambda: "loaded") == "loaded"
+    # values already known are not replaced
+    memo.add("authors", [(1, "added")])
+    assert memo.get("authors", 1, lambda: "loaded again") == "loaded"
+    assert memo.stats["saved"] == 2
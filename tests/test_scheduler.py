@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from scopus_search.util.rate_limiter import QuotaExceededError
+from scopus_search.util.scheduler import AuthorScheduler
+
+
+class FakeAuthor:
+    def __init__(self, author_input, saved: list):
+        self.author_input = author_input
+        self._saved = saved
+
+    def save_to_db(self):
+        self._saved.append((self.author_input, threading.current_thread()))
+
+
+class SlowBuilder:
+    # builds the authors after the given delays and raises the given errors, records how many authors were started
+    # but not yet yielded by the scheduler
+    def __init__(self, delays: dict = None, errors: dict = None):
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.saved = []
+        self.started = self.yielded = self.max_pending = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, author_input):
+        with self._lock:
+            self.started += 1
+            self.max_pending = max(self.max_pending, self.started - self.yielded)
+        time.sleep(self.delays.get(author_input, 0))
+        if author_input in self.errors:
+            raise self.errors[author_input]
+        return FakeAuthor(author_input, self.saved)
+
+    def iter_results(self, scheduler: AuthorScheduler, author_inputs: list):
+        for result in scheduler.iter_results(author_inputs):
+            with self._lock:
+                self.yielded += 1
+            yield result
+
+
+@pytest.mark.parametrize("workers", [1, 3, 8])
+def test_results_are_yielded_in_input_order(workers):
+    # the later authors finish first
+    author_inputs = list(range(12))
+    builder = SlowBuilder(delays={author_input: 0.002 * (12 - author_input) for author_input in author_inputs})
+
+    results = list(builder.iter_results(AuthorScheduler(builder, workers=workers), author_inputs))
+
+    assert [author_input for author_input, _, _ in results] == author_inputs
+    assert [author.author_input for _, author, _ in results] == author_inputs
+    assert [error for _, _, error in results] == [None] * 12
+    # saved in the order of completion, by the calling thread
+    assert sorted(author_input for author_input, _ in builder.saved) == author_inputs
+    assert {thread for _, thread in builder.saved} == {threading.current_thread()}
+    if workers > 1:
+        assert [author_input for author_input, _ in builder.saved] != author_inputs
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_pending_authors_are_bounded(workers):
+    # the first author blocks the output, the others finish right away but are not yielded before it
+    builder = SlowBuilder(delays={0: 0.2})
+
+    results = list(builder.iter_results(AuthorScheduler(builder, workers=workers), list(range(20))))
+
+    assert len(results) == 20
+    assert builder.max_pending <= 2 * workers
+    if workers > 1:
+        assert builder.max_pending == 2 * workers
+
+
+def test_failing_authors_do_not_stop_the_others(capsys):
+    builder = SlowBuilder(delays={1: 0.05}, errors={1: ValueError("no such author"),
+                                                     3: QuotaExceededError("The author quota is exhausted")})
+
+    results = list(AuthorScheduler(builder, workers=2).iter_results(range(6)))
+
+    assert [author_input for author_input, _, _ in results] == list(range(6))
+    assert [author is None for _, author, _ in results] == [False, True, False, True, False, False]
+    assert [error for _, _, error in results] == [None, "ValueError: no such author", None,
+                                                  "The author quota is exhausted", None, None]
+    assert sorted(author_input for author_input, _ in builder.saved) == [0, 2, 4, 5]
+    # quota errors are reported even when not verbose
+    assert capsys.readouterr().err == "Skipping author 3: The author quota is exhausted\n"
+
+
+def test_loaded_authors_and_workers():
+    builder = SlowBuilder()
+    scheduler = AuthorScheduler(lambda author_input: author_input * 10, workers=2,
+                                load_author=lambda result: builder(result))
+
+    assert [author.author_input for author in scheduler.run([1, 2, 3])] == [10, 20, 30]
+    with pytest.raises(ValueError):
+        AuthorScheduler(builder, workers=0)
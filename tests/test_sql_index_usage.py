@@ -0,0 +1,102 @@
+# EXPLAIN QUERY PLAN regression test of DbManager: runs the database code paths against a synthetic database,
+# records every statement sqlite executes and fails if a plan shows a full scan of a stored table
+import re
+
+import pytest
+
+from benchmarks.ingest_benchmark import synthetic_papers
+from scopus_search.util.db_manager import DbManager
+
+# the staging tables of the bulk ingest path (always aliased as s), json_each id lists and the schema table are meant
+# to be scanned. fts5 queries show up as a scan of the virtual table, but use its full text index
+_ALLOWED_SCANS = {"s", "json_each", "sqlite_master"}
+_SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+# statements that read every row of a table by design, like the full load of the co-authorship graph
+_FULL_LOADS = ("select author, count(*), group_concat(paper) from written_by where rowid <=",)
+
+
+def exercise(db: DbManager, papers):
+    first_paper = int(papers["scopus_id"][0])
+    first_author = int(papers["authors"][0][0])
+
+    db.insert_scopus_authors([(first_author, "Terence", "Tao", None), (first_author + 1, "Ben", "Green", first_author)])
+    db.insert_paper_df(papers.iloc[:-100].copy())
+    # the co-authorship graph loads all authorships first and then the rows added since
+    last_rowid, _, _ = db.get_authorships()
+    db.insert_paper_df(papers.iloc[-100:].copy())
+    db.get_authorships(last_rowid)
+    db.update_sync_state([first_author])
+
+    db.find_author(first_author)
+    db.find_author_by_name("Terence", "Tao")
+    db.get_author_scopus_ids(first_author + 1)
+    db.get_last_updated_paper(first_author)
+    db.get_papers_by_scopus_author(first_author, min_year=2000, max_year=2010)
+    db.get_paper_authors(first_paper)
+    db.find_paper(first_paper)
+    db.find_afil(1)
+    db.get_sync_state(first_author)
+    db.get_papers_with_authors(first_author, min_year=2000, max_year=2010, with_affiliations=True)
+    db.get_authors_of_papers(papers["scopus_id"].head(50))
+    db.find_papers(papers["scopus_id"].head(50))
+    db.get_scopus_authors([first_author, first_author + 1])
+    db.get_scopus_authors_by_names([("Terence", "Tao"), ("Ben", "Green")])
+    db.get_linked_scopus_authors([first_author])
+    db.get_paper_counts([first_author, first_author + 1])
+    db.name_index.resolve("terence", "tao")
+    db.insert_scopus_authors([(first_author - 1, "Ben", "Green", None)])
+    db.name_index.resolve("B.", "Green")
+    db.get_papers_of_authors([first_author, first_author + 1], min_year=2000, max_year=2010, include_authors=[2, 3],
+                             include_all_authors=[first_author, 2], not_include_authors=[4], with_affiliations=True)
+    db.match_papers("synthetic", "paper*")
+    db.search_papers("synthetic", min_year=2000, max_year=2010, limit=10)
+
+    job_id = db.create_job("authors.csv")
+    db.add_job_entries(job_id, [str(author) for author in papers["authors"][0]])
+    db.update_job_entries(job_id, [(str(first_author), "done", None)])
+    db.find_job("authors.csv")
+    db.get_job_entries(job_id, ["pending", "failed"])
+    db.get_job_status_counts(job_id)
+    db.finish_job(job_id, "done")
+
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory) -> dict:
+    # statement -> query plan of every statement the database code paths run, besides plain inserts of values
+    db = DbManager(str(tmp_path_factory.mktemp("query_plans") / "query_plans.db"))
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    exercise(db, synthetic_papers(2_000))
+    db.conn.set_trace_callback(None)
+
+    plans = {}
+    for statement in dict.fromkeys(statements):
+        if not re.match(r"\s*(select|insert|update|delete|with)\b", statement, re.IGNORECASE):
+            continue
+        if re.match(r"\s*insert[^;]*\bvalues\b", statement, re.IGNORECASE):
+            continue
+        plans[" ".join(statement.split())] = db.explain_query_plan(statement)
+    db.conn.close()
+    return plans
+
+
+def test_statements_are_checked(query_plans):
+    assert len(query_plans) >= 30
+
+
+def test_no_full_scans(query_plans):
+    failures = {
+        statement: plan for statement, plan in query_plans.items()
+        if not statement.startswith(_FULL_LOADS) and any((match := _SCAN_PATTERN.match(detail)) and match.group(1) not in _ALLOWED_SCANS
+               and "VIRTUAL TABLE INDEX" not in detail for detail in plan)
+    }
+    assert not failures, "full scans in:\n" + "\n".join(f"{statement}\n    plan: {plan}"
+                                                         for statement, plan in failures.items())
+
+
+def test_authorships_are_loaded_incrementally(query_plans):
+    full_loads = [plan for statement, plan in query_plans.items() if statement.startswith(_FULL_LOADS)]
+    assert full_loads == [["SCAN written_by USING COVERING INDEX written_by_uniq"]]
+    incremental = [plan for statement, plan in query_plans.items()
+                   if statement.startswith("select author, paper from written_by where rowid >")]
+    assert incremental == [["SEARCH written_by USING INTEGER PRIMARY KEY (rowid>? AND rowid<?)"]]
@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+
+from benchmarks.ingest_benchmark import synthetic_papers
+from scopus_search import api, constants
+from scopus_search.util.db_manager import MIGRATIONS, DbManager
+
+
+def _store_author(db, scopus_id: int, papers: pd.DataFrame):
+    db.insert_scopus_author(scopus_id, "Given", "Surname")
+    papers["authors"] = [(scopus_id,)] * len(papers)
+    db.insert_paper_df(papers)
+
+
+def test_update_sync_state_records_the_watermark(db):
+    papers = synthetic_papers(10)
+    _store_author(db, 1, papers)
+    db.update_sync_state([1])
+
+    state = db.get_sync_state(1)
+    newest = papers.sort_values(["date", "eid"]).iloc[-1]
+    assert state["paper_count"][0] == 10
+    assert state["max_cover_date"][0] == newest["date"]
+    assert state["max_eid"][0] == newest["eid"]
+
+
+def test_update_sync_state_skips_authors_without_papers(db):
+    # the aggregate of an author without papers used to be stored under a new rowid, i.e. another author id
+    _store_author(db, 1, synthetic_papers(3))
+    db.update_sync_state([1, 999])
+
+    assert db.cursor.execute("select author, paper_count from sync_state").fetchall() == [(1, 3)]
+    assert db.get_sync_state(999).empty
+
+
+def test_orphan_sync_states_are_dropped_by_the_migration(db):
+    db.cursor.execute("insert into sync_state (author, paper_count) values (2, 0)")
+    db.cursor.execute(f"PRAGMA user_version = {len(MIGRATIONS) - 1}")
+    db.conn.commit()
+
+    migrated = DbManager(db.db_path)
+    assert migrated.get_sync_state(2).empty
+    migrated.conn.close()
+
+
+@pytest.fixture
+def new_paper(scopus):
+    # a paper published after everything stored for author 1
+    paper = dict(scopus.get_papers(1)[0], scopus_id=86_000_000_000, year=2025, date="2025-06-01",
+                 title="A paper newer than the watermark")
+    return paper
+
+
+def test_refresh_downloads_only_the_delta(configured, scopus, new_paper):
+    author = api.get_authors([1])[0]
+    state = constants.db_manager.get_sync_state(1)
+    assert state["paper_count"][0] == 60
+    assert state["max_cover_date"][0] == max(paper["date"] for paper in scopus.get_papers(1))
+    assert len(author.base_author.papers) == 60
+
+    scopus.get_papers(1).append(new_paper)
+    configured.requests.clear()
+    author = api.get_authors([1], refresh="always")[0]
+
+    # the delta is one page of the search api sorted by cover date, the document list is not downloaded again
+    assert new_paper["scopus_id"] in author.base_author.papers["scopus_id"].tolist()
+    assert len(author.base_author.papers) == 61
+    assert dict(configured.requests) == {"scopus_search": 1}
+    state = constants.db_manager.get_sync_state(1)
+    assert state["paper_count"][0] == 61
+    assert state["max_cover_date"][0] == "2025-06-01"
+
+
+def test_fresh_authors_are_not_synced(configured, scopus, new_paper):
+    api.get_authors([1])
+    scopus.get_papers(1).append(new_paper)
+    configured.requests.clear()
+
+    author = api.get_authors([1], refresh="stale", stale_after_days=7)[0]
+    assert len(author.base_author.papers) == 60
+    assert "scopus_search" not in configured.requests
+
+
+@pytest.mark.parametrize("sync_state", [True, False])
+def test_authors_without_a_watermark_are_synced_in_full(configured, scopus, new_paper, sync_state):
+    # no stored paper has a cover date, with or without a sync state
+    api.get_authors([1])
+    db = constants.db_manager
+    db.cursor.execute("update papers set date = null")
+    db.cursor.execute("update sync_state set max_cover_date = null" if sync_state else "delete from sync_state")
+    db.conn.commit()
+
+    old_paper = dict(new_paper, scopus_id=86_000_000_001, year=1970, date="1970-01-01")
+    scopus.get_papers(1).append(old_paper)
+    configured.requests.clear()
+    author = api.get_authors([1], refresh="always")[0]
+
+    assert old_paper["scopus_id"] in author.base_author.papers["scopus_id"].tolist()
+    assert len(author.base_author.papers) == 61
+    assert set(configured.requests) == {"scopus_search"}